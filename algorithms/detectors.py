@@ -0,0 +1,375 @@
+import inspect
+
+import numpy as np
+import pandas as pd
+
+from algorithms.isolation_forest import _fit_forest, score_parallel
+
+# Escala que torna o MAD comparável ao desvio padrão em dados normais
+MAD_SCALE = 1.4826
+
+
+def _as_array(X) -> np.ndarray:
+    return np.asarray(X, dtype=np.float32)
+
+
+def _group_keys(groups, n) -> np.ndarray:
+    """Chave inteira estável por combinação de valores das colunas de agrupamento."""
+    if groups is None:
+        return np.zeros(n, dtype=np.uint64)
+    return pd.util.hash_pandas_object(pd.DataFrame(groups), index=False).to_numpy()
+
+
+def _subset(groups, rows):
+    if groups is None:
+        return None
+    return groups.iloc[rows] if hasattr(groups, 'iloc') else np.asarray(groups)[rows]
+
+
+class Detector:
+    """Interface comum dos detectores de anomalias.
+
+    Os scores seguem o padrão do sklearn: em `score_samples`, quanto menor,
+    mais anômalo; `decision_function` desloca o score pelo limiar ajustado à
+    `contamination`, de modo que valores negativos são anomalias. `groups`
+    (ex.: usuário e operação de cada linha) só é usado pelos detectores por grupo.
+    """
+
+    name = 'detector'
+
+    def __init__(self, contamination=0.05):
+        self.contamination = contamination
+
+    def get_params(self) -> dict:
+        names = [p for p in inspect.signature(type(self).__init__).parameters if p != 'self']
+        return {p: getattr(self, p) for p in names}
+
+    def describe(self) -> dict:
+        """Tipo e hiperparâmetros (recursivamente), usados como chave no registro de modelos."""
+        def value(v):
+            if isinstance(v, Detector):
+                return v.describe()
+            if isinstance(v, (list, tuple)):
+                return [value(x) for x in v]
+            return v
+        # O paralelismo não altera o resultado
+        params = {k: value(v) for k, v in self.get_params().items() if k != 'n_jobs'}
+        return {'detector': self.name, 'params': params}
+
+    def _fit(self, X, groups=None):
+        """Ajusta o modelo, sem pontuar os dados de treino."""
+        raise NotImplementedError
+
+    def score_samples(self, X, groups=None) -> np.ndarray:
+        raise NotImplementedError
+
+    def fit(self, X, groups=None):
+        self._fit(X, groups)
+        raw = self.score_samples(X, groups)
+        self.offset_ = np.percentile(raw, 100.0 * self.contamination)
+        self.train_scores_ = raw - self.offset_
+        return self
+
+    def decision_function(self, X, groups=None) -> np.ndarray:
+        return self.score_samples(X, groups) - self.offset_
+
+    def predict(self, X, groups=None) -> np.ndarray:
+        return np.where(self.decision_function(X, groups) < 0, -1, 1).astype(np.int8)
+
+
+class IsolationForestDetector(Detector):
+    """Isolation Forest com treino e pontuação em paralelo (ver `train_isolation_forest`)."""
+
+    name = 'isolation_forest'
+
+    def __init__(self, n_estimators=100, contamination=0.05, random_state=42, n_jobs=None):
+        super().__init__(contamination)
+        self.n_estimators = n_estimators
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+
+    def _fit(self, X, groups=None):
+        # O limiar é calculado em `fit`, sobre os scores do treino
+        self.model_ = _fit_forest(X, self.n_estimators, self.random_state, self.n_jobs)
+        return self
+
+    def score_samples(self, X, groups=None):
+        return score_parallel(self.model_, X, self.n_jobs, method='score_samples')
+
+
+class HBOSDetector(Detector):
+    """Histogram-Based Outlier Score: um histograma por feature, custo O(n).
+
+    O score é a soma dos log das alturas normalizadas dos histogramas nas
+    posições da linha; valores fora da faixa de treino contam como uma
+    altura mínima.
+    """
+
+    name = 'hbos'
+
+    def __init__(self, n_bins=20, contamination=0.05):
+        super().__init__(contamination)
+        self.n_bins = n_bins
+
+    def _fit(self, X, groups=None):
+        X = _as_array(X)
+        self.edges_, self.log_heights_, self.floor_ = [], [], []
+        for j in range(X.shape[1]):
+            col = X[:, j]
+            counts, edges = np.histogram(col[~np.isnan(col)], bins=self.n_bins)
+            peak = max(counts.max(), 1)
+            # Altura mínima equivalente a meia observação, para bins vazios e fora da faixa
+            floor = np.log(0.5 / peak)
+            self.edges_.append(edges)
+            self.log_heights_.append(np.maximum(np.log(np.maximum(counts, 1e-12) / peak), floor))
+            self.floor_.append(floor)
+        return self
+
+    def score_samples(self, X, groups=None):
+        X = _as_array(X)
+        total = np.zeros(len(X))
+        for j, (edges, log_heights, floor) in enumerate(zip(self.edges_, self.log_heights_, self.floor_)):
+            col = X[:, j]
+            idx = np.clip(np.searchsorted(edges, col, side='right') - 1, 0, len(log_heights) - 1)
+            part = log_heights[idx]
+            part = np.where((col < edges[0]) | (col > edges[-1]), floor, part)
+            total += np.where(np.isnan(col), 0.0, part)
+        return total
+
+
+class ApproximateLOFDetector(Detector):
+    """Local Outlier Factor com vizinhos buscados em uma amostra de referência.
+
+    Limitar a referência a `max_samples` linhas torna o kNN aproximado, mas
+    mantém a pontuação em O(n log max_samples).
+    """
+
+    name = 'lof'
+
+    def __init__(self, n_neighbors=20, max_samples=5000, contamination=0.05, random_state=42, n_jobs=None):
+        super().__init__(contamination)
+        self.n_neighbors = n_neighbors
+        self.max_samples = max_samples
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+
+    def _fit(self, X, groups=None):
+        from sklearn.neighbors import LocalOutlierFactor
+
+        X = _as_array(X)
+        rng = np.random.RandomState(self.random_state)
+        reference = X[rng.choice(len(X), min(self.max_samples, len(X)), replace=False)]
+        self.model_ = LocalOutlierFactor(
+            n_neighbors=min(self.n_neighbors, len(reference) - 1), novelty=True, n_jobs=self.n_jobs,
+        ).fit(reference)
+        return self
+
+    def score_samples(self, X, groups=None):
+        return self.model_.score_samples(_as_array(X))
+
+
+class RobustZScoreDetector(Detector):
+    """Z-score robusto (mediana e MAD) por grupo, atualizado em fluxo.
+
+    Para cada grupo (ex.: usuário e tipo de operação) guarda apenas as
+    `history` observações mais recentes; o score de uma linha é o maior
+    desvio robusto entre suas features, limitado a `max_z`. Grupos com menos
+    de `min_samples` observações usam as estatísticas globais.
+    """
+
+    name = 'robust_zscore'
+
+    def __init__(self, history=200, min_samples=10, max_z=50.0, contamination=0.05, score_history=10_000):
+        super().__init__(contamination)
+        self.history = history
+        self.min_samples = min_samples
+        self.max_z = max_z
+        self.score_history = score_history
+
+    def _fit(self, X, groups=None):
+        self.state_ = None
+        self._recent_scores = np.empty(0)
+        return self.partial_fit(X, groups)
+
+    def fit(self, X, groups=None):
+        super().fit(X, groups)
+        # As atualizações seguintes partem do limiar do treino, não de uma janela vazia
+        self._recent_scores = (self.train_scores_ + self.offset_)[-self.score_history:]
+        return self
+
+    def partial_fit(self, X, groups=None):
+        """Incorpora as linhas ao histórico dos grupos e recalcula as estatísticas."""
+        values = pd.DataFrame(_as_array(X))
+        values.insert(0, '_g', _group_keys(groups, len(values)))
+        state = values if self.state_ is None else pd.concat([self.state_, values], ignore_index=True)
+        self.state_ = state.groupby('_g', sort=False).tail(self.history).reset_index(drop=True)
+
+        keys, vals = self.state_['_g'], self.state_.drop(columns='_g')
+        median = vals.groupby(keys).median()
+        mad = (vals - median.loc[keys].to_numpy()).abs().groupby(keys).median()
+        self.global_median_ = vals.median().to_numpy()
+        global_scale = MAD_SCALE * (vals - self.global_median_).abs().median().to_numpy()
+        self.global_scale_ = np.where(global_scale > 0, global_scale, 1.0)
+        self.median_ = median
+        # Desvio nulo no grupo (ex.: valor sempre igual): recorre à escala global
+        self.scale_ = (MAD_SCALE * mad).where(MAD_SCALE * mad > 0, pd.Series(self.global_scale_, index=mad.columns),
+                                              axis=1)
+        self.count_ = keys.value_counts()
+        return self
+
+    def score_samples(self, X, groups=None):
+        X = _as_array(X)
+        keys = _group_keys(groups, len(X))
+        count = self.count_.reindex(keys).fillna(0).to_numpy()
+        own = count >= self.min_samples
+        median = np.tile(self.global_median_, (len(X), 1))
+        scale = np.tile(self.global_scale_, (len(X), 1))
+        if own.any():
+            median[own] = self.median_.reindex(keys[own]).to_numpy()
+            scale[own] = self.scale_.reindex(keys[own]).to_numpy()
+        z = np.nan_to_num(np.abs(X - median) / scale, nan=0.0).max(axis=1)
+        return -np.minimum(z, self.max_z)
+
+    def update(self, X, groups=None):
+        """Pontua as linhas novas com as estatísticas atuais, depois as incorpora.
+
+        Retorna (predições, scores) apenas para as linhas novas.
+        """
+        if getattr(self, 'state_', None) is None:
+            self.fit(X, groups)
+            return np.where(self.train_scores_ < 0, -1, 1).astype(np.int8), self.train_scores_
+        raw = self.score_samples(X, groups)
+        self.partial_fit(X, groups)
+        # O limiar acompanha a contaminação nos scores mais recentes
+        self._recent_scores = np.concatenate([self._recent_scores, raw])[-self.score_history:]
+        self.offset_ = np.percentile(self._recent_scores, 100.0 * self.contamination)
+        scores = raw - self.offset_
+        return np.where(scores < 0, -1, 1).astype(np.int8), scores
+
+
+class EnsembleDetector(Detector):
+    """Combina detectores pela média ponderada dos scores normalizados.
+
+    Os `detectors` pontuam todas as linhas; os `candidate_detectors` (mais
+    caros, como o Isolation Forest) só as `candidate_fraction` mais suspeitas
+    segundo os primeiros. Cada score é normalizado pela mediana e MAD que o
+    detector teve no treino, para que escalas diferentes sejam comparáveis.
+    """
+
+    name = 'ensemble'
+
+    def __init__(self, detectors, candidate_detectors=(), candidate_fraction=0.1, weights=None,
+                 norm_sample=10_000, contamination=0.05, random_state=42):
+        super().__init__(contamination)
+        self.detectors = list(detectors)
+        self.candidate_detectors = list(candidate_detectors)
+        self.candidate_fraction = candidate_fraction
+        self.weights = weights
+        self.norm_sample = norm_sample
+        self.random_state = random_state
+
+    def _weights(self):
+        n = len(self.detectors) + len(self.candidate_detectors)
+        return np.ones(n) if self.weights is None else np.asarray(self.weights, dtype=float)
+
+    @staticmethod
+    def _norm_stats(raw):
+        center = np.median(raw)
+        scale = MAD_SCALE * np.median(np.abs(raw - center))
+        return center, (scale if scale > 0 else (np.std(raw) or 1.0))
+
+    def _fit(self, X, groups=None):
+        for d in self.detectors:
+            d.fit(X, groups)
+        rng = np.random.RandomState(self.random_state)
+        sample = rng.choice(len(X), min(self.norm_sample, len(X)), replace=False)
+        X_sample = X.iloc[sample] if hasattr(X, 'iloc') else X[sample]
+        for d in self.candidate_detectors:
+            d._fit(X, groups)
+        self.norm_ = [self._norm_stats(d.train_scores_ + d.offset_) for d in self.detectors]
+        self.norm_ += [self._norm_stats(d.score_samples(X_sample, _subset(groups, sample)))
+                       for d in self.candidate_detectors]
+
+        return self
+
+    def fit(self, X, groups=None):
+        self._fit(X, groups)
+        # Os detectores baratos já pontuaram o treino em `fit`
+        cheap = self._cheap(X, groups, [d.train_scores_ + d.offset_ for d in self.detectors])
+        self.candidate_threshold_ = np.quantile(cheap, 1.0 - self.candidate_fraction) \
+            if self.candidate_detectors else np.inf
+        raw = -self._combine(X, groups, cheap)
+        self.offset_ = np.percentile(raw, 100.0 * self.contamination)
+        self.train_scores_ = raw - self.offset_
+        return self
+
+    def _cheap(self, X, groups, raws=None):
+        """Anomalia combinada (quanto maior, mais anômalo) só dos detectores baratos."""
+        raws = raws if raws is not None else [d.score_samples(X, groups) for d in self.detectors]
+        w = self._weights()[:len(self.detectors)]
+        outlier = [(c - r) / s for r, (c, s) in zip(raws, self.norm_)]
+        return np.average(outlier, axis=0, weights=w)
+
+    def _combine(self, X, groups, cheap):
+        combined = cheap.copy()
+        candidates = np.flatnonzero(cheap >= self.candidate_threshold_)
+        self.n_candidates_ = len(candidates)
+        if self.candidate_detectors and len(candidates):
+            w = self._weights()
+            n_cheap = len(self.detectors)
+            X_cand = X.iloc[candidates] if hasattr(X, 'iloc') else X[candidates]
+            groups_cand = _subset(groups, candidates)
+            total = cheap[candidates] * w[:n_cheap].sum()
+            for k, d in enumerate(self.candidate_detectors):
+                c, s = self.norm_[n_cheap + k]
+                total += w[n_cheap + k] * (c - d.score_samples(X_cand, groups_cand)) / s
+            combined[candidates] = total / w.sum()
+        return combined
+
+    def score_samples(self, X, groups=None):
+        return -self._combine(X, groups, self._cheap(X, groups))
+
+
+def train_detector(detector: Detector, X, groups=None):
+    """Treina qualquer detector e retorna (detector, predições, scores), como `train_isolation_forest`."""
+    detector.fit(X, groups)
+    scores = detector.train_scores_
+    return detector, np.where(scores < 0, -1, 1).astype(np.int8), scores
+
+
+def cascade_ensemble(n_estimators=100, contamination=0.05, random_state=42, n_jobs=None,
+                     candidate_fraction=0.1) -> EnsembleDetector:
+    """Ensemble padrão: HBOS e z-score robusto em todas as linhas, Isolation Forest só nos candidatos."""
+    return EnsembleDetector(
+        detectors=[HBOSDetector(contamination=contamination),
+                   RobustZScoreDetector(contamination=contamination)],
+        candidate_detectors=[IsolationForestDetector(n_estimators, contamination, random_state, n_jobs)],
+        candidate_fraction=candidate_fraction,
+        contamination=contamination,
+        random_state=random_state,
+    )
+
+
+# Nomes aceitos por `make_detector` (e pela opção `--detector` do serviço)
+DETECTOR_NAMES = ('isolation_forest', 'hbos', 'lof', 'robust_z', 'ensemble')
+
+
+def make_detector(name, n_estimators=100, contamination=0.05, random_state=42, n_jobs=None) -> Detector:
+    """Cria o detector pelo nome, com os mesmos hiperparâmetros do Isolation Forest."""
+    if name == 'isolation_forest':
+        return IsolationForestDetector(n_estimators, contamination, random_state, n_jobs)
+    if name == 'hbos':
+        return HBOSDetector(contamination=contamination)
+    if name == 'lof':
+        return ApproximateLOFDetector(contamination=contamination, random_state=random_state, n_jobs=n_jobs)
+    if name == 'robust_z':
+        return RobustZScoreDetector(contamination=contamination)
+    if name == 'ensemble':
+        return cascade_ensemble(n_estimators, contamination, random_state, n_jobs)
+    raise ValueError(f"Detector desconhecido: {name} (use um de {', '.join(DETECTOR_NAMES)})")
+
+
+def detector_groups(logs):
+    """Grupos usados pelo z-score robusto: usuário e tipo de operação (os que existirem)."""
+    cols = [c for c in ('user_id', 'tipo_operacao') if c in logs.columns]
+    return logs[cols] if cols else None
@@ -1,14 +1,112 @@
-from sklearn.ensemble import IsolationForest
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs, parallel_config
 
+from data.sampling import stratified_sample
 
-def train_isolation_forest(X, n_estimators=100, contamination=0.05, random_state=42):
-    """Treina um modelo Isolation Forest para detecção de anomalias."""
+# Abaixo deste tamanho a pontuação em paralelo não compensa o custo dos processos
+MIN_ROWS_PER_JOB = 50_000
+# Treino amostrado: tamanho padrão da amostra e linhas pontuadas por bloco
+SAMPLE_SIZE = 200_000
+SCORE_CHUNK_ROWS = 500_000
+
+
+def score_parallel(model, X, n_jobs=None, method='decision_function'):
+    """Calcula `decision_function` (ou outro `method`) em blocos distribuídos entre processos."""
+    score = getattr(model, method)
+    n_jobs = effective_n_jobs(n_jobs)
+    n_chunks = min(n_jobs, max(1, len(X) // MIN_ROWS_PER_JOB))
+    if n_chunks <= 1:
+        return score(X)
+
+    bounds = np.linspace(0, len(X), n_chunks + 1, dtype=int)
+    chunks = [X[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+    scores = Parallel(n_jobs=n_chunks, backend='loky')(
+        delayed(score)(chunk) for chunk in chunks
+    )
+    return np.concatenate(scores)
+
+
+def _fit_forest(X, n_estimators, random_state, n_jobs, max_samples='auto', max_features=1.0):
+    from sklearn.ensemble import IsolationForest
+
+    # Com contamination='auto' o sklearn não pontua o treino; o limiar é definido por quem chama
     model = IsolationForest(
         n_estimators=n_estimators,
-        contamination=contamination,
+        max_samples=max_samples,
+        max_features=max_features,
+        contamination='auto',
+        random_state=random_state,
+        # Em lotes pequenos o custo de subir os processos supera o ganho
+        n_jobs=n_jobs if len(X) >= MIN_ROWS_PER_JOB else None,
+    )
+    with parallel_config(backend='loky'):
+        model.fit(X)
+    return model
+
+
+def train_isolation_forest(X, n_estimators=100, contamination=0.05, random_state=42, n_jobs=None):
+    """Treina um modelo Isolation Forest para detecção de anomalias.
+
+    Com `n_jobs` as árvores são treinadas em processos separados e os dados
+    pontuados em blocos; para o mesmo `random_state` o resultado é idêntico
+    ao do treino em um único processo.
+    """
+    model = _fit_forest(X, n_estimators, random_state, n_jobs)
+    # Uma única passada de pontuação: o limiar (o mesmo que o sklearn calcularia
+    # com `contamination`) e a predição saem dos mesmos scores
+    raw = score_parallel(model, X, n_jobs, method='score_samples')
+    model.offset_ = np.percentile(raw, 100.0 * contamination)
+    scores = raw - model.offset_
+    preds = np.where(scores < 0, -1, 1).astype(np.int8)
+
+    return model, preds, scores
+
+
+def score_chunked(model, X, n_jobs=None, chunk_size=SCORE_CHUNK_ROWS, transform=None):
+    """`decision_function` em blocos de `chunk_size` linhas, sem copiar o `X` inteiro.
+
+    Com `transform` (ex.: `FeaturePipeline.transform`), `X` são os logs e cada
+    bloco só é transformado na hora de pontuar: a matriz de features do
+    histórico inteiro nunca fica em memória.
+    """
+    scores = np.empty(len(X))
+    for start in range(0, len(X), chunk_size):
+        stop = start + chunk_size
+        chunk = X.iloc[start:stop] if hasattr(X, 'iloc') else X[start:stop]
+        if transform is not None:
+            chunk = transform(chunk)
+        scores[start:stop] = score_parallel(model, chunk, n_jobs)
+    return scores
+
+
+def fit_isolation_forest_sample(sample, n_estimators=100, contamination=0.05, random_state=42, n_jobs=None,
+                                max_samples='auto', max_features=1.0):
+    """Ajusta o Isolation Forest numa amostra e fixa no modelo (`offset_`) o limiar calibrado nela."""
+    model = _fit_forest(sample, n_estimators, random_state, n_jobs, max_samples, max_features)
+    model.offset_ = np.percentile(score_parallel(model, sample, n_jobs, method='score_samples'),
+                                  100.0 * contamination)
+    return model
+
+
+def train_isolation_forest_sampled(X, strata=None, sample_size=SAMPLE_SIZE, n_estimators=100,
+                                   contamination=0.05, random_state=42, n_jobs=None,
+                                   max_samples='auto', max_features=1.0, chunk_size=SCORE_CHUNK_ROWS):
+    """Treino aproximado para históricos grandes: ajusta numa amostra e pontua tudo em blocos.
+
+    A amostra tem até `sample_size` linhas, estratificada por `strata` (ver
+    `data.sampling.sampling_strata`); o limiar de `contamination` é calibrado
+    nela e fica fixo no modelo (`offset_`), de modo que o tempo do treino não
+    cresce com o histórico e o corte não depende do tamanho de cada lote
+    pontuado depois.
+    """
+    rows = stratified_sample(
+        strata if strata is not None else np.zeros(len(X), dtype=np.int64), sample_size,
         random_state=random_state
     )
-    preds = model.fit_predict(X)
-    scores = model.decision_function(X)
+    sample = X.iloc[rows] if hasattr(X, 'iloc') else X[rows]
+    model = fit_isolation_forest_sample(sample, n_estimators, contamination, random_state, n_jobs,
+                                        max_samples, max_features)
+    scores = score_chunked(model, X, n_jobs, chunk_size)
+    preds = np.where(scores < 0, -1, 1).astype(np.int8)
 
-    return model, preds, scores
\ No newline at end of file
+    return model, preds, scores
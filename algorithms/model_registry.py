@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import joblib
+import pandas as pd
+
+from algorithms.detectors import train_detector
+from algorithms.isolation_forest import fit_isolation_forest_sample, train_isolation_forest
+from utils.fingerprint import fingerprint
+
+# Versão do formato dos artefatos; incrementar invalida os modelos já salvos
+REGISTRY_VERSION = 1
+MODELS_DIR = os.environ.get('ANOMALY_MODELS_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models'))
+
+# Modelos já carregados neste processo, por chave (os menos usados saem primeiro)
+MAX_MODELS_IN_MEMORY = 8
+_MODELS = OrderedDict()
+_MODELS_LOCK = threading.Lock()
+# Um lock por chave em treino, para que só quem pede o mesmo modelo espere
+_KEY_LOCKS = {}
+
+# Limite do diretório de modelos: cada artefato do treino completo guarda também
+# os scores, então cada nova versão dos logs ocupa O(linhas)
+MAX_DISK_BYTES = int(os.environ.get('ANOMALY_MODELS_MAX_MB', 512)) * 1024 * 1024
+_PREFIXES = ('isolation_forest_', 'detector_')
+
+
+def data_fingerprint(X: pd.DataFrame) -> str:
+    """Calcula um hash do conteúdo (valores, índice e colunas) da matriz de features."""
+    return fingerprint(X)
+
+
+def model_key(X: pd.DataFrame, **params) -> str:
+    """Chave do modelo: conjunto de features, hiperparâmetros e impressão digital dos dados."""
+    import sklearn
+
+    payload = {
+        'version': REGISTRY_VERSION,
+        'sklearn': sklearn.__version__,
+        'features': [str(c) for c in X.columns],
+        'params': params,
+        'data': data_fingerprint(X),
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _model_path(key: str, models_dir: str, prefix='isolation_forest') -> str:
+    return os.path.join(models_dir, f"{prefix}_{key}.joblib")
+
+
+def load_or_train_isolation_forest(X, n_estimators=100, contamination=0.05, random_state=42,
+                                   n_jobs=None, models_dir=MODELS_DIR):
+    """Retorna (modelo, predições, scores) do registro, treinando apenas se as entradas mudaram.
+
+    `n_jobs` não faz parte da chave: o resultado não depende do paralelismo.
+    """
+    key = model_key(X, n_estimators=n_estimators, contamination=contamination,
+                    random_state=random_state)
+    return _load_or_train(key, _model_path(key, models_dir), models_dir, lambda: train_isolation_forest(
+        X, n_estimators=n_estimators, contamination=contamination,
+        random_state=random_state, n_jobs=n_jobs
+    ))
+
+
+def load_or_train_isolation_forest_sample(sample, n_estimators=100, contamination=0.05, random_state=42,
+                                          n_jobs=None, models_dir=MODELS_DIR):
+    """Modelo ajustado numa amostra (ver `fit_isolation_forest_sample`), do registro se a amostra já foi vista.
+
+    Só o modelo é guardado, sem scores: o artefato não cresce com o histórico.
+    """
+    key = model_key(sample, n_estimators=n_estimators, contamination=contamination,
+                    random_state=random_state, sampled=True)
+    return _load_or_train(key, _model_path(key, models_dir), models_dir, lambda: fit_isolation_forest_sample(
+        sample, n_estimators=n_estimators, contamination=contamination,
+        random_state=random_state, n_jobs=n_jobs
+    ))
+
+
+def load_or_train_detector(detector, X, groups=None, models_dir=MODELS_DIR):
+    """Como `load_or_train_isolation_forest`, para qualquer detector de `algorithms.detectors`."""
+    key = model_key(X, detector=detector.describe(),
+                    groups=fingerprint(groups) if groups is not None else None)
+    path = _model_path(key, models_dir, prefix=f"detector_{detector.name}")
+    return _load_or_train(key, path, models_dir, lambda: train_detector(detector, X, groups))
+
+
+def _read(path):
+    if os.path.exists(path):
+        try:
+            result = joblib.load(path)
+            # Marca o uso: o limite em disco descarta primeiro os menos usados
+            os.utime(path)
+            return result
+        except Exception:
+            pass  # Artefato corrompido ou incompatível: treina novamente
+    return None
+
+
+def _model_files(models_dir):
+    if not os.path.isdir(models_dir):
+        return []
+    return [os.path.join(models_dir, name) for name in os.listdir(models_dir)
+            if name.startswith(_PREFIXES) and name.endswith('.joblib')]
+
+
+def prune_models(models_dir=MODELS_DIR, max_bytes=None, keep=()):
+    """Apaga os artefatos usados há mais tempo até o total em disco caber em `max_bytes` (padrão: `MAX_DISK_BYTES`)."""
+    max_bytes = MAX_DISK_BYTES if max_bytes is None else max_bytes
+    files = []
+    for path in _model_files(models_dir):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue  # Removido por outro processo
+        files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if path in keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def _load_or_train(key, path, models_dir, train):
+    with _MODELS_LOCK:
+        if key in _MODELS:
+            _MODELS.move_to_end(key)
+            return _MODELS[key]
+        key_lock = _KEY_LOCKS.setdefault(key, threading.Lock())
+
+    # A leitura do disco e o treino seguram só o lock desta chave: consultas a
+    # outras chaves seguem enquanto um modelo é treinado
+    try:
+        with key_lock:
+            with _MODELS_LOCK:
+                if key in _MODELS:
+                    return _MODELS[key]
+            result = _read(path)
+            if result is None:
+                result = train()
+                # Grava em arquivo temporário e renomeia, para não expor artefatos parciais
+                os.makedirs(models_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                joblib.dump(result, tmp_path)
+                os.replace(tmp_path, path)
+                prune_models(models_dir, keep=(path,))
+
+            with _MODELS_LOCK:
+                _MODELS[key] = result
+                while len(_MODELS) > MAX_MODELS_IN_MEMORY:
+                    _MODELS.popitem(last=False)
+            return result
+    finally:
+        with _MODELS_LOCK:
+            if _KEY_LOCKS.get(key) is key_lock:
+                del _KEY_LOCKS[key]
+
+
+def clear_models(models_dir=MODELS_DIR):
+    """Remove os modelos da memória e do disco."""
+    with _MODELS_LOCK:
+        _MODELS.clear()
+        for path in _model_files(models_dir):
+            os.remove(path)
@@ -0,0 +1,78 @@
+from collections import deque
+
+import numpy as np
+
+from algorithms.isolation_forest import _fit_forest
+
+
+class SlidingWindowIsolationForest:
+    """Conjunto de Isolation Forests treinadas em janelas de tempo sucessivas.
+
+    Cada janela recente ganha `trees_per_window` árvores; quando há mais de
+    `n_windows` janelas, as árvores da mais antiga são descartadas. Assim o
+    custo de cada atualização é proporcional aos registros novos e o modelo
+    acompanha mudanças no padrão de tráfego.
+    """
+
+    def __init__(self, n_windows=5, trees_per_window=20, min_window_size=256,
+                 contamination=0.05, score_history=10_000, random_state=42):
+        self.n_windows = n_windows
+        self.trees_per_window = trees_per_window
+        self.min_window_size = min_window_size
+        self.contamination = contamination
+        self.score_history = score_history
+        self.random_state = random_state
+        self.models_ = deque(maxlen=n_windows)
+        self.offset_ = None
+        self._recent_scores = np.empty(0)
+        self._pending = []
+        self._n_windows_seen = 0
+
+    @property
+    def is_fitted(self) -> bool:
+        return len(self.models_) > 0
+
+    def partial_fit(self, X):
+        """Treina árvores em uma nova janela com os registros acumulados e `X`."""
+        self._pending.append(np.asarray(X, dtype=np.float32))
+        window = np.concatenate(self._pending)
+        # Janelas pequenas demais são acumuladas até atingir o tamanho mínimo,
+        # exceto no primeiro treino, que precisa existir para pontuar
+        if len(window) < self.min_window_size and self.is_fitted:
+            return self
+
+        # Só as árvores são ajustadas: o limiar é o do conjunto (`update`), não o de cada janela
+        self.models_.append(_fit_forest(
+            window, self.trees_per_window, self.random_state + self._n_windows_seen, n_jobs=None,
+        ))
+        self._n_windows_seen += 1
+        self._pending = []
+        return self
+
+    def score_samples(self, X):
+        """Score no padrão do sklearn (quanto menor, mais anômalo), combinando as janelas."""
+        X = np.asarray(X, dtype=np.float32)
+        weights = np.array([len(m.estimators_) for m in self.models_], dtype=float)
+        weights /= weights.sum()
+        # Média (ponderada pelo nº de árvores) da profundidade normalizada de cada janela
+        log_scores = sum(w * np.log2(-m.score_samples(X)) for w, m in zip(weights, self.models_))
+        return -np.exp2(log_scores)
+
+    def decision_function(self, X):
+        return self.score_samples(X) - self.offset_
+
+    def predict(self, X):
+        return np.where(self.decision_function(X) < 0, -1, 1).astype(np.int8)
+
+    def update(self, X_new):
+        """Incorpora os registros novos e retorna (predições, scores) apenas para eles."""
+        self.partial_fit(X_new)
+        raw = self.score_samples(X_new)
+
+        # O limiar acompanha a contaminação nos scores dos registros mais recentes
+        self._recent_scores = np.concatenate([self._recent_scores, raw])[-self.score_history:]
+        self.offset_ = np.percentile(self._recent_scores, 100.0 * self.contamination)
+
+        scores = raw - self.offset_
+        preds = np.where(scores < 0, -1, 1).astype(np.int8)
+        return preds, scores
@@ -1,19 +1,21 @@
 import streamlit as st
 from streamlit_autorefresh import st_autorefresh
 from datetime import datetime
-import matplotlib.pyplot as plt
-
-from algorithms.isolation_forest import train_isolation_forest
-from data.loader import load_logs
-from data.preprocessing import preprocess, preprocess_transfer_values, extract_time_features
-from visualization.charts import plot_score_distribution, plot_pca_projection, plot_hourly_anomalies
-from visualization.explainability import explain_isolation_forest
-from visualization.financial_charts import (
-    plot_login_patterns,
-    plot_transfer_anomalies,
-    plot_anomaly_summary,
-    plot_login_time_patterns
-)
+import numpy as np
+import pandas as pd
+
+from algorithms.sliding_forest import SlidingWindowIsolationForest
+from data.anomaly_store import default_store
+from data.async_loader import parse_sources
+from data.log_store import STORE_DIR
+from service.shared_pipeline import current_dataset, load_dataset, reset_dataset, score_dataset
+from service.stream import parse_address, shared_runner, stop_shared_runner
+from data.preprocessing import FeaturePipeline, default_features
+# Os módulos de gráficos (matplotlib) e de SHAP são importados dentro das seções,
+# na primeira vez em que cada uma é aberta
+from visualization.figure_cache import cached_figure, figure_to_bytes
+from visualization.rendering import POINT_BUDGET, TOP_USERS
+from utils.profiling import CodeProfile, Profiler
 
 # -- Configurações de página --
 st.set_page_config(page_title="Detecção de Anomalias em Logs", layout="wide", page_icon="./icone/icone_bank_sentinel.png")
@@ -31,12 +33,38 @@ with col3:
 
 st.title("Detecção e Exploração de Anomalias em Logs Financeiros")
 
+# -- Diagnóstico de desempenho --
+# Cada etapa da execução é medida; o painel no fim da sidebar mostra os tempos
+st.sidebar.header("Diagnóstico")
+track_memory = st.sidebar.checkbox(
+    "Medir memória por etapa (tracemalloc)", value=False,
+    help="Mede o pico de alocações de cada etapa; deixa a execução mais lenta."
+)
+capture_profile = st.sidebar.checkbox(
+    "Capturar perfil desta execução", value=False,
+    help="Registra um perfil completo (pyinstrument, se instalado, ou cProfile) desta recarga."
+)
+profiler = Profiler(track_memory=track_memory)
+code_profile = CodeProfile() if capture_profile else None
+if code_profile is not None:
+    code_profile.start()
+
 # -- Sidebar Config --
 st.sidebar.header("Configurações de Dados")
 api_url = st.sidebar.text_input(
     label="URL da API de Logs:",
     value="https://banco-facul.onrender.com/logs"
 )
+extra_sources = st.sidebar.text_area(
+    label="Fontes adicionais (uma por linha, `nome=url`):",
+    value="",
+    help="Outras APIs de logs (ex.: uma por agência), buscadas em paralelo com a principal."
+)
+page_size = st.sidebar.number_input(
+    label="Registros por página (0 = sem paginação):", min_value=0, max_value=1_000_000,
+    value=0, step=1000
+)
+sources = parse_sources(f"{api_url}\n{extra_sources}")
 
 # Configuração de recarga automática
 st.sidebar.header("Recarga Automática")
@@ -50,16 +78,18 @@ reload_interval = st.sidebar.slider(
 )
 
 # Recarregar automaticamente usando st_autorefresh
+count = None
 if auto_reload:
-    load_logs.clear()
     count = st_autorefresh(interval=reload_interval * 1000, key="auto_reload")
     st.sidebar.write(f"🔄 Página recarregada automaticamente {count} vezes.")
 else:
     st.sidebar.write("✅ Recarga automática desativada.")
 
-# Botão de recarregar manualmente
-if st.sidebar.button("🔄 Recarregar Logs Agora"):
-    load_logs.clear()
+# Botões de recarga manual: buscar só os logs novos ou descartar tudo e baixar de novo
+if st.sidebar.button("🔄 Recarregar Logs Agora", help="Busca nas APIs os logs que chegaram desde a última carga."):
+    st.session_state['manual_reload'] = st.session_state.get('manual_reload', 0) + 1
+if st.sidebar.button("♻️ Recarga Completa", help="Apaga o histórico local e baixa todos os logs de novo."):
+    reset_dataset(sources, store_base=STORE_DIR)
     st.rerun()
 
 # Exibir momento da última atualização
@@ -67,9 +97,25 @@ st.sidebar.markdown("---")
 st.sidebar.write(f"**Última atualização:** {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
 
 # -- Carregar os logs --
-logs = load_logs(api_url)
-logs = preprocess_transfer_values(logs)
-logs = extract_time_features(logs)
+# O histórico fica em Parquet local; as APIs só fornecem o que chegou desde a última carga.
+# Logs, features, modelo e scores são compartilhados por todas as sessões do processo
+# e só recalculados quando chegam linhas novas (ver `service.shared_pipeline`).
+# As APIs só são consultadas na primeira execução, nas recargas (manual ou automática),
+# a cada `LOGS_TTL_SECONDS` e quando as fontes mudam; mexer em controles de exibição
+# não busca dados nem retreina
+LOGS_TTL_SECONDS = 300
+refresh_key = (tuple(sources.items()), page_size, count, st.session_state.get('manual_reload', 0),
+               int(datetime.now().timestamp() // LOGS_TTL_SECONDS))
+dataset = current_dataset(sources) if st.session_state.get('refresh_key') == refresh_key else None
+if dataset is None:
+    dataset, source_errors = load_dataset(sources, store_base=STORE_DIR, page_size=page_size or None,
+                                          profiler=profiler)
+    st.session_state['refresh_key'] = refresh_key
+    st.session_state['source_errors'] = source_errors
+source_errors = st.session_state.get('source_errors', {})
+for name, error in source_errors.items():
+    st.sidebar.warning(f"Fonte `{name}` indisponível ({error}); seus dados podem estar desatualizados.")
+logs = dataset.logs
 
 # -- Exibição inicial --
 st.markdown(f"**Total de registros:** {len(logs)}")
@@ -77,15 +123,13 @@ st.dataframe(logs.head(10))
 
 # -- Pré-processamento e seleção de features --
 st.sidebar.header("Pré-processamento")
-all_features = [c for c in logs.columns if c not in ['id', 'descricao', 'dados_antigos', 'dados_novos', 'data']]
+all_features = default_features(logs)
 features = st.sidebar.multiselect(
     label="Features:",
     options=all_features,
     default=all_features
 )
 
-X = preprocess(logs, features)
-
 # -- Configuração do modelo Isolation Forest --
 st.sidebar.header("Modelo de Detecção de Anomalias")
 n_estimators = st.sidebar.slider(
@@ -98,67 +142,144 @@ random_state = st.sidebar.number_input(
     label="Random State:", value=42
 )
 
-# -- Treinamento e pontuação --
-model, preds, scores = train_isolation_forest(
-    X, n_estimators=n_estimators, contamination=contamination, random_state=random_state
+DETECTORS = {
+    "Isolation Forest": 'isolation_forest',
+    "HBOS (histogramas)": 'hbos',
+    "LOF aproximado": 'lof',
+    "Z-score robusto por usuário e operação": 'robust_z',
+    "Ensemble em cascata": 'ensemble',
+}
+detector_name = st.sidebar.selectbox(
+    "Detector:", list(DETECTORS),
+    help="O ensemble pontua todos os registros com os detectores baratos (HBOS e z-score) "
+         "e só passa os mais suspeitos pelo Isolation Forest."
 )
 
-logs['anomaly_score'] = scores
-logs['anomaly'] = preds
-
-# -- Explicabilidade com SHAP --
-st.subheader("Explicação de Anomalias (SHAP)")
-idx = st.number_input(
-    label="Índice do registro para explicar:",
-    min_value=0,
-    max_value=len(X) - 1,
-    value=0
+sample_size = st.sidebar.number_input(
+    label="Amostra de treino (linhas, 0 = todas):", min_value=0, max_value=5_000_000,
+    value=0, step=50_000,
+    help="Só para o Isolation Forest: ajusta o modelo numa amostra estratificada por tabela, "
+         "operação e período, fixa o limiar nela e pontua todos os registros em blocos."
 )
-fig_shap = explain_isolation_forest(model, X, idx)
-st.pyplot(fig=fig_shap)
-
-# -- Visualizações de anomalias --
-st.subheader("Distribuição de Scores")
-fig_hist = plot_score_distribution(logs['anomaly_score'])
-st.pyplot(fig=fig_hist)
 
-#st.subheader("PCA 2D para Anomalias")
-#fig_pca = plot_pca_projection(X, preds, random_state)
-#st.pyplot(fig=fig_pca)
-
-if 'data' in logs.columns:
-    st.subheader("Série Temporal de Anomaly Score")
-
-    # Filtrar apenas anomalias (anomaly = -1)
-    anomalies_only = logs[logs['anomaly'] == -1].copy()
+incremental = st.sidebar.checkbox(
+    "Treinamento incremental (janelas deslizantes)", value=False,
+    help="Treina árvores apenas sobre os logs novos e descarta as das janelas mais antigas "
+         "(sempre com o Isolation Forest)."
+)
 
-    # Criar figura com Matplotlib para maior controle
-    fig, ax = plt.subplots(figsize=(12, 6))
+# -- Configuração das visualizações --
+st.sidebar.header("Visualização")
+point_budget = st.sidebar.number_input(
+    label="Máximo de pontos por gráfico:", min_value=500, max_value=100_000,
+    value=POINT_BUDGET, step=500,
+    help="Acima deste limite os gráficos agregam ou reduzem os dados."
+)
+top_users = st.sidebar.number_input(
+    label="Usuários no gráfico de logins:", min_value=5, max_value=200, value=TOP_USERS
+)
 
-    # Plotar cada anomalia como um ponto
-    ax.scatter(anomalies_only['data'], anomalies_only['anomaly_score'],
-               color='red', s=50, alpha=0.7)
+# -- Ingestão em tempo real --
+st.sidebar.header("Tempo Real")
+stream_enabled = st.sidebar.checkbox(
+    "Receber eventos em tempo real", value=False,
+    help="Escuta eventos JSON (um por linha, no formato da API) num socket e os pontua em "
+         "micro-lotes com o modelo atual, sem reexecutar a página."
+)
+stream_address = st.sidebar.text_input(
+    label="Socket (host:porta ou caminho UNIX):", value="127.0.0.1:9009"
+)
+stream_sink = st.sidebar.text_input(
+    label="Arquivo JSONL para as anomalias (opcional):", value=""
+)
 
-    # Adicionar linha conectando os pontos para visualizar tendência
-    ax.plot(anomalies_only['data'], anomalies_only['anomaly_score'],
-            color='gray', alpha=0.5, linestyle='--')
+# -- Pré-processamento, treinamento e pontuação --
+if incremental:
+    # O pipeline é ajustado uma vez e só os registros ainda não pontuados são
+    # transformados e passam pelo modelo; mudanças de features ou
+    # hiperparâmetros reiniciam o conjunto de janelas
+    signature = (tuple(sources.items()), tuple(features), n_estimators, contamination, random_state)
+    sliding = st.session_state.get('sliding_forest')
+    if sliding is None or sliding['signature'] != signature or len(logs) < len(sliding['scores']):
+        sliding = {
+            'signature': signature,
+            'pipeline': FeaturePipeline(features).fit(logs),
+            'model': SlidingWindowIsolationForest(
+                trees_per_window=max(1, n_estimators // 5),
+                contamination=contamination,
+                random_state=random_state,
+            ),
+            'X': None,
+            'preds': np.empty(0, dtype=np.int8),
+            'scores': np.empty(0),
+        }
+    if len(logs) > len(sliding['scores']):
+        n_new = len(logs) - len(sliding['scores'])
+        with profiler.stage('preprocess', rows=n_new):
+            X_new = sliding['pipeline'].transform(logs.iloc[len(sliding['scores']):])
+        with profiler.stage('train_isolation_forest', rows=n_new):
+            new_preds, new_scores = sliding['model'].update(X_new)
+        # Só as anomalias dos registros novos vão para o histórico
+        default_store().record(
+            logs.iloc[len(sliding['scores']):].assign(anomaly_score=new_scores, anomaly=new_preds),
+            f"sliding_forest-{n_estimators}-{contamination}-{random_state}", fonte=next(iter(sources))
+        )
+        sliding['X'] = X_new if sliding['X'] is None else pd.concat([sliding['X'], X_new])
+        sliding['preds'] = np.concatenate([sliding['preds'], new_preds])
+        sliding['scores'] = np.concatenate([sliding['scores'], new_scores])
+    st.session_state['sliding_forest'] = sliding
+    X, model, preds, scores = sliding['X'], sliding['model'], sliding['preds'], sliding['scores']
+    pipeline, result_token = sliding['pipeline'], None
+    model_version = f"sliding_forest-{n_estimators}-{contamination}-{random_state}"
+    # Os logs são compartilhados entre sessões: as colunas de resultado vão numa cópia rasa
+    logs = logs.copy(deep=False)
+    logs['anomaly_score'] = scores
+    logs['anomaly'] = preds
+else:
+    # Um único ajuste por versão dos logs e parâmetros, reaproveitado por todas as sessões
+    scored, current = score_dataset(
+        dataset, features, detector=DETECTORS[detector_name], n_estimators=n_estimators,
+        contamination=contamination, random_state=random_state, n_jobs=-1, profiler=profiler,
+        anomaly_store=default_store(), sample_size=int(sample_size) or None
+    )
+    if not current:
+        st.info("Outra sessão está atualizando o modelo; exibindo o resultado anterior.")
+    logs, X, model, preds, scores = scored.logs, scored.X, scored.model, scored.preds, scored.scores
+    pipeline, result_token, model_version = scored.pipeline, scored.token, scored.model_version
+
+stream = None
+if stream_enabled:
+    # Só troca o modelo do streaming quando os dados ou o modelo mudam
+    stream_signature = (dataset.token, result_token, incremental, tuple(features), detector_name,
+                        n_estimators, contamination, random_state, sample_size)
+    try:
+        stream = shared_runner(
+            parse_address(stream_address), stream_signature,
+            lambda: (pipeline, model, dataset.user_features.fork()),
+            sink_path=stream_sink or None
+        )
+    except (OSError, ValueError) as e:
+        st.sidebar.error(f"Não foi possível escutar em `{stream_address}`: {e}")
+else:
+    stop_shared_runner(parse_address(stream_address))
 
-    # Formatação
-    ax.set_title('Série Temporal de Anomaly Score (Anomalias Individuais)')
-    ax.set_ylabel('Anomaly Score')
-    ax.set_xlabel('Data')
 
-    # Rotacionar datas para melhor visualização
-    plt.xticks(rotation=45)
+def log_columns(*names):
+    """Recorte dos logs só com as colunas usadas por um gráfico (a chave do cache de figuras)."""
+    return logs[[c for c in names if c in logs.columns]]
 
-    # Adicionar grade
-    ax.grid(True, linestyle='--', alpha=0.7)
-    plt.tight_layout()
 
-    # Exibir gráfico
-    st.pyplot(fig)
+def show_chart(plot_func, data, *args, **kwargs):
+    """Exibe o gráfico (do cache, se possível) registrando o tempo como uma etapa própria."""
+    # Com o resultado compartilhado, o token da versão substitui o hash dos dados;
+    # arrays posicionais (scores, predições) são da mesma versão, valores simples entram na chave
+    key = None if result_token is None else (
+        result_token, tuple(data.columns) if isinstance(data, pd.DataFrame) else data.name,
+        tuple(arg for arg in args if np.isscalar(arg)), tuple(sorted(kwargs.items()))
+    )
+    with profiler.stage(f"chart:{plot_func.__name__}", rows=len(data)):
+        st.image(cached_figure(plot_func, data, *args, key=key, **kwargs))
 
-st.subheader("Registros Anômalos Detectados")
 
 # Use um conjunto para garantir unicidade das colunas
 cols_set = {'id', 'data', 'anomaly_score'}
@@ -173,32 +294,186 @@ if 'dados_novos' in logs.columns:
 # Converter o conjunto de volta para uma lista para manter uma ordem razoável (essenciais primeiro)
 cols_show = ['id', 'data', 'anomaly_score'] + sorted(list(cols_set - {'id', 'data', 'anomaly_score'}))
 
-st.dataframe(
-    logs[logs['anomaly'] == -1][cols_show]
-    .sort_values('anomaly_score')
-)
 
-# Adicione esta seção antes do st.success()
-st.subheader("🕰️ Análise de Anomalias por Horário")
-fig_hour_anomalies = plot_hourly_anomalies(logs)
-st.pyplot(fig=fig_hour_anomalies)
+# -- Seções sob demanda --
+# Cada aba só é calculada quando está aberta, e os controles dentro dela
+# (fragmentos) reexecutam apenas a própria seção, sem recarregar dados nem modelo
+def lazy_tabs(labels, key):
+    """Abas com execução sob demanda; em versões do Streamlit sem suporte, todas são executadas."""
+    try:
+        return st.tabs(labels, key=key, on_change='rerun')
+    except TypeError:
+        return st.tabs(labels)
+
+
+def is_open(tab) -> bool:
+    return getattr(tab, 'open', None) is not False
+
+
+@st.fragment
+def anomalies_section():
+    st.subheader("Registros Anômalos Detectados")
+    # Consulta o histórico gravado (SQLite indexado) em vez de filtrar e ordenar o frame inteiro
+    anomaly_store = default_store()
+    bounds = anomaly_store.bounds()
+    with st.expander("Filtros do histórico", expanded=False):
+        only_current = st.checkbox("Somente o modelo atual", value=True)
+        col_period, col_user, col_op = st.columns(3)
+        period = col_period.date_input(
+            "Período:",
+            value=(bounds['start'].date(), bounds['end'].date()) if bounds['start'] is not None else (),
+        )
+        user_filter = col_user.text_input("Usuário (user_id):", value="")
+        op_filter = col_op.multiselect("Operação:", anomaly_store.operations())
+        col_score, col_order, col_page_size = st.columns(3)
+        score_min, score_max = (bounds['min_score'], bounds['max_score']) \
+            if bounds['min_score'] is not None and bounds['min_score'] < bounds['max_score'] else (-1.0, 0.0)
+        score_band = col_score.slider("Faixa de score:", min_value=float(score_min), max_value=float(score_max),
+                                      value=(float(score_min), float(score_max)))
+        order = col_order.selectbox("Ordenar por:", ['score', 'data'],
+                                    format_func={'score': "Score (mais anômalos)", 'data': "Data (recentes)"}.get)
+        page_size_table = col_page_size.selectbox("Linhas por página:", [50, 100, 500], index=1)
+
+    history_filters = {
+        'model_version': model_version if only_current else None,
+        'user_id': int(user_filter) if user_filter.strip().isdigit() else None,
+        'tipo_operacao': op_filter or None,
+        'min_score': score_band[0],
+        'max_score': score_band[1],
+    }
+    if len(period) == 2:
+        history_filters['start'] = pd.Timestamp(period[0])
+        history_filters['end'] = pd.Timestamp(period[1]) + pd.Timedelta(days=1)
+    total = anomaly_store.count(**history_filters)
+    n_pages = max(1, -(-total // page_size_table))
+    page = st.number_input("Página:", min_value=1, max_value=n_pages, value=1)
+    st.caption(f"{total} anomalias no histórico — página {page} de {n_pages}")
+    st.dataframe(
+        anomaly_store.query(order=order, limit=page_size_table, offset=(page - 1) * page_size_table,
+                            **history_filters),
+        hide_index=True
+    )
+
+    from visualization.charts import plot_hourly_anomalies
+
+    st.subheader("🕰️ Análise de Anomalias por Horário")
+    show_chart(plot_hourly_anomalies, log_columns('hora', 'anomaly'))
+
+
+@st.fragment
+def shap_section():
+    # -- Explicabilidade com SHAP --
+    from visualization.explainability import explain_isolation_forest, precompute_top_anomalies
+
+    st.subheader("Explicação de Anomalias (SHAP)")
+    idx = st.number_input(
+        label="Índice do registro para explicar:",
+        min_value=0,
+        max_value=len(X) - 1,
+        value=0
+    )
+    with profiler.stage('shap', rows=1):
+        fig_shap = explain_isolation_forest(model, X, idx, token=result_token)
+        # Adianta as explicações das anomalias mais fortes para a navegação ser imediata
+        precompute_top_anomalies(model, X, scores, token=result_token)
+        st.image(figure_to_bytes(fig_shap))
+
+
+def scores_section():
+    # -- Visualizações de anomalias --
+    from visualization.charts import plot_anomaly_time_series, plot_score_distribution
+
+    st.subheader("Distribuição de Scores")
+    show_chart(plot_score_distribution, logs['anomaly_score'])
+
+    #st.subheader("PCA 2D para Anomalias")
+    #from visualization.charts import plot_pca_projection
+    #fig_pca = plot_pca_projection(X, preds, random_state)
+    #st.pyplot(fig=fig_pca)
+
+    if 'data' in logs.columns:
+        st.subheader("Série Temporal de Anomaly Score")
+        show_chart(plot_anomaly_time_series, log_columns('data', 'anomaly_score', 'anomaly'),
+                   point_budget=point_budget)
+
+
+def financial_section():
+    from visualization.financial_charts import (
+        plot_anomaly_summary, plot_login_patterns, plot_login_time_patterns, plot_transfer_anomalies
+    )
+
+    st.header("📈 Análises Específicas para Contexto Financeiro")
+
+    st.subheader("🔐 Análise de Padrões de Login")
+    show_chart(plot_login_patterns, log_columns('tabela', 'descricao', 'user_id'), top_users=top_users)
+
+    st.subheader("💸 Detecção de Transferências Anômalas")
+    show_chart(
+        plot_transfer_anomalies,
+        log_columns('id', 'tabela', 'data', 'dados_novos', 'valor_transferencia'),
+        scores,
+        point_budget=point_budget,
+    )
+
+    st.subheader("📊 Resumo de Anomalias por Operação")
+    show_chart(plot_anomaly_summary, log_columns('id', 'tipo_operacao'), preds, scores)
+
+    st.subheader("🕒 Análise de Horários de Login")
+    show_chart(plot_login_time_patterns, log_columns('tabela', 'data'))
+
+
+@st.fragment(run_every=2)
+def stream_panel(scorer):
+    """Atualiza só este painel a cada 2 s com as anomalias recebidas pelo socket."""
+    stats = scorer.stats()
+    col_events, col_anomalies, col_latency = st.columns(3)
+    col_events.metric("Eventos recebidos", stats['eventos'])
+    col_anomalies.metric("Anomalias", stats['anomalias'])
+    latency = stats['latencia_p95_s']
+    col_latency.metric("Latência p95", f"{latency:.2f} s" if latency is not None else "-")
+    if stats['rejeitados']:
+        st.caption(f"{stats['rejeitados']} eventos descartados por não poderem ser pontuados.")
+    if stats['ultimo_erro']:
+        st.warning(f"Último lote com erro: {stats['ultimo_erro']}")
+    recent = scorer.recent_anomalies()
+    if recent.empty:
+        st.info("Nenhuma anomalia recebida ainda.")
+    else:
+        st.dataframe(recent[[c for c in cols_show if c in recent.columns]], hide_index=True)
+
+
+sections = {
+    "🔎 Registros Anômalos": anomalies_section,
+    "🧠 Explicação (SHAP)": shap_section,
+    "📉 Scores": scores_section,
+    "💰 Contexto Financeiro": financial_section,
+}
+if stream is not None:
+    def stream_section():
+        st.subheader("⚡ Anomalias em Tempo Real")
+        st.caption("Eventos recebidos pelo socket; não entram no histórico analisado nas outras abas.")
+        stream_panel(stream.scorer)
+
+    sections["⚡ Tempo Real"] = stream_section
+
+for tab, render in zip(lazy_tabs(list(sections), key='sections'), sections.values()):
+    if is_open(tab):
+        with tab:
+            render()
 
 st.success("Análise de anomalias completa!")
 
-st.header("📈 Análises Específicas para Contexto Financeiro")
-
-st.subheader("🔐 Análise de Padrões de Login")
-fig_login = plot_login_patterns(logs)
-st.pyplot(fig=fig_login)
-
-st.subheader("💸 Detecção de Transferências Anômalas")
-fig_transfer = plot_transfer_anomalies(logs, scores)
-st.pyplot(fig=fig_transfer)
-
-st.subheader("📊 Resumo de Anomalias por Operação")
-fig_summary = plot_anomaly_summary(logs, preds, scores)
-st.pyplot(fig=fig_summary)
-
-st.subheader("🕒 Análise de Horários de Login")
-fig_login_time = plot_login_time_patterns(logs)
-st.pyplot(fig=fig_login_time)
+# -- Painel de diagnóstico --
+if code_profile is not None:
+    code_profile.stop()
+profiler.stop()
+with st.sidebar.expander("⏱️ Tempos desta execução", expanded=False):
+    st.write(f"**Total medido:** {profiler.total_seconds:.2f} s")
+    st.dataframe(pd.DataFrame(profiler.to_records()), hide_index=True)
+    st.download_button("Exportar JSON", profiler.to_json(),
+                       file_name="pipeline_stages.json", mime="application/json")
+    st.download_button("Exportar Prometheus", profiler.to_prometheus(),
+                       file_name="pipeline_stages.prom", mime="text/plain")
+    if code_profile is not None:
+        st.caption(f"Perfil ({code_profile.kind})")
+        st.code(code_profile.report(), language=None)
@@ -0,0 +1,58 @@
+"""Benchmark do carregamento de logs: caminho atual (`resp.json()` + `json_normalize`)
+versus modo streaming, medindo tempo e pico de memória (RSS).
+
+Uso:
+    python -m benchmarks.bench_loader --rows 2000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from data.synthetic import generate_logs, write_api_json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run_mode(url, stream):
+    """Executa um modo em um processo novo e devolve (segundos, pico de RSS em MB)."""
+    code = (
+        "import resource, sys, time\n"
+        "from data.loader import fetch_logs\n"
+        "t0 = time.perf_counter()\n"
+        f"df = fetch_logs({url!r}, stream={stream})\n"
+        "elapsed = time.perf_counter() - t0\n"
+        "rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024\n"
+        "print(elapsed, rss, len(df))\n"
+    )
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                         capture_output=True, text=True).stdout.split()
+    return float(out[0]), float(out[1]), int(out[2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # O payload é gerado neste processo; cada modo é medido em um processo novo
+        write_api_json(generate_logs(args.rows)[0], os.path.join(tmp, 'logs'))
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'http.server', '8765', '--bind', '127.0.0.1', '--directory', tmp],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            time.sleep(1)
+            url = 'http://127.0.0.1:8765/logs'
+            print(f"{'modo':<10} {'linhas':>10} {'tempo (s)':>10} {'pico RSS (MB)':>14}")
+            for name, stream in [('atual', False), ('streaming', True)]:
+                elapsed, rss, n = _run_mode(url, stream)
+                print(f"{name:<10} {n:>10} {elapsed:>10.2f} {rss:>14.0f}")
+        finally:
+            server.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Verificação de regressão de memória: pico de RSS do caminho de dados
+(pré-processamento, treino, pontuação e agregações dos gráficos) por milhão de linhas.
+
+Sai com código 1 se algum tamanho passar do orçamento, para uso em CI.
+
+Uso:
+    python -m benchmarks.bench_memory --rows 1000000 2000000 --budget-mb 400
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Orçamento padrão de pico de RSS, em MB por milhão de linhas
+BUDGET_MB_PER_MILLION = 400
+
+_CODE = """
+import resource, sys
+import matplotlib
+matplotlib.use('Agg')
+import pandas as pd
+from algorithms.isolation_forest import train_isolation_forest
+from data.preprocessing import default_features, preprocess
+from service.scoring import prepare_logs
+from visualization.figure_cache import figure_to_bytes
+from visualization.financial_charts import plot_anomaly_summary, plot_transfer_anomalies
+from visualization.charts import plot_anomaly_time_series
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+logs = pd.read_pickle({path!r})
+base = rss_mb()
+logs = prepare_logs(logs)
+X = preprocess(logs, default_features(logs))
+model, preds, scores = train_isolation_forest(X)
+logs['anomaly_score'] = scores
+logs['anomaly'] = preds
+figure_to_bytes(plot_anomaly_time_series(logs[['data', 'anomaly_score', 'anomaly']]))
+figure_to_bytes(plot_transfer_anomalies(logs, scores))
+figure_to_bytes(plot_anomaly_summary(logs, preds, scores))
+print(rss_mb() - base)
+"""
+
+
+def measure(rows) -> float:
+    """Pico de RSS (MB) acima do já ocupado pelos logs carregados, medido em um processo novo.
+
+    Os logs sintéticos são gerados aqui e lidos prontos pelo processo medido,
+    para que o pico da geração não mascare o do pipeline.
+    """
+    from data.synthetic import generate_logs
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'logs.pkl')
+        generate_logs(rows)[0].to_pickle(path)
+        out = subprocess.run([sys.executable, '-c', _CODE.format(path=path)], cwd=ROOT, check=True,
+                             capture_output=True, text=True).stdout.split()
+    return float(out[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--budget-mb', type=float, default=BUDGET_MB_PER_MILLION,
+                        help="Pico de RSS permitido por milhão de linhas (MB).")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'linhas':>10} {'pico (MB)':>10} {'MB/milhão':>10} {'orçamento':>10}")
+    for rows in args.rows:
+        peak = measure(rows)
+        per_million = peak / (rows / 1_000_000)
+        ok = per_million <= args.budget_mb
+        failed |= not ok
+        print(f"{rows:>10} {peak:>10.0f} {per_million:>10.0f} {args.budget_mb:>10.0f} {'ok' if ok else 'ESTOUROU'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
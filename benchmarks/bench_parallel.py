@@ -0,0 +1,39 @@
+"""Benchmark de treino e pontuação em paralelo do Isolation Forest, conferindo
+que os scores são idênticos aos do processo único.
+
+Uso:
+    python -m benchmarks.bench_parallel --rows 10000000 --jobs 1 2 4 8 16 32
+"""
+import argparse
+import time
+
+import numpy as np
+
+from algorithms.isolation_forest import train_isolation_forest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--features', type=int, default=8)
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(42)
+    X = rng.randn(args.rows, args.features).astype(np.float32)
+
+    print(f"{'n_jobs':>6} {'tempo (s)':>10} {'speedup':>8} {'idêntico':>9}")
+    base_time, base_scores = None, None
+    for n_jobs in args.jobs:
+        t0 = time.perf_counter()
+        _, _, scores = train_isolation_forest(X, n_estimators=args.n_estimators, n_jobs=n_jobs)
+        elapsed = time.perf_counter() - t0
+        if base_scores is None:
+            base_time, base_scores = elapsed, scores
+        print(f"{n_jobs:>6} {elapsed:>10.2f} {base_time / elapsed:>8.2f} "
+              f"{str(np.array_equal(scores, base_scores)):>9}")
+
+
+if __name__ == '__main__':
+    main()
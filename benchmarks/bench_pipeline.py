@@ -0,0 +1,152 @@
+"""Benchmark do pipeline completo sobre logs sintéticos: carga, pré-processamento,
+treino, pontuação, SHAP e gráficos, com vazão por etapa e precisão/recall da
+detecção das anomalias injetadas.
+
+Uso:
+    python -m benchmarks.bench_pipeline --sizes 10000 100000 1000000 10000000
+    python -m benchmarks.bench_pipeline --sizes 100000 --stages score --output resultados.json
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+from algorithms.isolation_forest import score_parallel, train_isolation_forest
+from data.loader import fetch_logs
+from data.preprocessing import FeaturePipeline, default_features
+from data.synthetic import generate_logs, write_api_json
+from service.scoring import prepare_logs
+from utils.profiling import Profiler
+from visualization.charts import plot_anomaly_time_series, plot_hourly_anomalies, plot_score_distribution
+from visualization.explainability import shap_values_for
+from visualization.figure_cache import figure_to_bytes
+from visualization.financial_charts import (
+    plot_anomaly_summary, plot_login_patterns, plot_login_time_patterns, plot_transfer_anomalies
+)
+
+STAGES = ['loader', 'score', 'shap', 'charts']
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _load(logs, profiler):
+    """Serve os logs como a API em um processo à parte e os carrega em modo streaming."""
+    with tempfile.TemporaryDirectory() as tmp:
+        write_api_json(logs, os.path.join(tmp, 'logs'))
+        port = _free_port()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'http.server', str(port), '--bind', '127.0.0.1', '--directory', tmp],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            time.sleep(1)
+            with profiler.stage('loader', rows=len(logs)):
+                fetch_logs(f"http://127.0.0.1:{port}/logs", stream=True)
+        finally:
+            server.terminate()
+
+
+def _charts(logs, preds, scores, profiler):
+    charts = [
+        (plot_score_distribution, (logs['anomaly_score'],)),
+        (plot_anomaly_time_series, (logs,)),
+        (plot_hourly_anomalies, (logs,)),
+        (plot_login_patterns, (logs,)),
+        (plot_transfer_anomalies, (logs, scores)),
+        (plot_anomaly_summary, (logs, preds, scores)),
+        (plot_login_time_patterns, (logs,)),
+    ]
+    for plot_func, args in charts:
+        with profiler.stage(f"chart:{plot_func.__name__}", rows=len(logs)):
+            figure_to_bytes(plot_func(*args))
+
+
+def detection_quality(preds, labels) -> dict:
+    """Precisão, recall e F1 das anomalias previstas (-1) frente às injetadas."""
+    found = preds == -1
+    tp = int((found & labels).sum())
+    precision = tp / found.sum() if found.any() else 0.0
+    recall = tp / labels.sum() if labels.any() else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'precision': round(float(precision), 4), 'recall': round(float(recall), 4), 'f1': round(float(f1), 4)}
+
+
+def run(rows, stages, anomaly_rate, n_estimators, contamination, n_jobs, shap_rows, seed) -> dict:
+    """Executa as etapas escolhidas sobre `rows` logs sintéticos e devolve as medições."""
+    logs, labels = generate_logs(rows, anomaly_rate=anomaly_rate, seed=seed)
+    profiler = Profiler()
+
+    if 'loader' in stages:
+        _load(logs, profiler)
+    logs = prepare_logs(logs, profiler)
+    with profiler.stage('preprocess', rows=rows):
+        X = FeaturePipeline(default_features(logs)).fit_transform(logs)
+    # O treino inclui a primeira pontuação, como no dashboard; `score` mede uma nova passada
+    with profiler.stage('train', rows=rows):
+        model, preds, scores = train_isolation_forest(
+            X, n_estimators=n_estimators, contamination=contamination, random_state=seed, n_jobs=n_jobs)
+    if 'score' in stages:
+        with profiler.stage('score', rows=rows):
+            score_parallel(model, X, n_jobs)
+    if 'shap' in stages:
+        top = np.argsort(scores)[:shap_rows]
+        with profiler.stage('shap', rows=len(top)):
+            shap_values_for(model, X, top)
+    if 'charts' in stages:
+        logs['anomaly_score'] = scores
+        logs['anomaly'] = preds
+        _charts(logs, preds, scores, profiler)
+
+    records = profiler.to_records()
+    for s in records:
+        s['rows_per_second'] = round(s['rows'] / s['seconds'], 1) if s['seconds'] else None
+    return {'rows': rows, 'stages': records, 'quality': detection_quality(preds, labels)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES,
+                        help="Etapas opcionais; pré-processamento e treino sempre rodam.")
+    parser.add_argument('--anomaly-rate', type=float, default=0.01)
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--contamination', type=float, default=0.05)
+    parser.add_argument('--n-jobs', type=int, default=None)
+    parser.add_argument('--shap-rows', type=int, default=10, help="Registros explicados na etapa SHAP.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Arquivo JSON com os resultados, para comparar entre versões.")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.sizes:
+        result = run(rows, args.stages, args.anomaly_rate, args.n_estimators, args.contamination,
+                     args.n_jobs, args.shap_rows, args.seed)
+        results.append(result)
+        print(f"\n== {rows} linhas ==")
+        print(f"{'etapa':<36} {'tempo (s)':>10} {'linhas/s':>12} {'RSS máx. (MB)':>14}")
+        for s in result['stages']:
+            # Maior RSS do processo até o fim da etapa (acumulado, não só da etapa)
+            rss = s['process_max_rss_bytes'] / 2 ** 20 if s['process_max_rss_bytes'] else float('nan')
+            print(f"{s['stage']:<36} {s['seconds']:>10.3f} {s['rows_per_second'] or 0:>12.0f} {rss:>14.0f}")
+        q = result['quality']
+        print(f"precisão: {q['precision']:.3f}  recall: {q['recall']:.3f}  F1: {q['f1']:.3f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'created_at': time.time(), 'args': vars(args), 'results': results}, f,
+                      ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
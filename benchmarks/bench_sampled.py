@@ -0,0 +1,73 @@
+"""Benchmark do treino amostrado: tempo, pico de memória e limiar do Isolation Forest
+ajustado em todas as linhas versus numa amostra estratificada, para históricos de
+tamanhos crescentes.
+
+No modo amostrado o pipeline é ajustado na amostra e o histórico é transformado e
+pontuado em blocos, sem montar a matriz de features inteira; a coluna "em comum"
+indica quanto das anomalias do treino completo também são marcadas.
+
+Uso:
+    python -m benchmarks.bench_sampled --rows 500000 1000000 2000000 --sample-size 200000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from algorithms.isolation_forest import fit_isolation_forest_sample, score_chunked, train_isolation_forest
+from data.preprocessing import FeaturePipeline, default_features
+from data.sampling import sampling_strata, stratified_sample
+from data.synthetic import generate_logs
+from service.scoring import prepare_logs
+
+
+def measure(func):
+    """Executa `func` e retorna (resultado, segundos, pico de memória alocada em MB)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def train_sampled(logs, features, sample_size, n_jobs):
+    """Mesmo caminho de `service.scoring.fit_sampled`, sem o registro de modelos (que evitaria o treino)."""
+    sample = logs.iloc[stratified_sample(sampling_strata(logs), sample_size)]
+    pipeline = FeaturePipeline(features).fit(sample)
+    model = fit_isolation_forest_sample(pipeline.transform(sample), n_jobs=n_jobs)
+    scores = score_chunked(model, logs, n_jobs, transform=pipeline.transform)
+    return model, np.where(scores < 0, -1, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[500_000, 1_000_000, 2_000_000])
+    parser.add_argument('--sample-size', type=int, default=200_000)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'modo':>10} {'tempo (s)':>10} {'pico (MB)':>10} {'limiar':>8} "
+          f"{'anomalias':>10} {'em comum':>9}")
+    for rows in args.rows:
+        logs = prepare_logs(generate_logs(rows)[0])
+        features = default_features(logs)
+
+        (model, preds, _), full_time, full_peak = measure(
+            lambda: train_isolation_forest(FeaturePipeline(features).fit_transform(logs), n_jobs=args.n_jobs)
+        )
+        print(f"{rows:>10} {'completo':>10} {full_time:>10.2f} {full_peak:>10.0f} {model.offset_:>8.4f} "
+              f"{(preds == -1).mean():>10.2%} {'':>9}")
+
+        (sampled, sampled_preds), sampled_time, sampled_peak = measure(
+            lambda: train_sampled(logs, features, args.sample_size, args.n_jobs)
+        )
+        both = np.sum((preds == -1) & (sampled_preds == -1)) / max(np.sum(preds == -1), 1)
+        print(f"{rows:>10} {'amostrado':>10} {sampled_time:>10.2f} {sampled_peak:>10.0f} {sampled.offset_:>8.4f} "
+              f"{(sampled_preds == -1).mean():>10.2%} {both:>9.0%}")
+
+
+if __name__ == '__main__':
+    main()
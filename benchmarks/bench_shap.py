@@ -0,0 +1,62 @@
+"""Benchmark das explicações SHAP: matriz completa (caminho antigo) versus
+cálculo apenas das linhas pedidas com cache.
+
+Uso:
+    python -m benchmarks.bench_shap --rows 5000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import shap
+
+from algorithms.isolation_forest import train_isolation_forest
+from visualization.explainability import shap_values_for
+
+
+def full_matrix(model, X, idx):
+    """Caminho antigo: explainer com todo X de fundo e `shap_values(X)` inteiro."""
+    explainer = shap.TreeExplainer(model, data=X, model_output='raw')
+    return explainer.shap_values(X)[idx]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--features', type=int, default=8)
+    parser.add_argument('--browse', type=int, default=20, help="Registros navegados em sequência.")
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(42)
+    X = pd.DataFrame(rng.randn(args.rows, args.features),
+                     columns=[f"f{i}" for i in range(args.features)])
+    model, _, scores = train_isolation_forest(X)
+    top = np.argsort(scores)[:args.browse]
+
+    t0 = time.perf_counter()
+    full_matrix(model, X, int(top[0]))
+    full = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    shap_values_for(model, X, [top[0]])
+    first = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for idx in top:
+        shap_values_for(model, X, [idx])
+    t0_cached = time.perf_counter()
+    for idx in top:
+        shap_values_for(model, X, [idx])
+    cached = time.perf_counter() - t0_cached
+    browse = t0_cached - t0
+
+    print(f"linhas: {args.rows}")
+    print(f"matriz completa (1 registro):         {full:8.3f} s")
+    print(f"sob demanda (1º registro):            {first:8.3f} s")
+    print(f"sob demanda ({args.browse} registros):          {browse:8.3f} s")
+    print(f"cache ({args.browse} registros já calculados):  {cached:8.3f} s")
+
+
+if __name__ == '__main__':
+    main()
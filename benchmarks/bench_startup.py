@@ -0,0 +1,81 @@
+"""Benchmark de inicialização: tempo de importação (`python -X importtime`) de cada ponto
+de entrada, em um processo novo, com os pacotes que mais pesam.
+
+Sai com código 1 se um ponto de entrada leve (carga, pontuação, streaming ou o
+início do dashboard) importar algum pacote pesado que só deveria ser carregado
+quando a funcionalidade é usada (shap, matplotlib, ...), para uso em CI.
+
+Uso:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeat 5 --top 8
+"""
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Pacotes carregados só sob demanda (SHAP, gráficos e PCA)
+HEAVY = ('shap', 'numba', 'matplotlib', 'sklearn.decomposition')
+
+# Ponto de entrada -> (código importado, se deve evitar os pacotes de HEAVY)
+ENTRY_POINTS = {
+    'carga': ('import data.async_loader', True),
+    'camada compartilhada': ('import service.shared_pipeline', True),
+    'pontuação (CLI)': ('import service.scoring', True),
+    'streaming': ('import service.stream', True),
+    'dashboard (imports)': (None, True),
+    'gráficos': ('import visualization.charts, visualization.financial_charts', False),
+    'SHAP': ('import visualization.explainability; import shap', False),
+}
+
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+def app_imports() -> str:
+    """Imports de nível de módulo do `app.py` (o que roda antes da primeira linha da página)."""
+    with open(os.path.join(ROOT, 'app.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    return '\n'.join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def import_time(code: str):
+    """Importa `code` em um processo novo; retorna (segundos, {módulo: segundos acumulados})."""
+    err = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, check=True,
+                         capture_output=True, text=True).stderr
+    modules = {}
+    for line in err.splitlines():
+        match = _LINE.match(line)
+        if match:
+            modules[match.group(4)] = int(match.group(2)) / 1e6
+    # Módulos de nível zero (sem indentação) somam o tempo total
+    total = sum(int(m.group(2)) for m in map(_LINE.match, err.splitlines()) if m and not m.group(3)) / 1e6
+    return total, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help="Execuções por ponto de entrada (usa a menor).")
+    parser.add_argument('--top', type=int, default=5, help="Pacotes mais lentos listados por ponto de entrada.")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'ponto de entrada':>22} {'tempo (s)':>10}  pacotes mais lentos")
+    for name, (code, light) in ENTRY_POINTS.items():
+        runs = [import_time(code or app_imports()) for _ in range(args.repeat)]
+        total, modules = min(runs, key=lambda run: run[0])
+        packages = sorted(((m, t) for m, t in modules.items() if '.' not in m), key=lambda mt: -mt[1])
+        slowest = ', '.join(f"{m} {t:.2f}" for m, t in packages[:args.top])
+        print(f"{name:>22} {total:>10.2f}  {slowest}")
+        loaded = [m for m in HEAVY if m in modules]
+        if light and loaded:
+            failed = True
+            print(f"{'':>22} ERRO: importa {', '.join(loaded)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+# Mantém a raiz do projeto no sys.path para os testes em `tests/`
+import os
+import tempfile
+
+# Modelos e logs gravados pelos testes ficam fora do projeto
+_TMP = tempfile.mkdtemp(prefix='anomaly-tests-')
+os.environ.setdefault('ANOMALY_MODELS_DIR', os.path.join(_TMP, 'models'))
+os.environ.setdefault('ANOMALY_LOG_STORE', os.path.join(_TMP, 'log_store'))
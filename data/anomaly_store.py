@@ -0,0 +1,196 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+ANOMALY_DB = os.environ.get(
+    'ANOMALY_RESULTS_DB',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'anomaly_results', 'anomalies.sqlite')
+)
+
+# Colunas guardadas de cada log anômalo, com os mesmos nomes do DataFrame
+_COLUMNS = ['fonte', 'id', 'user_id', 'tipo_operacao', 'tabela', 'descricao', 'valor_transferencia',
+            'data', 'anomaly_score', 'model_version', 'scored_at']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS anomalies (
+    fonte TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    user_id INTEGER,
+    tipo_operacao TEXT,
+    tabela TEXT,
+    descricao TEXT,
+    valor_transferencia REAL,
+    data INTEGER NOT NULL,
+    anomaly_score REAL NOT NULL,
+    model_version TEXT NOT NULL,
+    scored_at INTEGER NOT NULL,
+    PRIMARY KEY (fonte, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS anomalies_data ON anomalies (data);
+CREATE INDEX IF NOT EXISTS anomalies_user ON anomalies (user_id, data);
+CREATE INDEX IF NOT EXISTS anomalies_operacao ON anomalies (tipo_operacao, data);
+CREATE INDEX IF NOT EXISTS anomalies_score ON anomalies (anomaly_score);
+"""
+
+_DEFAULT_STORE = None
+_DEFAULT_STORE_LOCK = threading.Lock()
+
+# Ordenações aceitas por `query`; o id desempata para a paginação ser estável
+_ORDER = {
+    'score': 'anomaly_score ASC, fonte, id',
+    'data': 'data DESC, fonte, id',
+}
+
+
+def _epoch(value) -> int:
+    return int(pd.Timestamp(value).value // 10**9)
+
+
+class AnomalyStore:
+    """Histórico das anomalias detectadas, em uma tabela SQLite indexada.
+
+    Cada log anômalo fica uma única vez (por fonte e id), com o score e a
+    versão do modelo que o marcou por último, de modo que meses de resultados
+    podem ser consultados por período, usuário, operação e faixa de score sem
+    pontuar os logs de novo.
+    """
+
+    def __init__(self, path=ANOMALY_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            # WAL: leituras das sessões não bloqueiam a gravação de novos resultados
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record(self, logs: pd.DataFrame, model_version: str, fonte='') -> int:
+        """Grava (ou atualiza) os registros com `anomaly == -1`; retorna quantos foram gravados.
+
+        Com mais de uma fonte a coluna `fonte` dos logs é usada; sem ela, `fonte`.
+        """
+        anomalies = logs.loc[np.asarray(logs['anomaly']) == -1]
+        if anomalies.empty:
+            return 0
+        n = len(anomalies)
+
+        def column(name):
+            if name not in anomalies.columns:
+                return [None] * n
+            values = anomalies[name].astype(object)
+            return values.where(values.notna(), None).tolist()
+
+        rows = zip(
+            anomalies['fonte'].astype(str).tolist() if 'fonte' in anomalies.columns else [fonte] * n,
+            anomalies['id'].astype('int64').tolist(),
+            [None if v is None else int(v) for v in column('user_id')],
+            column('tipo_operacao'),
+            column('tabela'),
+            column('descricao'),
+            [None if v is None else float(v) for v in column('valor_transferencia')],
+            (pd.to_datetime(anomalies['data']).astype('int64') // 10**9).tolist(),
+            anomalies['anomaly_score'].astype(float).tolist(),
+            [model_version] * n,
+            [int(time.time())] * n,
+        )
+        updates = ', '.join(f"{c} = excluded.{c}" for c in _COLUMNS[2:])
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                f"INSERT INTO anomalies ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))}) "
+                f"ON CONFLICT (fonte, id) DO UPDATE SET {updates}",
+                rows,
+            )
+        return n
+
+    @staticmethod
+    def _where(start=None, end=None, user_id=None, tipo_operacao=None, min_score=None, max_score=None,
+               model_version=None, fonte=None):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append('data >= ?')
+            params.append(_epoch(start))
+        if end is not None:
+            clauses.append('data < ?')
+            params.append(_epoch(end))
+        if user_id is not None:
+            clauses.append('user_id = ?')
+            params.append(int(user_id))
+        if tipo_operacao:
+            values = [tipo_operacao] if isinstance(tipo_operacao, str) else list(tipo_operacao)
+            clauses.append(f"tipo_operacao IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        if min_score is not None:
+            clauses.append('anomaly_score >= ?')
+            params.append(float(min_score))
+        if max_score is not None:
+            clauses.append('anomaly_score <= ?')
+            params.append(float(max_score))
+        if model_version is not None:
+            clauses.append('model_version = ?')
+            params.append(model_version)
+        if fonte is not None:
+            clauses.append('fonte = ?')
+            params.append(fonte)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def query(self, order='score', limit=100, offset=0, **filters) -> pd.DataFrame:
+        """Uma página das anomalias que atendem aos filtros (`start`/`end` delimitam `data`).
+
+        Filtros: `start`, `end`, `user_id`, `tipo_operacao` (um ou vários),
+        `min_score`, `max_score`, `model_version` e `fonte`.
+        """
+        where, params = self._where(**filters)
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM anomalies{where} ORDER BY {_ORDER[order]} LIMIT ? OFFSET ?"
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(sql, conn, params=params + [int(limit), int(offset)])
+        df['data'] = pd.to_datetime(df['data'], unit='s')
+        df['scored_at'] = pd.to_datetime(df['scored_at'], unit='s')
+        return df
+
+    def count(self, **filters) -> int:
+        where, params = self._where(**filters)
+        with closing(self._connect()) as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM anomalies{where}", params).fetchone()[0]
+
+    def operations(self) -> list:
+        """Tipos de operação com anomalias gravadas."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT tipo_operacao FROM anomalies WHERE tipo_operacao IS NOT NULL ORDER BY 1"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def bounds(self) -> dict:
+        """Menor e maior data e score gravados (`None` com a tabela vazia)."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT MIN(data), MAX(data), MIN(anomaly_score), MAX(anomaly_score) FROM anomalies"
+            ).fetchone()
+        if row[0] is None:
+            return {'start': None, 'end': None, 'min_score': None, 'max_score': None}
+        return {
+            'start': pd.to_datetime(row[0], unit='s'),
+            'end': pd.to_datetime(row[1], unit='s'),
+            'min_score': row[2],
+            'max_score': row[3],
+        }
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM anomalies")
+
+
+def default_store() -> AnomalyStore:
+    """Histórico em `ANOMALY_DB`, criado uma vez por processo."""
+    global _DEFAULT_STORE
+    with _DEFAULT_STORE_LOCK:
+        if _DEFAULT_STORE is None:
+            _DEFAULT_STORE = AnomalyStore()
+        return _DEFAULT_STORE
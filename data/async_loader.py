@@ -0,0 +1,236 @@
+import asyncio
+import os
+import random
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from data import log_store
+from data.loader import _after_cursor, _cursor, concat_logs, read_logs_response
+
+# Tempo máximo de conexão e de leitura de cada requisição, em segundos
+DEFAULT_TIMEOUT = (5, 30)
+# Novas tentativas após falhas de rede, timeouts e respostas 429/5xx
+MAX_RETRIES = 3
+# Espera base entre tentativas; dobra a cada nova tentativa (com variação aleatória)
+BACKOFF_SECONDS = 0.5
+# Requisições simultâneas (e conexões mantidas abertas por host)
+MAX_CONCURRENCY = 8
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Dias mais recentes do armazenamento local lidos na primeira carga (0 = todos)
+HISTORY_DAYS = float(os.environ.get('ANOMALY_HISTORY_DAYS', 0))
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+# Logs acumulados por conjunto de fontes: {'df': DataFrame, 'cursors': {nome: (id, data)}}
+_SOURCES = {}
+_SOURCES_LOCK = threading.Lock()
+# Uma carga por vez para cada conjunto de fontes; `_SOURCES_LOCK` só protege os dicionários
+_LOAD_LOCKS = {}
+
+
+def _session() -> requests.Session:
+    """Sessão HTTP compartilhada, com pool de conexões reaproveitadas entre cargas."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_CONCURRENCY, pool_maxsize=MAX_CONCURRENCY)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _SESSION = session
+        return _SESSION
+
+
+def _get_logs(session, url, params, timeout):
+    """Requisição bloqueante; a resposta é decodificada em streaming, em lotes tipados.
+
+    Retorna `(resposta, logs)`, com `logs=None` quando o status pede nova tentativa.
+    """
+    with session.get(url, params=params, timeout=timeout, stream=True) as resp:
+        if resp.status_code in _RETRY_STATUS:
+            return resp, None
+        resp.raise_for_status()
+        return resp, read_logs_response(resp)
+
+
+async def _get_page(url, params, timeout, retries, backoff) -> pd.DataFrame:
+    session = _session()
+    for attempt in range(retries + 1):
+        try:
+            # `requests` é bloqueante: cada requisição roda em um thread do executor
+            resp, page = await asyncio.to_thread(_get_logs, session, url, params, timeout)
+            if page is not None:
+                return page
+            error = requests.HTTPError(f"{resp.status_code} em {resp.url}", response=resp)
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            error = e
+        if attempt < retries:
+            await asyncio.sleep(backoff * 2 ** attempt * (1 + random.random()))
+    raise error
+
+
+async def _fetch_source(url, cursor, page_size, semaphore, **http):
+    """Busca os logs de uma fonte após o cursor, página a página.
+
+    Retorna `(logs, erro)`: em caso de falha, as páginas já recebidas são
+    mantidas e o erro é devolvido em vez de propagado.
+    """
+    last_id, last_data = cursor
+    frames = []
+    while True:
+        params = {}
+        if last_id is not None:
+            params['after_id'] = last_id
+        elif last_data is not None:
+            params['since'] = pd.Timestamp(last_data).isoformat()
+        if page_size:
+            params['limit'] = page_size
+        try:
+            async with semaphore:
+                page = await _get_page(url, params, **http)
+        except (requests.RequestException, ValueError) as e:
+            return concat_logs(frames), e
+
+        df = _after_cursor(page, last_id, last_data)
+        frames.append(df)
+        # Sem paginação, página curta ou API ignorando o cursor: fim da fonte
+        if not page_size or len(page) < page_size or df.empty:
+            return concat_logs(frames), None
+        last_id, last_data = _cursor(df)
+
+
+async def fetch_sources_async(sources: dict, cursors=None, page_size=None, timeout=DEFAULT_TIMEOUT,
+                              retries=MAX_RETRIES, backoff=BACKOFF_SECONDS,
+                              max_concurrency=MAX_CONCURRENCY) -> dict:
+    """Busca todas as fontes em paralelo; retorna `{nome: (logs, erro)}`."""
+    cursors = cursors or {}
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results = await asyncio.gather(*(
+        _fetch_source(url, cursors.get(name, (None, None)), page_size, semaphore,
+                      timeout=timeout, retries=retries, backoff=backoff)
+        for name, url in sources.items()
+    ))
+    return dict(zip(sources, results))
+
+
+def fetch_sources(sources: dict, **kwargs) -> dict:
+    """Versão síncrona de `fetch_sources_async`, utilizável a partir do Streamlit."""
+    coro = fetch_sources_async(sources, **kwargs)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # Já há um loop neste thread (ex.: Jupyter): roda o carregamento em outro
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+def parse_sources(text: str) -> dict:
+    """Lê as fontes configuradas, uma por linha, como `nome=url` ou apenas `url`."""
+    sources = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        name, sep, url = line.partition('=')
+        if not sep or '://' in name:
+            name, url = line, line
+        sources[name.strip()] = url.strip()
+    return sources
+
+
+def _with_source(df: pd.DataFrame, name, multiple) -> pd.DataFrame:
+    if multiple and not df.empty:
+        df = df.assign(fonte=pd.Categorical([name] * len(df)))
+    return df
+
+
+def load_sources(sources: dict, store_base: str = None, history_days=None, **kwargs):
+    """Carrega incrementalmente os logs de várias fontes, buscadas em paralelo.
+
+    Retorna `(logs, erros)`. Os registros novos de cada carga são acrescentados
+    ao fim dos já carregados; com mais de uma fonte, a coluna `fonte` indica a
+    origem. Uma fonte que falhe (após as novas tentativas) contribui com o
+    último snapshot bom — em memória ou, com `store_base`, no armazenamento
+    local em Parquet — e o erro é devolvido em `erros`. Com `history_days`
+    (padrão: `HISTORY_DAYS`), só esses últimos dias do armazenamento local
+    entram na primeira carga do processo.
+    """
+    history_days = HISTORY_DAYS if history_days is None else history_days
+    multiple = len(sources) > 1
+    key = tuple(sources.items())
+    store_dirs = {name: log_store.store_dir_for(url, store_base) for name, url in sources.items()} \
+        if store_base is not None else {}
+
+    # A rede (com as novas tentativas) fica fora do lock global: uma fonte lenta
+    # só atrasa as cargas do mesmo conjunto de fontes
+    with _load_lock(key):
+        with _SOURCES_LOCK:
+            state = _SOURCES.get(key)
+        if state is None:
+            state = {'df': pd.DataFrame(), 'cursors': {}}
+            seeds = []
+            for name, store_dir in store_dirs.items():
+                # A mesma URL pode estar em outros conjuntos de fontes: o armazenamento tem lock próprio
+                with _load_lock(store_dir):
+                    if not log_store.has_logs(store_dir):
+                        continue
+                    # O cursor vem do armazenamento inteiro, mesmo que só os últimos dias sejam lidos
+                    cursor = log_store.max_cursor(store_dir)
+                    start = cursor[1] - pd.Timedelta(days=history_days) \
+                        if history_days and cursor[1] is not None else None
+                    seed = log_store.read_logs(store_dir, start=start)
+                state['cursors'][name] = cursor
+                seeds.append(_with_source(seed, name, multiple))
+            state['df'] = concat_logs(seeds)
+
+        results = fetch_sources(sources, cursors=state['cursors'], **kwargs)
+        novos, errors = [], {}
+        for name, (df, error) in results.items():
+            if error is not None:
+                errors[name] = error
+            if df.empty:
+                continue
+            if name in store_dirs:
+                with _load_lock(store_dirs[name]):
+                    log_store.write_logs(df, store_dirs[name])
+            state['cursors'][name] = _cursor(df)
+            novos.append(_with_source(df, name, multiple))
+
+        if len(errors) == len(sources) and state['df'].empty and not novos:
+            raise next(iter(errors.values()))
+        state['df'] = concat_logs([state['df']] + novos)
+        with _SOURCES_LOCK:
+            _SOURCES[key] = state
+        return state['df'], errors
+
+
+def _load_lock(key) -> threading.Lock:
+    with _SOURCES_LOCK:
+        return _LOAD_LOCKS.setdefault(key, threading.Lock())
+
+
+def reset_sources(sources: dict = None, store_base: str = None):
+    """Descarta os logs acumulados das fontes (ou de todas), forçando uma carga completa.
+
+    Com `store_base` o armazenamento local de cada fonte também é apagado.
+    """
+    if sources is None:
+        with _SOURCES_LOCK:
+            _SOURCES.clear()
+        return
+    key = tuple(sources.items())
+    with _load_lock(key):
+        with _SOURCES_LOCK:
+            _SOURCES.pop(key, None)
+        if store_base is not None:
+            for url in sources.values():
+                shutil.rmtree(log_store.store_dir_for(url, store_base), ignore_errors=True)
@@ -1,16 +1,157 @@
+import json
+import re
+
 import pandas as pd
 import requests
-import streamlit as st
+from pandas.api.types import union_categoricals
 from utils.text_utils import camel_to_snake
 
-@st.cache_data(ttl=300)
-def load_logs(url: str) -> pd.DataFrame:
-    """Carrega dados de logs a partir de uma API REST."""
-    resp = requests.get(url)
-    resp.raise_for_status()
-    data = resp.json()
+# Colunas de baixa cardinalidade mantidas como categóricas (`fonte`: origem, com várias APIs)
+CATEGORICAL_COLUMNS = ['tabela', 'tipo_operacao', 'descricao', 'fonte']
+
+_WHITESPACE = re.compile(r'[\s,]*')
+
+
+def narrow_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte as colunas de texto de baixa cardinalidade em categóricas (no próprio `df`)."""
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+
+def concat_logs(frames) -> pd.DataFrame:
+    """Concatena lotes de logs unificando as categorias, para não voltarem a `object`."""
+    frames = [f for f in frames if not f.empty] or list(frames)[:1]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+
+    order = list(frames[0].columns)
+    categoricals = {}
+    for col in CATEGORICAL_COLUMNS:
+        parts = [f[col] for f in frames if col in f.columns]
+        if len(parts) == len(frames) and all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            categoricals[col] = union_categoricals(parts, ignore_order=True)
+    # Cópias rasas: remover as colunas não altera os DataFrames recebidos
+    frames = [f.copy(deep=False) for f in frames]
+    for f in frames:
+        for col in categoricals:
+            del f[col]
+    df = pd.concat(frames, ignore_index=True)
+    del frames
+    for col in sorted(categoricals, key=order.index):
+        df.insert(order.index(col), col, categoricals[col])
+    return df
+
+
+def normalize_logs(data) -> pd.DataFrame:
+    """Converte a lista de registros da API em DataFrame com colunas em snake_case."""
     df = pd.json_normalize(data)
     df.columns = [camel_to_snake(col) for col in df.columns]
     if 'data' in df.columns:
         df['data'] = pd.to_datetime(df['data'])
-    return df
\ No newline at end of file
+    return narrow_dtypes(df)
+
+
+def _iter_json_array(chunks):
+    """Decodifica incrementalmente os objetos de um array JSON recebido em pedaços."""
+    decoder = json.JSONDecoder()
+    buf = ''
+    started = False
+    for chunk in chunks:
+        buf += chunk
+        pos = 0
+        if not started:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos >= len(buf):
+                buf = ''
+                continue
+            if buf[pos] != '[':
+                raise ValueError("A resposta da API não é um array JSON.")
+            pos += 1
+            started = True
+        while True:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos >= len(buf):
+                break
+            if buf[pos] == ']':
+                return
+            try:
+                obj, pos_end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # Objeto incompleto: aguarda o próximo pedaço
+            pos = pos_end
+            yield obj
+        buf = buf[pos:]
+    raise ValueError("Array JSON incompleto na resposta da API.")
+
+
+def _iter_batches(records, batch_size):
+    """Agrupa os registros em listas de até `batch_size` elementos."""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _normalize_batches(batches) -> pd.DataFrame:
+    """Monta um DataFrame tipado a partir de lotes de registros, concatenando uma única vez."""
+    frames = []
+    for batch in batches:
+        # Registros planos dispensam o `json_normalize`, bem mais lento
+        if any(isinstance(v, dict) for v in batch[0].values()):
+            df = pd.json_normalize(batch)
+        else:
+            df = pd.DataFrame.from_records(batch)
+        df.columns = [camel_to_snake(col) for col in df.columns]
+        if 'data' in df.columns:
+            df['data'] = pd.to_datetime(df['data'])
+        frames.append(narrow_dtypes(df))
+    return concat_logs(frames)
+
+
+def fetch_logs(url: str, stream: bool = False, batch_size: int = 50_000) -> pd.DataFrame:
+    """Busca os logs na API REST, sem cache.
+
+    Com `stream=True` o corpo da resposta é decodificado incrementalmente e
+    normalizado em lotes de `batch_size` registros, com colunas tipadas.
+    """
+    if not stream:
+        resp = requests.get(url)
+        resp.raise_for_status()
+        return normalize_logs(resp.json())
+
+    with requests.get(url, stream=True) as resp:
+        resp.raise_for_status()
+        return read_logs_response(resp, batch_size)
+
+
+def read_logs_response(resp: requests.Response, batch_size: int = 50_000) -> pd.DataFrame:
+    """Decodifica incrementalmente uma resposta (aberta com `stream=True`) em DataFrame tipado."""
+    resp.encoding = resp.encoding or 'utf-8'
+    records = _iter_json_array(resp.iter_content(chunk_size=1 << 20, decode_unicode=True))
+    return _normalize_batches(_iter_batches(records, batch_size))
+
+
+def _after_cursor(df: pd.DataFrame, last_id=None, last_data=None) -> pd.DataFrame:
+    """Descarta localmente o que já foi carregado, caso a API ignore o cursor."""
+    if last_id is not None and 'id' in df.columns:
+        df = df[df['id'] > last_id]
+    elif last_data is not None and 'data' in df.columns:
+        df = df[df['data'] > last_data]
+    return df.reset_index(drop=True)
+
+
+def _cursor(df: pd.DataFrame):
+    """Maior `id` e maior `data` presentes no DataFrame."""
+    if df.empty:
+        return None, None
+    last_id = df['id'].max() if 'id' in df.columns else None
+    last_data = df['data'].max() if 'data' in df.columns else None
+    return last_id, last_data
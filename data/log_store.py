@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import uuid
+from collections import Counter
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from data.loader import narrow_dtypes
+
+STORE_DIR = os.environ.get('ANOMALY_LOG_STORE', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'log_store'))
+
+_COLUMNS_FILE = '_columns.json'
+_SCHEMA_FILE = '_schema.arrow'
+
+# Arquivos por partição (dia/tabela) a partir dos quais as gravações incrementais são compactadas
+MAX_FILES_PER_PARTITION = int(os.environ.get('ANOMALY_LOG_STORE_MAX_FILES', 16))
+
+
+def store_dir_for(url: str, base_dir=STORE_DIR) -> str:
+    """Diretório do armazenamento local dos logs de uma URL da API."""
+    return os.path.join(base_dir, hashlib.sha1(url.encode('utf-8')).hexdigest()[:16])
+
+
+def _partitioning():
+    # Partições em disco: dia do log e tabela de origem (layout Hive: dia=.../tabela=...)
+    return ds.partitioning(pa.schema([('dia', pa.string()), ('tabela', pa.string())]), flavor='hive')
+
+
+def _read_schema(store_dir):
+    path = os.path.join(store_dir, _SCHEMA_FILE)
+    if not os.path.exists(path):
+        return None
+    with pa.memory_map(path) as f:
+        return pa.ipc.read_schema(f)
+
+
+def _write_schema(store_dir, schema):
+    path = os.path.join(store_dir, _SCHEMA_FILE)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(schema.serialize())
+    os.replace(tmp, path)
+
+
+def _dataset(store_dir):
+    # Leitura com memory map: os arquivos são mapeados em vez de copiados para a memória
+    options = dict(format='parquet', partitioning=_partitioning(),
+                   filesystem=fs.LocalFileSystem(use_mmap=True))
+    # Lotes gravados em momentos diferentes podem ter tipos distintos (ex.: int e float):
+    # o esquema unificado é mantido a cada gravação, sem abrir os arquivos na leitura
+    schema = _read_schema(store_dir)
+    if schema is None:
+        # Armazenamento anterior ao `_schema.arrow`: unifica a partir dos arquivos uma única vez
+        dataset = ds.dataset(store_dir, **options)
+        schema = pa.unify_schemas(
+            [fragment.physical_schema for fragment in dataset.get_fragments()] + [dataset.schema],
+            promote_options='permissive',
+        )
+        _write_schema(store_dir, schema)
+    return ds.dataset(store_dir, schema=schema, **options)
+
+
+def _to_table(df: pd.DataFrame) -> pa.Table:
+    df = df.assign(dia=df['data'].dt.strftime('%Y-%m-%d'))
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+    df['tabela'] = df['tabela'].astype(str)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Colunas só com nulos viram texto, para não conflitarem com lotes futuros
+    schema = pa.schema([
+        pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in table.schema
+    ])
+    return table.cast(schema)
+
+
+def has_logs(store_dir=STORE_DIR) -> bool:
+    """Indica se já existem logs gravados no armazenamento local."""
+    return os.path.exists(os.path.join(store_dir, _COLUMNS_FILE))
+
+
+def _stored_columns(store_dir) -> list:
+    with open(os.path.join(store_dir, _COLUMNS_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_logs(df: pd.DataFrame, store_dir=STORE_DIR, overwrite=False):
+    """Grava os logs em Parquet particionado por dia e tabela.
+
+    Com `overwrite=True` as partições presentes em `df` são substituídas;
+    caso contrário os registros são acrescentados a elas, e as partições que
+    passarem de `MAX_FILES_PER_PARTITION` arquivos são compactadas.
+    """
+    if df.empty or 'data' not in df.columns or 'tabela' not in df.columns:
+        return
+
+    table = _to_table(df)
+    ds.write_dataset(
+        table, store_dir, format='parquet', partitioning=_partitioning(),
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior='delete_matching' if overwrite else 'overwrite_or_ignore',
+    )
+    schema = table.schema.remove_metadata()
+    columns = list(df.columns)
+    if has_logs(store_dir):
+        # Tipos e colunas unificados com os lotes anteriores: uma coluna que só exista neles continua legível
+        stored = _read_schema(store_dir)
+        if stored is not None:
+            schema = pa.unify_schemas([stored, schema], promote_options='permissive')
+        stored_columns = _stored_columns(store_dir)
+        columns = stored_columns + [c for c in columns if c not in stored_columns]
+    _write_schema(store_dir, schema)
+    with open(os.path.join(store_dir, _COLUMNS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(columns, f)
+
+    if not overwrite:
+        compact_logs(store_dir, max_files=MAX_FILES_PER_PARTITION)
+
+
+def read_logs(store_dir=STORE_DIR, columns=None, start=None, end=None, tabelas=None) -> pd.DataFrame:
+    """Lê os logs do armazenamento local, apenas com as colunas e o período pedidos.
+
+    Os filtros por dia e tabela descartam partições inteiras sem abri-las.
+    """
+    if not has_logs(store_dir):
+        return pd.DataFrame(columns=columns)
+
+    stored_columns = _stored_columns(store_dir)
+    columns = [c for c in (columns or stored_columns) if c in stored_columns]
+    order_by = 'id' if 'id' in stored_columns else 'data'
+
+    filters = []
+    if start is not None:
+        start = pd.Timestamp(start)
+        filters += [ds.field('dia') >= start.strftime('%Y-%m-%d'), ds.field('data') >= start]
+    if end is not None:
+        end = pd.Timestamp(end)
+        filters += [ds.field('dia') <= end.strftime('%Y-%m-%d'), ds.field('data') <= end]
+    if tabelas is not None:
+        filters.append(ds.field('tabela').isin(list(tabelas)))
+    expression = None
+    for f in filters:
+        expression = f if expression is None else expression & f
+
+    return _read(store_dir, columns, order_by, expression)
+
+
+def _read(store_dir, columns, order_by, expression=None) -> pd.DataFrame:
+    read_columns = columns + [order_by] if order_by not in columns else columns
+    df = _dataset(store_dir).to_table(columns=read_columns, filter=expression).to_pandas()
+    df = df.sort_values(order_by, kind='stable', ignore_index=True)
+    return narrow_dtypes(df[columns])
+
+
+def max_cursor(store_dir=STORE_DIR):
+    """Retorna o maior (`id`, `data`) já gravado, lendo apenas essas colunas."""
+    if not has_logs(store_dir):
+        return None, None
+    dataset = _dataset(store_dir)
+    names = dataset.schema.names
+    table = dataset.to_table(columns=[c for c in ('id', 'data') if c in names])
+    last_id = pc.max(table['id']).as_py() if 'id' in names else None
+    last_data = pc.max(table['data']).as_py() if 'data' in names else None
+    return last_id, (pd.Timestamp(last_data) if last_data is not None else None)
+
+
+def compact_logs(store_dir=STORE_DIR, max_files=1):
+    """Reescreve com um arquivo cada partição com mais de `max_files` arquivos, juntando as gravações incrementais.
+
+    Só as partições fragmentadas são lidas e regravadas; as demais ficam intactas.
+    """
+    if not has_logs(store_dir):
+        return
+    # Listar os fragmentos não abre os arquivos: as chaves vêm do caminho dia=.../tabela=...
+    fragments = ds.dataset(store_dir, format='parquet', partitioning=_partitioning()).get_fragments()
+    partitions = {}
+    counts = Counter()
+    for fragment in fragments:
+        key = tuple(sorted(ds.get_partition_keys(fragment.partition_expression).items()))
+        partitions[key] = fragment.partition_expression
+        counts[key] += 1
+    expression = None
+    for key, n_files in counts.items():
+        if n_files > max_files:
+            expression = partitions[key] if expression is None else expression | partitions[key]
+    if expression is None:
+        return
+
+    stored_columns = _stored_columns(store_dir)
+    order_by = 'id' if 'id' in stored_columns else 'data'
+    write_logs(_read(store_dir, stored_columns, order_by, expression), store_dir, overwrite=True)
@@ -1,67 +1,148 @@
+import re
+
+import joblib
 import pandas as pd
-import streamlit as st
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.impute import SimpleImputer
 
-@st.cache_data
+from utils.streamlit_cache import cache_data
+
+# Colunas que não entram como features do modelo
+NON_FEATURE_COLUMNS = ['id', 'descricao', 'dados_antigos', 'dados_novos', 'data', 'fonte']
+
+
+def parse_dados_novos(dados: pd.Series, campos=None) -> pd.DataFrame:
+    """Extrai de forma vetorizada os campos do payload `chave=valor|...` em colunas tipadas.
+
+    `campos` mapeia o nome de cada campo para o tipo da coluna ('float' ou 'str').
+    """
+    campos = campos or {'valor': 'float'}
+    result = pd.DataFrame(index=dados.index)
+    if not (pd.api.types.is_object_dtype(dados) or pd.api.types.is_string_dtype(dados)
+            or isinstance(dados.dtype, pd.CategoricalDtype)):
+        for campo, dtype in campos.items():
+            result[campo] = pd.Series(np.nan, index=dados.index,
+                                      dtype='float' if dtype == 'float' else 'object')
+        return result
+
+    for campo, dtype in campos.items():
+        valores = dados.str.extract(rf'(?:^|\|){re.escape(campo)}=([^|]*)', expand=False)
+        if dtype == 'float':
+            valores = pd.to_numeric(valores, errors='coerce')
+        result[campo] = valores
+    return result
+
+
+def transfer_values(df: pd.DataFrame) -> pd.Series:
+    """Retorna o valor das transferências (NaN para as demais tabelas)."""
+    if 'valor_transferencia' in df.columns:
+        return df['valor_transferencia']
+    valores = parse_dados_novos(df['dados_novos'])['valor']
+    return valores.where(df['tabela'] == 'transferencia')
+
+
+class FeaturePipeline:
+    """Pré-processamento ajustado uma única vez e reaplicável a novos lotes.
+
+    Guarda o vocabulário das features categóricas, as médias do imputer e as
+    estatísticas do scaler, de modo que treino e pontuação vejam sempre o
+    mesmo layout de colunas.
+    """
+
+    def __init__(self, features: list):
+        self.features = list(features)
+        self.categories_ = None
+        self.columns_ = None
+        self.imputer_ = None
+        self.scaler_ = None
+
+    def _select(self, df: pd.DataFrame) -> dict:
+        # Referências às colunas, sem copiar o DataFrame
+        return {
+            f: transfer_values(df) if f == 'valor_transferencia' else df[f]
+            for f in self.features
+        }
+
+    def _encode(self, df_feat: dict, index) -> pd.DataFrame:
+        # One-hot com vocabulário fixo (primeira categoria descartada, como no
+        # `get_dummies(drop_first=True)`); categorias novas viram apenas zeros
+        encoded = {}
+        for col, values in df_feat.items():
+            if col in self.categories_:
+                for cat in self.categories_[col][1:]:
+                    encoded[f"{col}_{cat}"] = (values == cat).to_numpy(dtype=np.float32)
+            else:
+                encoded[col] = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float32)
+        return pd.DataFrame(encoded, index=index, columns=self.columns_)
+
+    def fit(self, df: pd.DataFrame):
+        df_feat = self._select(df)
+        self.categories_ = {
+            col: sorted(values.dropna().astype(str).unique())
+            for col, values in df_feat.items()
+            if not pd.api.types.is_numeric_dtype(values)
+            and not pd.api.types.is_bool_dtype(values)
+        }
+        # Mesma ordem do `get_dummies`: numéricas primeiro, depois as dummies
+        self.columns_ = [col for col in df_feat if col not in self.categories_]
+        for col, cats in self.categories_.items():
+            self.columns_.extend(f"{col}_{cat}" for cat in cats[1:])
+
+        encoded = self._encode(df_feat, df.index)
+        # Import tardio: carregar e preparar os logs não depende do sklearn
+        from sklearn.impute import SimpleImputer
+        from sklearn.preprocessing import StandardScaler
+
+        self.imputer_ = SimpleImputer(strategy='mean', keep_empty_features=True).fit(encoded)
+        self.scaler_ = StandardScaler(copy=False).fit(self.imputer_.transform(encoded))
+        return self
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Aplica o pipeline; a matriz resultante é float32, o tipo usado pelas árvores do sklearn."""
+        encoded = self._encode(self._select(df), df.index)
+        values = self.scaler_.transform(self.imputer_.transform(encoded))
+        return pd.DataFrame(values, index=df.index, columns=self.columns_, copy=False)
+
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.fit(df).transform(df)
+
+    def save(self, path: str):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path: str) -> 'FeaturePipeline':
+        return joblib.load(path)
+
+
+@cache_data
 def preprocess(df: pd.DataFrame, features: list) -> pd.DataFrame:
     """Pré-processa os dados para análise de anomalias."""
+    return FeaturePipeline(features).fit_transform(df)
 
-    df_processed = df.copy()
 
-    # 1. Verificar e extrair valor da transferência se for tabela 'transferencia'
-    if 'tabela' in df_processed.columns and 'dados_novos' in df_processed.columns:
-        def extract_transfer_value(row):
-            if row['tabela'] == 'transferencia' and isinstance(row['dados_novos'], str):
-                try:
-                    # Extrair o valor da string no formato 'valor=<valor>|...'
-                    parts = row['dados_novos'].split('|')
-                    for part in parts:
-                        if part.startswith('valor='):
-                            return float(part.split('=')[1])
-                except (ValueError, IndexError):
-                    pass # Ignorar erros de conversão ou formato
-            return None # Retorna None se não for transferencia ou não encontrar valor
-        df_processed['valor_transferencia'] = df_processed.apply(extract_transfer_value, axis=1)
-
-    df_feat = df_processed[features].copy()
-    df_feat = pd.get_dummies(df_feat, drop_first=True)
-    imputer = SimpleImputer(strategy='mean')
-    df_feat[:] = imputer.fit_transform(df_feat)
-    scaler = StandardScaler()
-    df_feat[:] = scaler.fit_transform(df_feat)
-    return df_feat
+def default_features(df: pd.DataFrame) -> list:
+    """Lista as colunas do DataFrame utilizáveis como features."""
+    return [c for c in df.columns if c not in NON_FEATURE_COLUMNS]
+
 
 def preprocess_transfer_values(df):
-    df_processed = df.copy()
-    def extract_transfer_value(row):
-        if row['tabela'] == 'transferencia' and isinstance(row['dados_novos'], str):
-            try:
-                # Extrair o valor da string no formato 'valor=<valor>|...'
-                parts = row['dados_novos'].split('|')
-                for part in parts:
-                    if part.startswith('valor='):
-                        return float(part.split('=')[1])
-            except (ValueError, IndexError):
-                pass
-        return None
+    # Cópia rasa: as colunas existentes são compartilhadas, só a nova é alocada
+    df_processed = df.copy(deep=False)
     if 'tabela' in df_processed.columns and 'dados_novos' in df_processed.columns:
-        df_processed['valor_transferencia'] = df_processed.apply(
-            lambda row: extract_transfer_value(row), axis=1)
+        df_processed['valor_transferencia'] = transfer_values(df_processed)
     return df_processed
 
 
 def extract_time_features(df):
     """Extrai a hora do dia dos logs para análise de anomalias."""
-    df_processed = df.copy()
+    df_processed = df.copy(deep=False)
 
     if 'data' in df_processed.columns:
         # Convertendo para datetime caso ainda não seja
         if not pd.api.types.is_datetime64_any_dtype(df_processed['data']):
             df_processed['data'] = pd.to_datetime(df_processed['data'])
 
-        # Extrair apenas a hora
-        df_processed['hora'] = df_processed['data'].dt.hour
+        # Extrair apenas a hora (int8; com datas nulas fica float32, com NaN nelas)
+        hora = df_processed['data'].dt.hour
+        df_processed['hora'] = hora.astype(np.int8 if hora.notna().all() else np.float32)
 
     return df_processed
\ No newline at end of file
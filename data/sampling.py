@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# Colunas categóricas que definem os estratos (as que existirem nos logs)
+STRATA_COLUMNS = ['tabela', 'tipo_operacao']
+
+
+def _column_codes(values: pd.Series):
+    """Códigos inteiros (-1 para nulos) e número de categorias de uma coluna."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Colunas categóricas: os códigos já existem, sem cópia nem conversão para texto
+        return values.cat.codes.to_numpy(), len(values.cat.categories)
+    codes, uniques = pd.factorize(values)
+    return codes, len(uniques)
+
+
+def sampling_strata(logs: pd.DataFrame, time_bins=12, chunk_size=1_000_000) -> np.ndarray:
+    """Código inteiro (pequeno, não negativo) do estrato de cada linha: tabela, tipo de operação e faixa de tempo.
+
+    O período dos logs é dividido em `time_bins` faixas de mesma duração, de
+    modo que o número de estratos não cresce com o histórico. Os códigos são
+    calculados em blocos de `chunk_size` linhas, num único array int32.
+    """
+    columns = [_column_codes(logs[c]) for c in STRATA_COLUMNS if c in logs.columns]
+    times = None
+    if 'data' in logs.columns and time_bins > 1 and len(logs):
+        times = pd.to_datetime(logs['data']).to_numpy()
+        t_min, t_max = times.min(), times.max()
+        span = max((t_max - t_min) / np.timedelta64(1, 'ns'), 1.0)
+
+    strata = np.zeros(len(logs), dtype=np.int32)
+    for start in range(0, len(logs), chunk_size):
+        stop = start + chunk_size
+        code = np.zeros(min(stop, len(logs)) - start, dtype=np.int32)
+        for values, n_categories in columns:
+            code = code * (n_categories + 1) + values[start:stop] + 1
+        if times is not None:
+            elapsed = (times[start:stop] - t_min) / np.timedelta64(1, 'ns')
+            code = code * time_bins + np.minimum((elapsed / span * time_bins).astype(np.int32), time_bins - 1)
+        strata[start:stop] = code
+    return strata
+
+
+def stratified_sample(strata, size, min_per_stratum=50, random_state=42, chunk_size=1_000_000) -> np.ndarray:
+    """Índices (ordenados) de uma amostra de cerca de `size` linhas, estratificada por `strata`.
+
+    Cada estrato recebe uma cota proporcional ao seu tamanho, com pelo menos
+    `min_per_stratum` linhas (ou todas, se tiver menos), para que operações
+    raras continuem representadas. Cada linha entra com a probabilidade
+    cota/tamanho do seu estrato, sorteada em blocos de `chunk_size`, de modo
+    que a memória usada não cresce com o histórico.
+    """
+    strata = np.asarray(strata)
+    n = len(strata)
+    if n <= size:
+        return np.arange(n)
+    counts = np.bincount(strata)
+    quota = np.minimum(counts, np.maximum(size * counts / n, min_per_stratum))
+    prob = quota / np.maximum(counts, 1)
+
+    rng = np.random.RandomState(random_state)
+    rows = []
+    for start in range(0, n, chunk_size):
+        codes = strata[start:start + chunk_size]
+        rows.append(np.flatnonzero(rng.random_sample(len(codes)) < prob[codes]) + start)
+    return np.concatenate(rows)
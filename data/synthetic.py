@@ -0,0 +1,122 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from data.loader import narrow_dtypes
+
+# Operações normais: (tabela, tipo_operacao, descricao, probabilidade)
+_OPERACOES = [
+    ('usuario', 'LOGIN', 'LOGIN SUCESSO', 0.45),
+    ('usuario', 'LOGIN', 'LOGIN ERRO', 0.05),
+    ('transferencia', 'INSERT', 'TRANSFERENCIA REALIZADA', 0.25),
+    ('conta', 'UPDATE', 'SALDO ATUALIZADO', 0.25),
+]
+_FALHA_LOGIN = 1
+_TRANSFERENCIA = 2
+
+# Peso relativo de cada hora do dia: movimento concentrado no horário comercial
+_PESO_HORA = np.array([1, 1, 1, 1, 1, 2, 4, 8, 12, 14, 14, 13,
+                       12, 13, 14, 14, 13, 12, 10, 8, 6, 4, 3, 2], dtype=float)
+
+# Tipos de anomalia injetados
+ANOMALY_KINDS = ('valor_alto', 'madrugada', 'forca_bruta')
+
+# Colunas na forma devolvida pela API (camelCase)
+_API_COLUMNS = {
+    'tipo_operacao': 'tipoOperacao',
+    'dados_antigos': 'dadosAntigos',
+    'dados_novos': 'dadosNovos',
+    'user_id': 'userId',
+}
+
+
+def _dados_novos(valor, destino):
+    return 'valor=' + pd.Series(valor).map('{:.2f}'.format).to_numpy(dtype=object) \
+        + '|destino=' + destino.astype(str).astype(object)
+
+
+def generate_logs(rows, anomaly_rate=0.01, n_users=500, start='2025-05-01', days=28, seed=42):
+    """Gera logs sintéticos no formato de `normalize_logs`, com anomalias rotuladas.
+
+    Retorna `(logs, labels)`, onde `labels[i]` indica se o registro `i` é uma
+    das anomalias injetadas (transferências de valor muito alto, transferências
+    de madrugada e rajadas de falhas de login de um mesmo usuário).
+    """
+    rng = np.random.default_rng(seed)
+    n_anom = int(round(rows * anomaly_rate))
+    n_normal = rows - n_anom
+    inicio = np.datetime64(pd.Timestamp(start).to_datetime64(), 's')
+
+    # Registros normais
+    probs = np.array([op[3] for op in _OPERACOES])
+    op = rng.choice(len(_OPERACOES), size=n_normal, p=probs)
+    hora = rng.choice(24, size=n_normal, p=_PESO_HORA / _PESO_HORA.sum())
+    segundos = rng.integers(0, days, n_normal) * 86400 + hora * 3600 + rng.integers(0, 3600, n_normal)
+    user = rng.integers(1, n_users + 1, n_normal)
+    valor = np.clip(rng.lognormal(mean=5.0, sigma=1.0, size=n_normal), 1, 20_000)
+
+    # Anomalias, divididas entre os tipos
+    tipo = rng.integers(0, len(ANOMALY_KINDS), n_anom)
+    a_op = np.where(tipo == 2, _FALHA_LOGIN, _TRANSFERENCIA)
+    a_user = rng.integers(1, n_users + 1, n_anom)
+    a_valor = np.where(tipo == 0, rng.uniform(50_000, 500_000, n_anom), rng.uniform(5_000, 30_000, n_anom))
+    a_hora = np.where(tipo == 1, rng.integers(1, 5, n_anom), rng.choice(24, size=n_anom, p=_PESO_HORA / _PESO_HORA.sum()))
+    a_seg = rng.integers(0, days, n_anom) * 86400 + a_hora * 3600 + rng.integers(0, 3600, n_anom)
+    # Força bruta: falhas agrupadas em rajadas de ~10 tentativas do mesmo usuário em poucos minutos
+    rajada = tipo == 2
+    n_rajada = int(rajada.sum())
+    if n_rajada:
+        grupo = np.arange(n_rajada) // 10
+        a_user[rajada] = rng.integers(1, n_users + 1, grupo.max() + 1)[grupo]
+        base = rng.integers(0, days * 86400, grupo.max() + 1)[grupo]
+        a_seg[rajada] = base + rng.integers(0, 300, n_rajada)
+
+    op = np.concatenate([op, a_op])
+    segundos = np.concatenate([segundos, a_seg])
+    user = np.concatenate([user, a_user])
+    valor = np.concatenate([valor, a_valor])
+    labels = np.concatenate([np.zeros(n_normal, dtype=bool), np.ones(n_anom, dtype=bool)])
+
+    # Como na API, os ids seguem a ordem cronológica
+    ordem = np.argsort(segundos, kind='stable')
+    op, segundos, user, valor, labels = op[ordem], segundos[ordem], user[ordem], valor[ordem], labels[ordem]
+
+    tabelas = np.array([o[0] for o in _OPERACOES], dtype=object)
+    operacoes = np.array([o[1] for o in _OPERACOES], dtype=object)
+    descricoes = np.array([o[2] for o in _OPERACOES], dtype=object)
+    transf = op == _TRANSFERENCIA
+    dados_novos = np.full(rows, None, dtype=object)
+    dados_novos[transf] = _dados_novos(valor[transf], rng.integers(1, n_users + 1, int(transf.sum())))
+
+    logs = pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'tabela': tabelas[op],
+        'tipo_operacao': operacoes[op],
+        'descricao': descricoes[op],
+        'dados_antigos': np.full(rows, None, dtype=object),
+        'dados_novos': dados_novos,
+        'user_id': user,
+        'data': pd.to_datetime(inicio + segundos.astype('timedelta64[s]')).astype('datetime64[ns]'),
+    })
+    return narrow_dtypes(logs), labels
+
+
+def write_api_json(logs: pd.DataFrame, path, chunk_size=100_000):
+    """Grava os logs como o array JSON devolvido pela API, em blocos para não montá-lo em memória."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for start in range(0, len(logs), chunk_size):
+            chunk = logs.iloc[start:start + chunk_size].rename(columns=_API_COLUMNS)
+            chunk = chunk.assign(data=chunk['data'].dt.strftime('%Y-%m-%dT%H:%M:%S'))
+            if start:
+                f.write(',')
+            f.write(chunk.to_json(orient='records', force_ascii=False)[1:-1])
+        f.write(']')
+
+
+def to_api_records(logs: pd.DataFrame) -> list:
+    """Converte os logs em lista de registros no formato da API (para `LocalLogsAPI`)."""
+    logs = logs.rename(columns=_API_COLUMNS)
+    logs = logs.assign(data=logs['data'].dt.strftime('%Y-%m-%dT%H:%M:%S'))
+    return json.loads(logs.to_json(orient='records', force_ascii=False))
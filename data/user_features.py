@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+from data.preprocessing import transfer_values
+
+# Colunas produzidas pelo motor de features comportamentais
+USER_FEATURE_COLUMNS = [
+    'falhas_login_recentes',
+    'transferencias_ultima_hora',
+    'valor_transferido_ultima_hora',
+    'segundos_desde_ultima_operacao',
+]
+
+
+class UserBehaviorFeatures:
+    """Agregados por usuário em janelas móveis, atualizados apenas com os eventos novos.
+
+    O estado guarda somente os eventos de cada usuário que ainda caem dentro da
+    maior janela, mais o horário da última operação de cada um, de modo que
+    cada atualização custa O(eventos novos + eventos recentes).
+    """
+
+    def __init__(self, login_window='10min', transfer_window='1h'):
+        self.login_window = login_window
+        self.transfer_window = transfer_window
+        self.state_ = None
+        self.last_seen_ = pd.Series(dtype='datetime64[ns]')
+        self.features_ = pd.DataFrame(columns=USER_FEATURE_COLUMNS, dtype='float32')
+        self.n_seen_ = 0
+
+    def _events(self, logs: pd.DataFrame) -> pd.DataFrame:
+        tabela = logs['tabela']
+        # `.str` em colunas categóricas opera só sobre as categorias
+        sucesso = logs['descricao'].str.contains('SUCESSO', na=False).to_numpy() \
+            if 'descricao' in logs.columns else np.zeros(len(logs), dtype=bool)
+        transferencia = (tabela == 'transferencia').to_numpy()
+        valor = transfer_values(logs).fillna(0.0).to_numpy() if 'dados_novos' in logs.columns \
+            or 'valor_transferencia' in logs.columns else np.zeros(len(logs))
+        return pd.DataFrame({
+            'user_id': logs['user_id'].to_numpy(),
+            'data': pd.to_datetime(logs['data']).to_numpy(),
+            'falha_login': ((tabela == 'usuario').to_numpy() & ~sucesso).astype(float),
+            'transferencia': transferencia.astype(float),
+            'valor': np.where(transferencia, valor, 0.0),
+        }, index=logs.index)
+
+    def _compute(self, logs: pd.DataFrame) -> pd.DataFrame:
+        novos = self._events(logs)
+        novos['_pos'] = np.arange(len(novos))
+        # Eventos sem data não cabem em nenhuma janela: ficam fora do cálculo e do estado,
+        # com contagens zeradas e sem intervalo desde a operação anterior
+        novos = novos.loc[novos['data'].notna()]
+        neutro = pd.DataFrame({col: np.float32(np.nan if col == 'segundos_desde_ultima_operacao' else 0)
+                               for col in USER_FEATURE_COLUMNS}, index=np.arange(len(logs)))
+        if novos.empty:
+            return neutro.set_axis(logs.index)
+        anteriores = self.state_ if self.state_ is not None else novos.iloc[:0]
+        comb = pd.concat([anteriores.assign(_pos=-1), novos], ignore_index=True)
+        comb = comb.sort_values(['user_id', 'data'], kind='stable', ignore_index=True)
+
+        grupos = comb.groupby('user_id', sort=False, dropna=False)
+        # Como `comb` já está ordenado por usuário e data, o resultado do
+        # rolling sai na mesma ordem das linhas de `comb`
+        falhas = grupos.rolling(self.login_window, on='data')['falha_login'].sum()
+        transf = grupos.rolling(self.transfer_window, on='data')[['transferencia', 'valor']].sum()
+        anterior = grupos['data'].shift()
+        # Primeiro evento do usuário neste lote: usa a última operação conhecida
+        anterior = anterior.fillna(comb['user_id'].map(self.last_seen_))
+
+        result = pd.DataFrame({
+            'falhas_login_recentes': falhas.to_numpy(),
+            'transferencias_ultima_hora': transf['transferencia'].to_numpy(),
+            'valor_transferido_ultima_hora': transf['valor'].to_numpy(),
+            'segundos_desde_ultima_operacao': (comb['data'] - anterior).dt.total_seconds().to_numpy(),
+        }, dtype='float32')
+        novo = (comb['_pos'] >= 0).to_numpy()
+        result = result[novo].set_axis(comb.loc[novo, '_pos'].to_numpy())
+        if len(result) < len(logs):
+            result = result.combine_first(neutro).astype('float32')[USER_FEATURE_COLUMNS]
+        result = result.sort_index().set_axis(logs.index)
+
+        # Atualiza o estado: só os eventos dentro da maior janela e o último horário por usuário
+        horizonte = comb['data'].max() - max(pd.Timedelta(self.login_window),
+                                             pd.Timedelta(self.transfer_window))
+        self.state_ = comb.loc[comb['data'] > horizonte].drop(columns='_pos').reset_index(drop=True)
+        ultimos = comb.groupby('user_id', sort=False)['data'].max()
+        self.last_seen_ = pd.concat([self.last_seen_, ultimos]).groupby(level=0).max()
+        return result
+
+    def update(self, logs: pd.DataFrame) -> pd.DataFrame:
+        """Calcula as features dos registros ainda não vistos e retorna as de todos os `logs`."""
+        if 'user_id' not in logs.columns or 'data' not in logs.columns or 'tabela' not in logs.columns:
+            return pd.DataFrame(index=logs.index)
+        if len(logs) < self.n_seen_:
+            self.__init__(self.login_window, self.transfer_window)
+        if len(logs) > self.n_seen_:
+            novos = self._compute(logs.iloc[self.n_seen_:])
+            self.features_ = pd.concat([self.features_, novos]) if self.n_seen_ else novos
+            self.n_seen_ = len(logs)
+        return self.features_.set_axis(logs.index)
+
+    def fork(self) -> 'UserBehaviorFeatures':
+        """Novo motor que continua a partir das janelas atuais, sem as features já calculadas."""
+        engine = UserBehaviorFeatures(self.login_window, self.transfer_window)
+        engine.state_ = None if self.state_ is None else self.state_.copy()
+        engine.last_seen_ = self.last_seen_.copy()
+        return engine
+
+    def update_batch(self, batch: pd.DataFrame) -> pd.DataFrame:
+        """Calcula as features só de um lote de eventos novos (streaming), sem acumular o histórico."""
+        if 'user_id' not in batch.columns or 'data' not in batch.columns or 'tabela' not in batch.columns:
+            return pd.DataFrame(index=batch.index)
+        return self._compute(batch)
+
+
+def add_user_features(logs: pd.DataFrame, engine: UserBehaviorFeatures = None) -> pd.DataFrame:
+    """Acrescenta aos logs as features comportamentais por usuário."""
+    engine = engine or UserBehaviorFeatures()
+    return logs.join(engine.update(logs))
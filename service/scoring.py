@@ -0,0 +1,351 @@
+"""Pontuação de logs sem Streamlit: CLI e endpoint HTTP local.
+
+Exemplos:
+    python -m service.scoring score --url https://banco-facul.onrender.com/logs --output anomalias.jsonl
+    python -m service.scoring score --input logs.json
+    python -m service.scoring serve --port 8080 --history historico.json --model modelo.joblib
+    python -m service.scoring score --input logs.json --profile etapas.json
+    python -m service.scoring score --input logs.json --detector ensemble
+    python -m service.scoring score --input logs.json --sample-size 200000
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from algorithms.detectors import DETECTOR_NAMES, Detector, detector_groups, make_detector
+from algorithms.isolation_forest import score_chunked, score_parallel, train_isolation_forest
+from algorithms.model_registry import (
+    load_or_train_detector, load_or_train_isolation_forest, load_or_train_isolation_forest_sample
+)
+from data.loader import fetch_logs, normalize_logs
+from data.sampling import sampling_strata, stratified_sample
+from data.user_features import add_user_features
+from data.preprocessing import (
+    FeaturePipeline, default_features, extract_time_features, preprocess, preprocess_transfer_values
+)
+from utils.profiling import Profiler
+
+
+def prepare_logs(logs: pd.DataFrame, profiler: Profiler = None) -> pd.DataFrame:
+    """Deriva as colunas usadas como features (valor, hora e agregados por usuário)."""
+    profiler = profiler or Profiler()
+    with profiler.stage('preprocess_transfer_values', rows=len(logs)):
+        logs = preprocess_transfer_values(logs)
+    with profiler.stage('extract_time_features', rows=len(logs)):
+        logs = extract_time_features(logs)
+    with profiler.stage('user_features', rows=len(logs)):
+        return add_user_features(logs)
+
+
+def score_logs(logs: pd.DataFrame, features=None, n_estimators=100, contamination=0.05,
+               random_state=42, pipeline=None, n_jobs=None, profiler: Profiler = None,
+               detector='isolation_forest', sample_size=None) -> pd.DataFrame:
+    """Aplica o mesmo pipeline do dashboard e retorna os logs com `anomaly_score` e `anomaly`.
+
+    Com um `FeaturePipeline` já ajustado, os logs são apenas transformados por ele.
+    Se um `Profiler` for passado, cada etapa é registrada nele. `detector` é um
+    dos nomes de `algorithms.detectors.DETECTOR_NAMES`; com `sample_size`, o
+    Isolation Forest é ajustado numa amostra estratificada e pontua tudo em blocos.
+    """
+    profiler = profiler or Profiler()
+    logs = prepare_logs(logs, profiler)
+    if detector == 'isolation_forest' and sample_size and len(logs) > sample_size:
+        # Só a amostra é transformada de uma vez; o histórico é transformado bloco a bloco
+        with profiler.stage('train_isolation_forest_sampled', rows=sample_size):
+            pipeline, model = fit_sampled(logs, features or default_features(logs), sample_size,
+                                          n_estimators=n_estimators, contamination=contamination,
+                                          random_state=random_state, n_jobs=n_jobs, pipeline=pipeline)
+        with profiler.stage('score_chunked', rows=len(logs)):
+            scores = score_chunked(model, logs, n_jobs, transform=pipeline.transform)
+        logs['anomaly_score'] = scores
+        logs['anomaly'] = np.where(scores < 0, -1, 1).astype(np.int8)
+        return logs
+
+    with profiler.stage('preprocess', rows=len(logs)):
+        if pipeline is not None:
+            X = pipeline.transform(logs)
+        else:
+            X = preprocess(logs, features or default_features(logs))
+    if detector == 'isolation_forest':
+        with profiler.stage('train_isolation_forest', rows=len(X)):
+            _, preds, scores = load_or_train_isolation_forest(
+                X, n_estimators=n_estimators, contamination=contamination, random_state=random_state,
+                n_jobs=n_jobs
+            )
+    else:
+        model = make_detector(detector, n_estimators=n_estimators, contamination=contamination,
+                              random_state=random_state, n_jobs=n_jobs)
+        with profiler.stage('train_detector', rows=len(X)):
+            _, preds, scores = load_or_train_detector(model, X, groups=detector_groups(logs))
+    logs['anomaly_score'] = scores
+    logs['anomaly'] = preds
+    return logs
+
+
+def fit_sampled(logs: pd.DataFrame, features, sample_size, n_estimators=100, contamination=0.05,
+                random_state=42, n_jobs=None, pipeline=None):
+    """Ajusta pipeline (se não for dado) e Isolation Forest numa amostra estratificada dos logs.
+
+    Retorna `(pipeline, modelo)`, com o limiar calibrado na amostra; o
+    histórico inteiro não é transformado (ver `score_chunked` com `transform`).
+    """
+    rows = stratified_sample(sampling_strata(logs), sample_size, random_state=random_state)
+    sample = logs.iloc[rows]
+    if pipeline is None:
+        pipeline = FeaturePipeline(list(features)).fit(sample)
+    model = load_or_train_isolation_forest_sample(
+        pipeline.transform(sample), n_estimators=n_estimators, contamination=contamination,
+        random_state=random_state, n_jobs=n_jobs
+    )
+    return pipeline, model
+
+
+class TrainedModel:
+    """Pipeline e detector ajustados uma única vez sobre um histórico.
+
+    Cada lote recebido depois é apenas transformado e pontuado, com o limiar
+    aprendido no histórico: um lote sem nada de estranho não tem anomalias.
+    """
+
+    def __init__(self, pipeline: FeaturePipeline, model, n_jobs=None):
+        self.pipeline = pipeline
+        self.model = model
+        self.n_jobs = n_jobs
+
+    def score(self, logs: pd.DataFrame, profiler: Profiler = None) -> pd.DataFrame:
+        """Retorna os logs com `anomaly_score` e `anomaly`, sem reajustar nada."""
+        profiler = profiler or Profiler()
+        logs = prepare_logs(logs, profiler)
+        with profiler.stage('preprocess', rows=len(logs)):
+            X = self.pipeline.transform(logs)
+        with profiler.stage('score', rows=len(X)):
+            if isinstance(self.model, Detector):
+                scores = self.model.decision_function(X, detector_groups(logs))
+            else:
+                scores = score_parallel(self.model, X, self.n_jobs)
+        logs['anomaly_score'] = scores
+        logs['anomaly'] = np.where(scores < 0, -1, 1).astype(np.int8)
+        return logs
+
+    def save(self, path):
+        joblib.dump({'pipeline': self.pipeline, 'model': self.model}, path)
+
+    @classmethod
+    def load(cls, path, n_jobs=None) -> 'TrainedModel':
+        saved = joblib.load(path)
+        return cls(saved['pipeline'], saved['model'], n_jobs=n_jobs)
+
+
+def fit_model(history: pd.DataFrame, features=None, n_estimators=100, contamination=0.05, random_state=42,
+              n_jobs=None, detector='isolation_forest', sample_size=None) -> TrainedModel:
+    """Ajusta pipeline e detector sobre o histórico (mesmos parâmetros de `score_logs`)."""
+    logs = prepare_logs(history)
+    features = features or default_features(logs)
+    if detector == 'isolation_forest' and sample_size and len(logs) > sample_size:
+        pipeline, model = fit_sampled(logs, features, sample_size, n_estimators=n_estimators,
+                                      contamination=contamination, random_state=random_state, n_jobs=n_jobs)
+        return TrainedModel(pipeline, model, n_jobs=n_jobs)
+
+    pipeline = FeaturePipeline(features).fit(logs)
+    X = pipeline.transform(logs)
+    if detector != 'isolation_forest':
+        model = make_detector(detector, n_estimators=n_estimators, contamination=contamination,
+                              random_state=random_state, n_jobs=n_jobs).fit(X, detector_groups(logs))
+    else:
+        model, _, _ = train_isolation_forest(X, n_estimators=n_estimators, contamination=contamination,
+                                             random_state=random_state, n_jobs=n_jobs)
+    return TrainedModel(pipeline, model, n_jobs=n_jobs)
+
+
+def anomalies_to_jsonl(logs: pd.DataFrame, only_anomalies=True) -> str:
+    """Serializa os registros pontuados (por padrão só as anomalias) em JSON Lines."""
+    if only_anomalies:
+        logs = logs[logs['anomaly'] == -1].sort_values('anomaly_score')
+    if logs.empty:
+        return ''
+    return logs.to_json(orient='records', lines=True, date_format='iso', force_ascii=False)
+
+
+def _score_params(args) -> dict:
+    return {
+        'features': args.features,
+        'n_estimators': args.n_estimators,
+        'contamination': args.contamination,
+        'random_state': args.random_state,
+        'n_jobs': args.n_jobs,
+        'detector': args.detector,
+        'sample_size': args.sample_size,
+    }
+
+
+def _read_logs(path=None, url=None) -> pd.DataFrame:
+    if path:
+        with open(path, encoding='utf-8') as f:
+            return normalize_logs(json.load(f))
+    return fetch_logs(url, stream=True)
+
+
+def _trained_model(args):
+    """Modelo de `--model` (se o arquivo existir) ou ajustado no histórico de `--history`/`--history-url`.
+
+    Retorna `None` sem nenhuma das opções. Com `--model` e histórico, o modelo
+    ajustado é salvo no caminho dado, para as próximas execuções.
+    """
+    if args.model and os.path.exists(args.model):
+        return TrainedModel.load(args.model, n_jobs=args.n_jobs)
+    if not (args.history or args.history_url):
+        if args.model:
+            raise SystemExit(f"Modelo {args.model} não encontrado; informe --history ou --history-url para ajustá-lo.")
+        return None
+    params = _score_params(args)
+    trained = fit_model(_read_logs(args.history, args.history_url), **params)
+    if args.model:
+        trained.save(args.model)
+    return trained
+
+
+def _load_or_fit_pipeline(path, logs, features):
+    """Carrega o pipeline salvo em `path` ou ajusta um novo sobre `logs` e o salva."""
+    if os.path.exists(path):
+        return FeaturePipeline.load(path)
+    logs = prepare_logs(logs)
+    pipeline = FeaturePipeline(features or default_features(logs)).fit(logs)
+    pipeline.save(path)
+    return pipeline
+
+
+def _cmd_score(args):
+    profiler = Profiler()
+    with profiler.stage('load_logs') as stage:
+        logs = _read_logs(args.input, args.url)
+        stage.rows = len(logs)
+
+    trained = _trained_model(args)
+    if trained is not None:
+        scored = trained.score(logs, profiler)
+    else:
+        # Sem histórico, o próprio lote é o conjunto analisado (ajuste e pontuação)
+        params = _score_params(args)
+        if args.pipeline:
+            params['pipeline'] = _load_or_fit_pipeline(args.pipeline, logs, args.features)
+        scored = score_logs(logs, profiler=profiler, **params)
+    if args.profile:
+        with open(args.profile, 'w', encoding='utf-8') as f:
+            f.write(profiler.to_json())
+    out = anomalies_to_jsonl(scored, only_anomalies=not args.all)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(out)
+    else:
+        sys.stdout.write(out)
+
+
+def make_server(trained: TrainedModel, host='127.0.0.1', port=8080) -> ThreadingHTTPServer:
+    """Cria o servidor HTTP: `POST /score` recebe um array JSON de logs e devolve JSONL.
+
+    Os lotes são pontuados com o modelo `trained`, ajustado antes sobre o
+    histórico; nenhuma requisição treina um modelo.
+
+    `GET /metrics` expõe, no formato do Prometheus, os tempos de cada etapa da última pontuação.
+    """
+    last = {'profiler': Profiler()}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, body: bytes, content_type):
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            with lock:
+                body = last['profiler'].to_prometheus().encode('utf-8')
+            self._send(body, 'text/plain; version=0.0.4')
+
+        def do_POST(self):
+            if self.path.split('?')[0] != '/score':
+                self.send_error(404)
+                return
+            profiler = Profiler()
+            try:
+                with profiler.stage('load_logs') as stage:
+                    length = int(self.headers.get('Content-Length', 0))
+                    logs = normalize_logs(json.loads(self.rfile.read(length)))
+                    stage.rows = len(logs)
+                body = anomalies_to_jsonl(trained.score(logs, profiler)).encode('utf-8')
+            except (ValueError, KeyError) as e:
+                self.send_error(400, str(e))
+                return
+            with lock:
+                last['profiler'] = profiler
+            self._send(body, 'application/x-ndjson')
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def _cmd_serve(args):
+    trained = _trained_model(args)
+    if trained is None:
+        raise SystemExit("serve precisa de um modelo: informe --model (já salvo) ou --history/--history-url.")
+    server = make_server(trained, args.host, args.port)
+    print(f"Servindo em http://{args.host}:{server.server_address[1]}/score", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detecção de anomalias em logs sem o dashboard.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    model = argparse.ArgumentParser(add_help=False)
+    model.add_argument('--features', nargs='+', help="Features do modelo (padrão: todas).")
+    model.add_argument('--n-estimators', type=int, default=100)
+    model.add_argument('--contamination', type=float, default=0.05)
+    model.add_argument('--random-state', type=int, default=42)
+    model.add_argument('--n-jobs', type=int, default=None, help="Processos para treino/pontuação (-1: todos).")
+    model.add_argument('--detector', choices=DETECTOR_NAMES, default='isolation_forest',
+                       help="Algoritmo de detecção (ensemble: HBOS e z-score, Isolation Forest nos candidatos).")
+    model.add_argument('--sample-size', type=int, default=None,
+                       help="Isolation Forest: treina numa amostra estratificada deste tamanho e pontua tudo em blocos.")
+
+    model.add_argument('--history', help="Arquivo JSON com o histórico usado para ajustar o modelo uma vez.")
+    model.add_argument('--history-url', help="URL da API com o histórico usado para ajustar o modelo uma vez.")
+    model.add_argument('--model', help="Modelo salvo (pipeline e detector); criado a partir do histórico se não existir.")
+
+    score = sub.add_parser('score', parents=[model], help="Pontua um lote de logs e emite JSONL.")
+    source = score.add_mutually_exclusive_group(required=True)
+    source.add_argument('--url', help="URL da API de logs.")
+    source.add_argument('--input', help="Arquivo JSON com um array de logs.")
+    score.add_argument('--output', help="Arquivo JSONL de saída (padrão: stdout).")
+    score.add_argument('--all', action='store_true', help="Emite todos os registros, não só as anomalias.")
+    score.add_argument('--pipeline', help="Pipeline de pré-processamento salvo (ajustado e salvo se não existir).")
+    score.add_argument('--profile', help="Arquivo JSON com o tempo, linhas e memória de cada etapa.")
+    score.set_defaults(func=_cmd_score)
+
+    serve = sub.add_parser('serve', parents=[model], help="Sobe o endpoint HTTP de pontuação.")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8080)
+    serve.set_defaults(func=_cmd_serve)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
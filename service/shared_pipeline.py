@@ -0,0 +1,246 @@
+"""Camada de cálculo compartilhada entre as sessões do dashboard.
+
+Os logs carregados (já com as features derivadas), o pipeline, o modelo e os
+scores ficam uma única vez por processo. Cada versão recebe um token barato
+(um contador), usado pelas sessões e pelos caches de gráficos e SHAP no lugar
+de hashes do DataFrame inteiro. Só uma sessão por vez reajusta um modelo;
+enquanto isso as demais recebem a versão anterior, se houver.
+"""
+import itertools
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+
+from algorithms.detectors import detector_groups, make_detector
+from algorithms.isolation_forest import score_chunked
+from algorithms.model_registry import load_or_train_detector, load_or_train_isolation_forest
+from data.async_loader import load_sources, reset_sources
+from data.preprocessing import FeaturePipeline, extract_time_features, preprocess_transfer_values
+from data.user_features import UserBehaviorFeatures
+from service.scoring import fit_sampled
+from utils.profiling import Profiler
+
+# Resultados pontuados mantidos em memória (os menos usados saem primeiro)
+MAX_SCORED_VERSIONS = 4
+# Treino amostrado: crescimento do histórico (fração) a partir do qual o modelo é reajustado
+SAMPLED_REFIT_GROWTH = 0.2
+
+_VERSIONS = itertools.count(1)
+
+# Logs preparados por conjunto de fontes
+_DATASETS = {}
+_DATASETS_LOCK = threading.Lock()
+# Uma carga por vez para cada conjunto de fontes
+_LOAD_LOCKS = {}
+
+# Resultados por (token dos logs, parâmetros) e o último pronto por (fontes, parâmetros)
+_SCORED = OrderedDict()
+_LATEST = {}
+_SCORED_LOCK = threading.Lock()
+# Um único reajuste de modelo por vez no processo
+_REFIT_LOCK = threading.Lock()
+
+
+class Dataset:
+    """Logs de um conjunto de fontes, com valor, hora e features por usuário já calculados."""
+
+    def __init__(self, sources_key, logs, user_features: UserBehaviorFeatures):
+        self.sources_key = sources_key
+        self.logs = logs
+        self.user_features = user_features
+        self.token = f"logs-{next(_VERSIONS)}"
+
+
+class ScoredLogs:
+    """Pipeline, matriz de features, modelo e scores de uma versão dos logs.
+
+    No treino amostrado a matriz de features não é guardada: `X` só é
+    calculado se for pedido (ex.: pelo SHAP).
+    """
+
+    def __init__(self, dataset: Dataset, params: tuple, pipeline, X, model, preds, scores, fitted_rows=None):
+        self.dataset = dataset
+        self.params = params
+        self.pipeline = pipeline
+        self._X = X
+        self.model = model
+        # Linhas dos logs quando o modelo foi ajustado (no treino amostrado ele é reaproveitado)
+        self.fitted_rows = len(dataset.logs) if fitted_rows is None else fitted_rows
+        self.preds = preds
+        self.scores = scores
+        # Cópia rasa: só as colunas de resultado são novas
+        self.logs = dataset.logs.copy(deep=False)
+        self.logs['anomaly_score'] = scores
+        self.logs['anomaly'] = preds
+        self.token = f"{dataset.token}-scored-{next(_VERSIONS)}"
+        self._model_version = None
+
+    @property
+    def X(self):
+        if self._X is None:
+            self._X = self.pipeline.transform(self.dataset.logs)
+        return self._X
+
+    @property
+    def model_version(self) -> str:
+        """Identificador estável do modelo (detector e hash dos parâmetros ajustados)."""
+        if self._model_version is None:
+            self._model_version = f"{self.params[1]}-{joblib.hash(self.model)[:12]}"
+        return self._model_version
+
+
+def load_dataset(sources: dict, store_base=None, page_size=None, profiler: Profiler = None):
+    """Carrega as novas linhas das fontes e retorna `(Dataset, erros)`.
+
+    Sem linhas novas, a mesma instância (e o mesmo token) é devolvida, de modo
+    que nada abaixo precisa ser recalculado.
+    """
+    profiler = profiler or Profiler()
+    key = tuple(sources.items())
+    # Só as cargas das mesmas fontes esperam umas pelas outras; `current_dataset`
+    # e as demais fontes não ficam presos atrás da rede ou do pré-processamento
+    with _load_lock(key):
+        with profiler.stage('load_logs') as stage:
+            raw, errors = load_sources(sources, store_base=store_base, page_size=page_size)
+            stage.rows = len(raw)
+        with _DATASETS_LOCK:
+            dataset = _DATASETS.get(key)
+        if dataset is not None and len(dataset.logs) == len(raw):
+            return dataset, errors
+
+        # Os logs só crescem; se encolheram (recarga completa), o estado por usuário recomeça
+        user_features = dataset.user_features if dataset is not None and len(raw) > len(dataset.logs) \
+            else UserBehaviorFeatures()
+        with profiler.stage('preprocess_transfer_values', rows=len(raw)):
+            logs = preprocess_transfer_values(raw)
+        with profiler.stage('extract_time_features', rows=len(logs)):
+            logs = extract_time_features(logs)
+        with profiler.stage('user_features', rows=len(logs)):
+            logs = logs.join(user_features.update(logs))
+        dataset = Dataset(key, logs, user_features)
+        with _DATASETS_LOCK:
+            _DATASETS[key] = dataset
+        return dataset, errors
+
+
+def _load_lock(key) -> threading.Lock:
+    with _DATASETS_LOCK:
+        return _LOAD_LOCKS.setdefault(key, threading.Lock())
+
+
+def current_dataset(sources: dict):
+    """Último `Dataset` carregado das fontes, sem consultar as APIs (`None` se ainda não houver)."""
+    with _DATASETS_LOCK:
+        return _DATASETS.get(tuple(sources.items()))
+
+
+def reset_dataset(sources: dict, store_base=None):
+    """Descarta os logs e resultados das fontes, forçando uma carga completa na próxima leitura."""
+    key = tuple(sources.items())
+    with _load_lock(key):
+        reset_sources(sources, store_base=store_base)
+        with _DATASETS_LOCK:
+            _DATASETS.pop(key, None)
+    with _SCORED_LOCK:
+        for scored_key in [k for k in _SCORED if _SCORED[k].dataset.sources_key == key]:
+            del _SCORED[scored_key]
+        for latest_key in [k for k in _LATEST if k[0] == key]:
+            del _LATEST[latest_key]
+
+
+def _fit(dataset: Dataset, params: tuple, n_jobs, profiler: Profiler) -> ScoredLogs:
+    features, detector, n_estimators, contamination, random_state, sample_size = params
+    logs = dataset.logs
+    if detector == 'isolation_forest' and sample_size and len(logs) > sample_size:
+        return _fit_sampled(dataset, params, n_jobs, profiler)
+    with profiler.stage('preprocess', rows=len(logs)):
+        pipeline = FeaturePipeline(list(features)).fit(logs)
+        X = pipeline.transform(logs)
+    if detector == 'isolation_forest':
+        with profiler.stage('train_isolation_forest', rows=len(X)):
+            model, preds, scores = load_or_train_isolation_forest(
+                X, n_estimators=n_estimators, contamination=contamination, random_state=random_state,
+                n_jobs=n_jobs
+            )
+    else:
+        model = make_detector(detector, n_estimators=n_estimators, contamination=contamination,
+                              random_state=random_state, n_jobs=n_jobs)
+        with profiler.stage('train_detector', rows=len(X)):
+            model, preds, scores = load_or_train_detector(model, X, groups=detector_groups(logs))
+    return ScoredLogs(dataset, params, pipeline, X, model, np.asarray(preds), np.asarray(scores))
+
+
+def _fit_sampled(dataset: Dataset, params: tuple, n_jobs, profiler: Profiler) -> ScoredLogs:
+    features, _, n_estimators, contamination, random_state, sample_size = params
+    logs = dataset.logs
+    with _SCORED_LOCK:
+        previous = _LATEST.get((dataset.sources_key, params))
+    # O modelo e seu limiar valem enquanto os logs só crescem (o mesmo motor de features)
+    # e o histórico não passou de `SAMPLED_REFIT_GROWTH` além do usado no ajuste:
+    # até lá só as linhas novas são pontuadas e o corte não muda entre as recargas
+    if previous is not None and previous.dataset.user_features is dataset.user_features \
+            and len(previous.logs) <= len(logs) <= previous.fitted_rows * (1 + SAMPLED_REFIT_GROWTH):
+        pipeline, model, fitted_rows = previous.pipeline, previous.model, previous.fitted_rows
+        start, scores = len(previous.logs), [previous.scores]
+    else:
+        with profiler.stage('train_isolation_forest_sampled', rows=sample_size):
+            pipeline, model = fit_sampled(logs, features, sample_size, n_estimators=n_estimators,
+                                          contamination=contamination, random_state=random_state, n_jobs=n_jobs)
+        fitted_rows, start, scores = len(logs), 0, []
+    with profiler.stage('score_chunked', rows=len(logs) - start):
+        scores.append(score_chunked(model, logs.iloc[start:], n_jobs, transform=pipeline.transform))
+    scores = np.concatenate(scores)
+    preds = np.where(scores < 0, -1, 1).astype(np.int8)
+    return ScoredLogs(dataset, params, pipeline, None, model, preds, scores, fitted_rows=fitted_rows)
+
+
+def score_dataset(dataset: Dataset, features, detector='isolation_forest', n_estimators=100,
+                  contamination=0.05, random_state=42, n_jobs=None, profiler: Profiler = None,
+                  anomaly_store=None, sample_size=None):
+    """Retorna `(ScoredLogs, atual)` para a versão dos logs e os parâmetros dados.
+
+    Se outra sessão já estiver reajustando um modelo e existir um resultado
+    anterior para os mesmos parâmetros, ele é devolvido com `atual=False` em
+    vez de esperar; caso contrário a chamada espera e reaproveita o resultado.
+    Com `anomaly_store` (um `AnomalyStore`) as anomalias de cada novo
+    resultado são gravadas no histórico. `sample_size` ativa, no Isolation
+    Forest, o treino numa amostra estratificada (ver `service.scoring.fit_sampled`);
+    o modelo amostrado e seu limiar são mantidos entre as recargas até o
+    histórico crescer mais que `SAMPLED_REFIT_GROWTH`.
+    """
+    profiler = profiler or Profiler()
+    # A amostragem só se aplica ao Isolation Forest; nos demais não deve separar resultados
+    sample_size = sample_size if detector == 'isolation_forest' else None
+    params = (tuple(features), detector, n_estimators, contamination, random_state, sample_size)
+    key = (dataset.token, params)
+    latest_key = (dataset.sources_key, params)
+    with _SCORED_LOCK:
+        if key in _SCORED:
+            _SCORED.move_to_end(key)
+            return _SCORED[key], True
+        stale = _LATEST.get(latest_key)
+
+    if not _REFIT_LOCK.acquire(blocking=stale is None):
+        return stale, False
+    try:
+        # Outra sessão pode ter calculado o mesmo resultado enquanto esta esperava
+        with _SCORED_LOCK:
+            if key in _SCORED:
+                return _SCORED[key], True
+        scored = _fit(dataset, params, n_jobs, profiler)
+        if anomaly_store is not None:
+            with profiler.stage('record_anomalies', rows=len(scored.logs)):
+                anomaly_store.record(scored.logs, scored.model_version, fonte=dataset.sources_key[0][0])
+    finally:
+        _REFIT_LOCK.release()
+
+    with _SCORED_LOCK:
+        _SCORED[key] = scored
+        _LATEST[latest_key] = scored
+        while len(_SCORED) > MAX_SCORED_VERSIONS:
+            _, evicted = _SCORED.popitem(last=False)
+            if _LATEST.get((evicted.dataset.sources_key, evicted.params)) is evicted:
+                del _LATEST[(evicted.dataset.sources_key, evicted.params)]
+    return scored, True
@@ -0,0 +1,451 @@
+"""Ingestão em tempo real: eventos de log recebidos por socket ou arquivo, pontuados em micro-lotes.
+
+Cada evento é um objeto JSON por linha, no mesmo formato da API de logs. Os
+eventos entram numa fila, são agrupados por tamanho ou tempo e pontuados com o
+modelo atual; as anomalias vão para um buffer lido pelo dashboard e para um
+sink (arquivo JSONL).
+
+Exemplos:
+    python -m service.stream --input historico.json --tcp 127.0.0.1:9009 --sink anomalias.jsonl
+    python -m service.stream --url https://banco-facul.onrender.com/logs --tail eventos.jsonl
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import stat
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from algorithms.detectors import DETECTOR_NAMES, Detector, detector_groups, make_detector
+from algorithms.model_registry import load_or_train_detector
+from data.loader import fetch_logs, normalize_logs
+from data.preprocessing import (
+    FeaturePipeline, default_features, extract_time_features, preprocess_transfer_values
+)
+from data.user_features import UserBehaviorFeatures
+
+# Tamanho máximo de um micro-lote e espera máxima (s) para completá-lo
+BATCH_SIZE = 500
+MAX_WAIT = 0.5
+# Eventos aguardando pontuação; acima disso os produtores esperam
+MAX_QUEUED_EVENTS = 100_000
+# Anomalias recentes mantidas em memória para o dashboard
+RECENT_ANOMALIES = 1000
+
+# Ingestões ativas por endereço, compartilhadas entre as sessões do dashboard
+_RUNNERS = {}
+_RUNNERS_LOCK = threading.Lock()
+
+
+def valid_event(record) -> bool:
+    """Se o evento pode ser pontuado: precisa de um `data` com data e hora válidas."""
+    try:
+        return not pd.isna(pd.Timestamp(record.get('data')))
+    except (ValueError, TypeError):
+        return False
+
+
+def _put(events: queue.Queue, line):
+    line = line.strip()
+    if not line:
+        return
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return  # Linha inválida: descartada sem derrubar a ingestão
+    if isinstance(record, dict):
+        events.put((time.monotonic(), record))
+
+
+class _LineHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            _put(self.server.events, line.decode('utf-8', errors='replace'))
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _is_socket(path) -> bool:
+    try:
+        return stat.S_ISSOCK(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return False
+
+
+def serve_socket(address, events: queue.Queue) -> socketserver.BaseServer:
+    """Recebe eventos JSON por linha num socket TCP (`(host, porta)`) ou UNIX (caminho).
+
+    O servidor roda num thread próprio; encerre com `shutdown()` e `server_close()`.
+    """
+    if isinstance(address, str):
+        if not hasattr(socketserver, 'ThreadingUnixStreamServer'):
+            raise ValueError("Sockets UNIX não são suportados nesta plataforma; use host:porta.")
+        # Só um socket deixado por uma execução anterior é apagado, nunca outro arquivo
+        if _is_socket(address):
+            os.remove(address)
+        elif os.path.exists(address):
+            raise ValueError(f"{address} já existe e não é um socket UNIX.")
+        server = socketserver.ThreadingUnixStreamServer(address, _LineHandler)
+        server.daemon_threads = True
+    else:
+        server = _TCPServer(address, _LineHandler)
+    server.events = events
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_address(text: str):
+    """`host:porta` vira `(host, porta)`; qualquer outro valor é tratado como caminho de socket UNIX."""
+    host, sep, port = text.rpartition(':')
+    if sep and port.isdigit():
+        return host or '127.0.0.1', int(port)
+    return text
+
+
+def tail_file(path, events: queue.Queue, stop: threading.Event, poll=0.2, from_start=False) -> threading.Thread:
+    """Segue um arquivo JSONL (como `tail -f`), enfileirando cada linha nova."""
+    def run():
+        while not os.path.exists(path) and not stop.is_set():
+            time.sleep(poll)
+        with open(path, encoding='utf-8') as f:
+            if not from_start:
+                f.seek(0, os.SEEK_END)
+            partial = ''
+            while not stop.is_set():
+                line = f.readline()
+                if not line:
+                    time.sleep(poll)
+                    continue
+                partial += line
+                # Linha ainda sendo escrita: espera o restante
+                if partial.endswith('\n'):
+                    _put(events, partial)
+                    partial = ''
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def micro_batches(events: queue.Queue, stop: threading.Event, batch_size=BATCH_SIZE, max_wait=MAX_WAIT):
+    """Agrupa os eventos da fila em lotes de até `batch_size`, esperando no máximo `max_wait` s."""
+    while not stop.is_set():
+        try:
+            first = events.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        batch = [first]
+        deadline = time.monotonic() + max_wait
+        while len(batch) < batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(events.get(timeout=remaining))
+            except queue.Empty:
+                break
+        yield batch
+
+
+class JsonlSink:
+    """Acrescenta as anomalias de cada lote a um arquivo JSON Lines."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, anomalies: pd.DataFrame):
+        if anomalies.empty:
+            return
+        body = anomalies.to_json(orient='records', lines=True, date_format='iso', force_ascii=False)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(body if body.endswith('\n') else body + '\n')
+
+
+class StreamScorer:
+    """Pontua micro-lotes com o pipeline e o modelo atuais.
+
+    `model` é qualquer objeto com `decision_function` (Isolation Forest do
+    sklearn, `SlidingWindowIsolationForest` ou um detector de
+    `algorithms.detectors`); o par pode ser trocado com `set_model` sem
+    interromper a ingestão.
+    """
+
+    def __init__(self, pipeline: FeaturePipeline, model, user_features: UserBehaviorFeatures = None,
+                 sink=None, keep=RECENT_ANOMALIES):
+        self.pipeline = pipeline
+        self.model = model
+        self.user_features = user_features or UserBehaviorFeatures()
+        self.sink = sink
+        self.anomalies = deque(maxlen=keep)
+        self.events = 0
+        self.batches = 0
+        self.n_anomalies = 0
+        # Eventos descartados por não poderem ser pontuados (sem data válida, etc.)
+        self.rejected = 0
+        # Latência (s) entre a chegada do evento mais antigo de cada lote e o fim da pontuação
+        self.latencies = deque(maxlen=keep)
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def set_model(self, pipeline: FeaturePipeline, model, user_features: UserBehaviorFeatures = None):
+        with self._lock:
+            self.pipeline, self.model = pipeline, model
+            if user_features is not None:
+                self.user_features = user_features
+
+    @staticmethod
+    def _prepare(logs: pd.DataFrame, user_features: UserBehaviorFeatures) -> pd.DataFrame:
+        logs = extract_time_features(preprocess_transfer_values(logs))
+        return logs.join(user_features.update_batch(logs))
+
+    def score_batch(self, records: list, received=None) -> pd.DataFrame:
+        """Pontua um lote de registros da API; retorna-o com `anomaly_score` e `anomaly`.
+
+        Eventos inválidos (ver `valid_event`) são descartados e contados, sem
+        impedir a pontuação dos demais.
+        """
+        valid = [record for record in records if valid_event(record)]
+        with self._lock:
+            self.rejected += len(records) - len(valid)
+            if not valid:
+                return pd.DataFrame()
+            # As janelas por usuário avançam numa cópia, adotada só se o lote for pontuado:
+            # se falhar, o reprocessamento evento a evento parte do mesmo estado
+            user_features = self.user_features.fork()
+            logs = self._prepare(normalize_logs(valid), user_features)
+            X = self.pipeline.transform(logs)
+            if isinstance(self.model, Detector):
+                scores = self.model.decision_function(X, detector_groups(logs))
+            else:
+                scores = self.model.decision_function(X)
+            logs['anomaly_score'] = scores
+            logs['anomaly'] = np.where(scores < 0, -1, 1).astype(np.int8)
+            self.user_features = user_features
+
+            anomalies = logs.loc[logs['anomaly'] == -1].sort_values('anomaly_score')
+            if self.sink is not None:
+                self.sink(anomalies)
+            self.anomalies.extend(anomalies.to_dict('records'))
+            self.events += len(logs)
+            self.batches += 1
+            self.n_anomalies += len(anomalies)
+            if received is not None:
+                self.latencies.append(time.monotonic() - received)
+        return logs
+
+    def reject(self, error=None):
+        """Conta um evento descartado (e o erro que causou o descarte)."""
+        with self._lock:
+            self.rejected += 1
+            if error is not None:
+                self.last_error = error
+
+    def recent_anomalies(self) -> pd.DataFrame:
+        """Anomalias mais recentes, da última para a primeira."""
+        with self._lock:
+            return pd.DataFrame(list(reversed(self.anomalies)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = np.array(self.latencies)
+        return {
+            'eventos': self.events,
+            'lotes': self.batches,
+            'anomalias': self.n_anomalies,
+            'rejeitados': self.rejected,
+            'latencia_p50_s': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'latencia_p95_s': float(np.percentile(latencies, 95)) if len(latencies) else None,
+            'ultimo_erro': self.last_error,
+        }
+
+
+class StreamRunner:
+    """Liga a fila de eventos ao `StreamScorer` num thread de fundo."""
+
+    def __init__(self, scorer: StreamScorer, events: queue.Queue = None, batch_size=BATCH_SIZE,
+                 max_wait=MAX_WAIT):
+        self.scorer = scorer
+        self.events = events if events is not None else queue.Queue(maxsize=MAX_QUEUED_EVENTS)
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.stop_event = threading.Event()
+        # Usados por `shared_runner` para decidir quando recriar a ingestão ou trocar o modelo
+        self.sink_path = None
+        self.signature = None
+        self._servers = []
+        self._thread = None
+
+    def listen(self, address):
+        self._servers.append(serve_socket(address, self.events))
+        return self
+
+    def tail(self, path, from_start=False):
+        tail_file(path, self.events, self.stop_event, from_start=from_start)
+        return self
+
+    def _run(self):
+        for batch in micro_batches(self.events, self.stop_event, self.batch_size, self.max_wait):
+            records = [record for _, record in batch]
+            try:
+                # Latência medida a partir do evento mais antigo do lote
+                self.scorer.score_batch(records, received=batch[0][0])
+                self.scorer.last_error = None
+            except Exception as e:
+                # Qualquer erro (inclusive de modelos trocados em paralelo) não pode
+                # derrubar o thread: o lote é refeito evento a evento, descartando só os que falham
+                self.scorer.last_error = f"{type(e).__name__}: {e}"
+                self._score_one_by_one(records, batch[0][0])
+
+    def _score_one_by_one(self, records, received):
+        for record in records:
+            try:
+                self.scorer.score_batch([record], received=received)
+            except Exception as e:
+                self.scorer.reject(f"{type(e).__name__}: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        self.stop_event.set()
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+            if isinstance(server.server_address, str) and _is_socket(server.server_address):
+                os.remove(server.server_address)
+        self._servers.clear()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+def shared_runner(address, signature, build, sink_path=None, **kwargs) -> StreamRunner:
+    """Retorna a ingestão ativa em `address`, criando-a se preciso.
+
+    `build()` devolve `(pipeline, modelo, motor_de_features)` e só é chamado
+    quando `signature` muda (dados, features ou hiperparâmetros do modelo);
+    a troca do modelo não interrompe a ingestão.
+    """
+    with _RUNNERS_LOCK:
+        runner = _RUNNERS.get(address)
+        if runner is not None and (not runner.is_alive() or runner.sink_path != sink_path):
+            runner.stop()
+            runner = None
+        if runner is None:
+            pipeline, model, user_features = build()
+            scorer = StreamScorer(pipeline, model, user_features,
+                                  sink=JsonlSink(sink_path) if sink_path else None)
+            runner = StreamRunner(scorer, **kwargs).listen(address).start()
+            runner.sink_path, runner.signature = sink_path, signature
+            _RUNNERS[address] = runner
+        elif runner.signature != signature:
+            pipeline, model, user_features = build()
+            runner.scorer.set_model(pipeline, model, user_features)
+            runner.signature = signature
+        return runner
+
+
+def stop_shared_runner(address):
+    """Encerra a ingestão compartilhada em `address`, se houver."""
+    with _RUNNERS_LOCK:
+        runner = _RUNNERS.pop(address, None)
+    if runner is not None:
+        runner.stop()
+
+
+def send_events(address, records):
+    """Envia registros a um `StreamRunner` (útil para testes e integrações simples)."""
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    with sock:
+        sock.connect(address)
+        sock.sendall(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records).encode('utf-8'))
+
+
+def fit_stream_scorer(logs: pd.DataFrame, features=None, detector='isolation_forest', n_estimators=100,
+                      contamination=0.05, random_state=42, n_jobs=None, sink=None) -> StreamScorer:
+    """Ajusta pipeline e modelo sobre o histórico e devolve um scorer pronto para o streaming."""
+    engine = UserBehaviorFeatures()
+    logs = extract_time_features(preprocess_transfer_values(logs))
+    logs = logs.join(engine.update(logs))
+    pipeline = FeaturePipeline(features or default_features(logs)).fit(logs)
+    model = make_detector(detector, n_estimators=n_estimators, contamination=contamination,
+                          random_state=random_state, n_jobs=n_jobs)
+    model, _, _ = load_or_train_detector(model, pipeline.transform(logs), groups=detector_groups(logs))
+    # O motor de features continua a partir do histórico, sem recalculá-lo
+    return StreamScorer(pipeline, model, user_features=engine, sink=sink)
+
+
+def _print_sink(anomalies: pd.DataFrame):
+    if not anomalies.empty:
+        print(anomalies.to_json(orient='records', lines=True, date_format='iso', force_ascii=False), flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    history = parser.add_mutually_exclusive_group(required=True)
+    history.add_argument('--url', help="URL da API de logs (histórico de treino).")
+    history.add_argument('--input', help="Arquivo JSON com o histórico de treino.")
+    parser.add_argument('--tcp', help="Escuta eventos em host:porta.")
+    parser.add_argument('--unix', help="Escuta eventos num socket UNIX.")
+    parser.add_argument('--tail', help="Segue um arquivo JSONL de eventos.")
+    parser.add_argument('--sink', help="Arquivo JSONL onde as anomalias são acrescentadas (padrão: stdout).")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--max-wait', type=float, default=MAX_WAIT, help="Espera máxima por lote, em segundos.")
+    parser.add_argument('--features', nargs='+', help="Features do modelo (padrão: todas).")
+    parser.add_argument('--detector', choices=DETECTOR_NAMES, default='isolation_forest')
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--contamination', type=float, default=0.05)
+    parser.add_argument('--random-state', type=int, default=42)
+    parser.add_argument('--n-jobs', type=int, default=None)
+    args = parser.parse_args(argv)
+    if not (args.tcp or args.unix or args.tail):
+        parser.error("informe ao menos uma entrada: --tcp, --unix ou --tail")
+
+    if args.input:
+        with open(args.input, encoding='utf-8') as f:
+            logs = normalize_logs(json.load(f))
+    else:
+        logs = fetch_logs(args.url, stream=True)
+    sink = JsonlSink(args.sink) if args.sink else _print_sink
+    scorer = fit_stream_scorer(
+        logs, features=args.features, detector=args.detector, n_estimators=args.n_estimators,
+        contamination=args.contamination, random_state=args.random_state, n_jobs=args.n_jobs, sink=sink
+    )
+
+    runner = StreamRunner(scorer, batch_size=args.batch_size, max_wait=args.max_wait)
+    if args.tcp:
+        runner.listen(parse_address(args.tcp))
+    if args.unix:
+        runner.listen(args.unix)
+    if args.tail:
+        runner.tail(args.tail)
+    runner.start()
+    try:
+        while runner.is_alive():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from data.anomaly_store import AnomalyStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AnomalyStore(str(tmp_path / 'anomalies.sqlite'))
+
+
+def _scored(ids, scores, users, operacoes, anomaly=-1):
+    return pd.DataFrame({
+        'id': ids,
+        'user_id': users,
+        'tipo_operacao': operacoes,
+        'tabela': 'transferencia',
+        'data': pd.to_datetime('2025-05-01') + pd.to_timedelta(ids, unit='h'),
+        'anomaly_score': scores,
+        'anomaly': anomaly,
+    })
+
+
+def test_uses_wal(store):
+    with sqlite3.connect(store.path) as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+
+def test_records_only_anomalies_once_per_log(store):
+    logs = _scored([1, 2, 3], [-0.3, -0.1, 0.2], [10, 11, 10], ['INSERT', 'LOGIN', 'INSERT'])
+    logs.loc[2, 'anomaly'] = 1
+    assert store.record(logs, 'v1') == 2
+    # Pontuar de novo atualiza score e versão do modelo, sem duplicar
+    assert store.record(logs.assign(anomaly_score=logs['anomaly_score'] - 0.1), 'v2') == 2
+    assert store.count() == 2
+    result = store.query()
+    assert list(result['id']) == [1, 2]
+    assert list(result['model_version']) == ['v2', 'v2']
+    assert result['anomaly_score'].tolist() == pytest.approx([-0.4, -0.2])
+
+
+def test_query_filters_order_and_pages(store):
+    ids = list(range(1, 11))
+    store.record(_scored(ids, [-i / 10 for i in ids], [i % 2 for i in ids],
+                         ['LOGIN' if i % 3 else 'INSERT' for i in ids]), 'v1')
+
+    assert list(store.query(limit=3)['id']) == [10, 9, 8]
+    assert list(store.query(limit=3, offset=3)['id']) == [7, 6, 5]
+    assert list(store.query(order='data', limit=2)['id']) == [10, 9]
+    assert set(store.query(user_id=1)['id']) == {1, 3, 5, 7, 9}
+    assert set(store.query(tipo_operacao='INSERT')['id']) == {3, 6, 9}
+    assert set(store.query(min_score=-0.35, max_score=-0.15)['id']) == {2, 3}
+    start = pd.Timestamp('2025-05-01') + pd.Timedelta(hours=4)
+    assert set(store.query(start=start, end=start + pd.Timedelta(hours=2))['id']) == {4, 5}
+    assert store.count(user_id=0, tipo_operacao=['LOGIN']) == 4
+    assert store.operations() == ['INSERT', 'LOGIN']
+    assert store.bounds()['min_score'] == pytest.approx(-1.0)
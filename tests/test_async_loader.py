@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+import requests
+
+from data.async_loader import load_sources, reset_sources
+from data.synthetic import generate_logs, to_api_records
+from utils.local_api import LocalLogsAPI
+
+# Sem espera entre as novas tentativas
+FAST = {'backoff': 0, 'timeout': (2, 5)}
+
+
+@pytest.fixture
+def records():
+    return to_api_records(generate_logs(30)[0])
+
+
+def test_retries_transient_failures(records):
+    with LocalLogsAPI(records, failures=2) as api:
+        sources = {api.url: api.url}
+        logs, errors = load_sources(sources, retries=3, **FAST)
+        reset_sources(sources)
+    assert errors == {}
+    assert len(logs) == 30
+    assert len(api.requests) == 3
+
+
+def test_keeps_received_pages_when_pagination_fails(records):
+    with LocalLogsAPI(records, fail_after=1) as api:
+        sources = {api.url: api.url}
+        logs, errors = load_sources(sources, page_size=10, retries=0, **FAST)
+        assert list(logs['id']) == list(range(1, 11))
+        assert api.url in errors
+
+        # Com a API de volta, a próxima carga continua do cursor
+        api.fail_after = None
+        logs, errors = load_sources(sources, page_size=10, retries=0, **FAST)
+        reset_sources(sources)
+    assert errors == {}
+    assert list(logs['id']) == list(range(1, 31))
+    assert api.requests[-1]['after_id'] == '30'
+
+
+def test_falls_back_to_memory_snapshot(records):
+    with LocalLogsAPI(records) as api:
+        sources = {api.url: api.url}
+        load_sources(sources, **FAST)
+        api.failures = 10
+        logs, errors = load_sources(sources, retries=1, **FAST)
+        reset_sources(sources)
+    assert len(logs) == 30
+    assert api.url in errors
+
+
+def test_falls_back_to_parquet_snapshot(records, tmp_path):
+    with LocalLogsAPI(records) as api:
+        sources = {api.url: api.url}
+        load_sources(sources, store_base=str(tmp_path), **FAST)
+        # Novo processo: nada em memória, só o armazenamento local
+        reset_sources(sources)
+        api.failures = 10
+        logs, errors = load_sources(sources, store_base=str(tmp_path), retries=1, **FAST)
+        reset_sources(sources, store_base=str(tmp_path))
+    assert list(logs['id']) == list(range(1, 31))
+    assert api.url in errors
+
+
+def test_raises_without_any_snapshot(records):
+    with LocalLogsAPI(records, failures=10) as api:
+        with pytest.raises(requests.HTTPError):
+            load_sources({api.url: api.url}, retries=1, **FAST)
+
+
+def test_multiple_sources_are_tagged(records):
+    with LocalLogsAPI(records[:20], delay=0.2) as slow, LocalLogsAPI(records[20:]) as fast:
+        sources = {'a': slow.url, 'b': fast.url}
+        logs, errors = load_sources(sources, **FAST)
+        reset_sources(sources)
+    assert errors == {}
+    assert logs['fonte'].value_counts().to_dict() == {'a': 20, 'b': 10}
+
+
+def test_slow_source_does_not_block_other_sources(records):
+    with LocalLogsAPI(records, delay=2) as slow, LocalLogsAPI(records) as fast:
+        slow_load = threading.Thread(target=load_sources, args=({slow.url: slow.url},), kwargs=FAST)
+        slow_load.start()
+        time.sleep(0.2)
+        start = time.perf_counter()
+        logs, _ = load_sources({fast.url: fast.url}, **FAST)
+        elapsed = time.perf_counter() - start
+        slow_load.join()
+        reset_sources()
+    assert len(logs) == 30
+    assert elapsed < 1
+
+
+
+def test_history_days_limits_seed_but_not_cursor(records, tmp_path):
+    with LocalLogsAPI(records) as api:
+        sources = {api.url: api.url}
+        load_sources(sources, store_base=str(tmp_path), **FAST)
+        # Novo processo lendo só o último dia do armazenamento local
+        reset_sources(sources)
+        logs, _ = load_sources(sources, store_base=str(tmp_path), history_days=1, **FAST)
+        reset_sources(sources, store_base=str(tmp_path))
+    last = logs['data'].max()
+    assert (logs['data'] >= last - pd.Timedelta(days=1)).all()
+    assert len(logs) < 30
+    assert api.requests[-1]['after_id'] == '30'
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from algorithms.detectors import (ApproximateLOFDetector, HBOSDetector, RobustZScoreDetector, cascade_ensemble,
+                                  make_detector, train_detector)
+
+
+@pytest.fixture
+def X():
+    rng = np.random.RandomState(0)
+    X = pd.DataFrame(rng.normal(size=(2000, 3)), columns=['a', 'b', 'c'])
+    # As 10 primeiras linhas ficam bem fora da distribuição
+    X.iloc[:10] += 8.0
+    return X
+
+
+def _top(scores, n=10):
+    return set(np.argsort(scores)[:n])
+
+
+def test_hbos_ranks_outliers_and_handles_out_of_range(X):
+    detector = HBOSDetector().fit(X)
+    assert _top(detector.train_scores_) == set(range(10))
+
+    floor = sum(detector.floor_)
+    far = pd.DataFrame([[100.0, -100.0, 100.0]], columns=X.columns)
+    assert detector.score_samples(far)[0] == pytest.approx(floor)
+    # Feature ausente não contribui para o score
+    missing = pd.DataFrame([[np.nan, np.nan, np.nan]], columns=X.columns)
+    assert detector.score_samples(missing)[0] == 0.0
+
+
+def test_lof_scores_outliers_below_inliers(X):
+    detector = ApproximateLOFDetector(max_samples=500).fit(X)
+    assert len(detector.model_._fit_X) == 500
+    assert _top(detector.train_scores_) == set(range(10))
+
+
+def test_train_detector_threshold_follows_contamination(X):
+    _, preds, scores = train_detector(HBOSDetector(contamination=0.05), X)
+    assert np.mean(preds == -1) == pytest.approx(0.05, abs=0.005)
+    np.testing.assert_array_equal(preds == -1, scores < 0)
+
+
+def test_robust_zscore_uses_group_statistics():
+    rng = np.random.RandomState(0)
+    groups = pd.DataFrame({'user_id': np.repeat([0, 1], 500)})
+    # O grupo 1 opera com valores 100 vezes maiores que o grupo 0
+    X = pd.DataFrame({'valor': np.concatenate([rng.normal(10, 1, 500), rng.normal(1000, 100, 500)])})
+    detector = RobustZScoreDetector(history=300).fit(X, groups)
+    assert len(detector.state_) == 600
+
+    value = pd.DataFrame({'valor': [1000.0, 1000.0]})
+    scores = detector.decision_function(value, pd.DataFrame({'user_id': [0, 1]}))
+    assert scores[0] < 0 < scores[1]
+
+    # Grupo sem histórico suficiente usa as estatísticas globais
+    unknown = detector.score_samples(pd.DataFrame({'valor': [10.0]}), pd.DataFrame({'user_id': [2]}))
+    own = detector.score_samples(pd.DataFrame({'valor': [10.0]}), pd.DataFrame({'user_id': [0]}))
+    assert unknown[0] < own[0]
+
+
+def test_robust_zscore_update_scores_only_new_rows(X):
+    groups = pd.DataFrame({'user_id': np.arange(len(X)) % 4})
+    detector = RobustZScoreDetector(history=100)
+    preds, scores = detector.update(X.iloc[:1000], groups.iloc[:1000])
+    assert len(preds) == len(scores) == 1000
+
+    preds, scores = detector.update(X.iloc[1000:1100], groups.iloc[1000:1100])
+    assert len(preds) == len(scores) == 100
+    assert detector.state_.groupby('_g').size().max() == 100
+
+
+def test_cascade_scores_only_candidates_with_isolation_forest(X):
+    detector = cascade_ensemble(n_estimators=20, candidate_fraction=0.1)
+    detector.fit(X)
+    assert detector.n_candidates_ == pytest.approx(0.1 * len(X), abs=1)
+    assert _top(detector.train_scores_) == set(range(10))
+
+    detector.score_samples(X.iloc[10:])
+    # Sem as anomalias injetadas, menos linhas passam do corte dos detectores baratos
+    assert detector.n_candidates_ < 0.1 * len(X)
+
+
+def test_make_detector_rejects_unknown_name():
+    with pytest.raises(ValueError, match='desconhecido'):
+        make_detector('svm')
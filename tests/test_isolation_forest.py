@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from algorithms import isolation_forest
+from algorithms.isolation_forest import score_parallel, train_isolation_forest
+
+
+@pytest.fixture
+def X():
+    return pd.DataFrame(np.random.RandomState(0).normal(size=(4000, 3)).astype(np.float32), columns=['a', 'b', 'c'])
+
+
+def test_parallel_training_matches_single_process(X, monkeypatch):
+    # Força treino e pontuação em vários processos mesmo num lote pequeno
+    monkeypatch.setattr(isolation_forest, 'MIN_ROWS_PER_JOB', 500)
+    single, single_preds, single_scores = train_isolation_forest(X, n_estimators=20, n_jobs=1)
+    parallel, preds, scores = train_isolation_forest(X, n_estimators=20, n_jobs=2)
+
+    np.testing.assert_array_equal(scores, single_scores)
+    np.testing.assert_array_equal(preds, single_preds)
+    assert parallel.offset_ == single.offset_
+    np.testing.assert_array_equal(score_parallel(parallel, X, n_jobs=2), single.decision_function(X))
+
+
+def test_threshold_follows_contamination(X):
+    model, preds, scores = train_isolation_forest(X, n_estimators=20, contamination=0.1)
+    assert np.mean(preds == -1) == pytest.approx(0.1, abs=0.005)
+    np.testing.assert_allclose(model.decision_function(X), scores)
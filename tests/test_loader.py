@@ -0,0 +1,41 @@
+import json
+
+import pandas as pd
+import pytest
+
+from data.loader import _iter_batches, _iter_json_array, _normalize_batches, normalize_logs
+from data.synthetic import generate_logs, to_api_records
+
+
+def _chunks(text, size):
+    return (text[i:i + size] for i in range(0, len(text), size))
+
+
+@pytest.fixture
+def records():
+    return to_api_records(generate_logs(50)[0])
+
+
+@pytest.mark.parametrize('size', [1, 7, 1 << 20])
+def test_iter_json_array_decodes_any_chunking(records, size):
+    body = json.dumps(records, indent=1)
+    assert list(_iter_json_array(_chunks(body, size))) == json.loads(body)
+
+
+@pytest.mark.parametrize('body', ['[]', '  [ ]  ', '\n[\n]'])
+def test_iter_json_array_empty(body):
+    assert list(_iter_json_array(_chunks(body, 1))) == []
+
+
+def test_iter_json_array_rejects_non_array_and_truncated_body(records):
+    with pytest.raises(ValueError, match='não é um array'):
+        list(_iter_json_array(['{"id": 1}']))
+    body = json.dumps(records)
+    with pytest.raises(ValueError, match='incompleto'):
+        list(_iter_json_array(_chunks(body[:len(body) // 2], 100)))
+
+
+def test_normalized_batches_match_one_shot(records):
+    batched = _normalize_batches(_iter_batches(iter(records), 7))
+    # A ordem das categorias depende de em qual lote cada valor apareceu primeiro
+    pd.testing.assert_frame_equal(batched, normalize_logs(records), check_categorical=False)
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+from data.async_loader import fetch_sources, load_sources, reset_sources
+from data.synthetic import generate_logs, to_api_records
+from utils.local_api import LocalLogsAPI
+
+
+@pytest.fixture
+def records():
+    return to_api_records(generate_logs(20)[0])
+
+
+def _fetch(api, cursor, **kwargs):
+    (logs, error), = fetch_sources({'api': api.url}, cursors={'api': cursor}, **kwargs).values()
+    assert error is None
+    return logs
+
+
+def test_cursor_by_id(records):
+    with LocalLogsAPI(records) as api:
+        logs = _fetch(api, (15, None))
+    assert api.requests == [{'after_id': '15'}]
+    assert list(logs['id']) == [16, 17, 18, 19, 20]
+
+
+def test_cursor_by_date(records):
+    since = pd.Timestamp(records[9]['data'])
+    with LocalLogsAPI(records) as api:
+        logs = _fetch(api, (None, since))
+    assert api.requests == [{'since': since.isoformat()}]
+    assert list(logs['id']) == list(range(11, 21))
+
+
+def test_filters_locally_when_server_ignores_cursor(records):
+    with LocalLogsAPI(records, ignore_cursor=True) as api:
+        by_id = _fetch(api, (15, None))
+        by_date = _fetch(api, (None, pd.Timestamp(records[9]['data'])))
+    assert list(by_id['id']) == [16, 17, 18, 19, 20]
+    assert list(by_date['id']) == list(range(11, 21))
+
+
+def test_pages_advance_the_cursor(records):
+    with LocalLogsAPI(records) as api:
+        logs = _fetch(api, (5, None), page_size=5)
+    assert [r['after_id'] for r in api.requests] == ['5', '10', '15', '20']
+    assert list(logs['id']) == list(range(6, 21))
+
+
+def test_incremental_load_fetches_only_new_records(records):
+    with LocalLogsAPI(records[:10], ignore_cursor=True) as api:
+        sources = {api.url: api.url}
+        load_sources(sources)
+        api.add(*records[10:])
+        logs, _ = load_sources(sources)
+        reset_sources(sources)
+    assert api.requests[-1] == {'after_id': '10'}
+    # Mesmo com o servidor devolvendo tudo, nada é duplicado
+    assert list(logs['id']) == list(range(1, 21))
+
+
+def test_reset_forces_full_load(records, tmp_path):
+    with LocalLogsAPI(records) as api:
+        sources = {api.url: api.url}
+        load_sources(sources, store_base=str(tmp_path))
+        reset_sources(sources, store_base=str(tmp_path))
+        logs, _ = load_sources(sources, store_base=str(tmp_path))
+        reset_sources(sources, store_base=str(tmp_path))
+    assert api.requests[-1] == {}
+    assert len(logs) == 20
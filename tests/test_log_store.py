@@ -0,0 +1,55 @@
+import glob
+import os
+
+import pandas as pd
+
+from data import log_store
+
+
+def _batch(i, valor):
+    return pd.DataFrame({
+        'id': [i],
+        'data': [pd.Timestamp('2024-01-01 10:00') + pd.Timedelta(minutes=i)],
+        'tabela': ['conta'],
+        'valor': [valor],
+    })
+
+
+def _files(store_dir):
+    return glob.glob(os.path.join(store_dir, '**', '*.parquet'), recursive=True)
+
+
+def test_compacts_partition_after_max_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_store, 'MAX_FILES_PER_PARTITION', 3)
+    for i in range(5):
+        log_store.write_logs(_batch(i, i), str(tmp_path))
+        assert len(_files(str(tmp_path))) <= 3
+    assert list(log_store.read_logs(str(tmp_path))['id']) == list(range(5))
+
+
+def test_unifies_types_across_writes(tmp_path):
+    log_store.write_logs(_batch(0, 1), str(tmp_path))
+    log_store.write_logs(_batch(1, 1.5), str(tmp_path))
+    logs = log_store.read_logs(str(tmp_path))
+    assert logs['valor'].dtype == 'float64'
+    assert list(logs['valor']) == [1.0, 1.5]
+
+
+def test_keeps_columns_from_earlier_batches(tmp_path):
+    log_store.write_logs(_batch(0, 1).assign(extra='a'), str(tmp_path))
+    log_store.write_logs(_batch(1, 2), str(tmp_path))
+    logs = log_store.read_logs(str(tmp_path))
+    assert list(logs.columns) == ['id', 'data', 'tabela', 'valor', 'extra']
+    assert logs['extra'].tolist()[0] == 'a'
+    assert logs['extra'].isna().tolist() == [False, True]
+
+
+def test_max_cursor_and_period_filter(tmp_path):
+    for i in range(3):
+        log_store.write_logs(_batch(i, i), str(tmp_path))
+    last_id, last_data = log_store.max_cursor(str(tmp_path))
+    assert last_id == 2
+    assert last_data == pd.Timestamp('2024-01-01 10:02')
+    logs = log_store.read_logs(str(tmp_path), columns=['id'], start='2024-01-01 10:01')
+    assert list(logs.columns) == ['id']
+    assert list(logs['id']) == [1, 2]
@@ -0,0 +1,17 @@
+import os
+
+import pytest
+
+from benchmarks.bench_memory import measure
+
+pytest.importorskip('resource')
+
+# Pico de RSS permitido para o caminho de dados com `MEMORY_ROWS` linhas (em 500 mil
+# linhas o pipeline atual fica em ~150 MB); ajustável por variável de ambiente
+MEMORY_ROWS = int(os.environ.get('ANOMALY_MEMORY_TEST_ROWS', 500_000))
+MEMORY_BUDGET_MB = float(os.environ.get('ANOMALY_MEMORY_BUDGET_MB', 250))
+
+
+def test_pipeline_peak_rss_within_budget():
+    peak = measure(MEMORY_ROWS)
+    assert peak <= MEMORY_BUDGET_MB, f"pico de {peak:.0f} MB acima do orçamento de {MEMORY_BUDGET_MB:.0f} MB"
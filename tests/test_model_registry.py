@@ -0,0 +1,57 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from algorithms import model_registry
+from algorithms.model_registry import load_or_train_isolation_forest, prune_models
+
+
+@pytest.fixture
+def models_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_registry, '_MODELS', model_registry.OrderedDict())
+    return str(tmp_path)
+
+
+def _X(seed):
+    return pd.DataFrame(np.random.RandomState(seed).normal(size=(200, 2)), columns=['a', 'b'])
+
+
+def test_reuses_model_from_memory_and_disk(models_dir):
+    X = _X(0)
+    model, _, scores = load_or_train_isolation_forest(X, n_estimators=10, models_dir=models_dir)
+    assert load_or_train_isolation_forest(X, n_estimators=10, models_dir=models_dir)[0] is model
+
+    # Fora da memória, o artefato em disco é lido em vez de treinar de novo
+    model_registry._MODELS.clear()
+    loaded, _, loaded_scores = load_or_train_isolation_forest(X, n_estimators=10, models_dir=models_dir)
+    assert loaded is not model
+    np.testing.assert_array_equal(loaded_scores, scores)
+    assert len(os.listdir(models_dir)) == 1
+
+
+def test_memory_keeps_only_recently_used_models(models_dir, monkeypatch):
+    monkeypatch.setattr(model_registry, 'MAX_MODELS_IN_MEMORY', 2)
+    keys = [model_registry.model_key(_X(i), n_estimators=10, contamination=0.05, random_state=42)
+            for i in range(3)]
+    load_or_train_isolation_forest(_X(0), n_estimators=10, models_dir=models_dir)
+    load_or_train_isolation_forest(_X(1), n_estimators=10, models_dir=models_dir)
+    # Usar o primeiro de novo faz o segundo ser o menos usado
+    load_or_train_isolation_forest(_X(0), n_estimators=10, models_dir=models_dir)
+    load_or_train_isolation_forest(_X(2), n_estimators=10, models_dir=models_dir)
+    assert list(model_registry._MODELS) == [keys[0], keys[2]]
+
+
+def test_prune_removes_least_recently_used_files(tmp_path):
+    now = time.time()
+    for age, name in enumerate(['isolation_forest_c', 'isolation_forest_b', 'detector_hbos_a']):
+        path = tmp_path / f"{name}.joblib"
+        path.write_bytes(b'x' * 100)
+        os.utime(path, (now - age, now - age))
+    (tmp_path / 'outro.joblib').write_bytes(b'x' * 1000)
+
+    prune_models(str(tmp_path), max_bytes=150, keep=(str(tmp_path / 'detector_hbos_a.joblib'),))
+    # O mais antigo é mantido por estar em `keep`; arquivos de outros prefixos não contam
+    assert sorted(os.listdir(tmp_path)) == ['detector_hbos_a.joblib', 'outro.joblib']
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.preprocessing import FeaturePipeline, extract_time_features, parse_dados_novos, preprocess_transfer_values
+from data.synthetic import generate_logs
+
+
+def test_hour_is_int8():
+    logs = pd.DataFrame({'data': pd.to_datetime(['2025-05-01 03:10', '2025-05-01 15:00'])})
+    hora = extract_time_features(logs)['hora']
+    assert hora.dtype == np.int8
+    assert list(hora) == [3, 15]
+
+
+def test_hour_keeps_nan_for_null_dates():
+    logs = pd.DataFrame({'data': pd.to_datetime(['2025-05-01 03:10', None])})
+    hora = extract_time_features(logs)['hora']
+    assert hora.iloc[0] == 3
+    assert np.isnan(hora.iloc[1])
+
+
+@pytest.fixture
+def logs():
+    return extract_time_features(preprocess_transfer_values(generate_logs(3000)[0]))
+
+
+def test_pipeline_matches_one_shot_preprocessing(logs):
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import StandardScaler
+
+    features = ['hora', 'tipo_operacao', 'valor_transferencia']
+    encoded = pd.get_dummies(logs[features], drop_first=True).astype(np.float32)
+    expected = StandardScaler().fit_transform(SimpleImputer(strategy='mean').fit_transform(encoded))
+
+    result = FeaturePipeline(features).fit_transform(logs)
+    assert list(result.columns) == list(encoded.columns)
+    np.testing.assert_allclose(result.to_numpy(), expected, rtol=1e-5, atol=1e-5)
+
+
+def test_pipeline_transform_is_stable_across_batches(logs):
+    features = ['hora', 'tipo_operacao', 'valor_transferencia']
+    pipeline = FeaturePipeline(features).fit(logs.iloc[:2000])
+    full = pipeline.transform(logs)
+    parts = pd.concat([pipeline.transform(logs.iloc[i:i + 700]) for i in range(0, len(logs), 700)])
+    pd.testing.assert_frame_equal(parts, full)
+
+    # Categoria desconhecida no treino vira apenas zeros nas dummies (antes da padronização)
+    novo = logs.iloc[:1].assign(tipo_operacao='NOVA_OPERACAO')
+    dummies = [c for c in pipeline.columns_ if c.startswith('tipo_operacao_')]
+    expected = pipeline.scaler_.transform(np.zeros((1, len(pipeline.columns_)), dtype=np.float32))
+    row = pipeline.transform(novo)
+    np.testing.assert_allclose(row[dummies].to_numpy()[0],
+                               expected[0, [pipeline.columns_.index(c) for c in dummies]], rtol=1e-5)
+    assert list(row.columns) == pipeline.columns_
+
+
+def test_parse_dados_novos_extracts_typed_fields():
+    dados = pd.Series(['valor=150.5|destino=123', 'destino=9|valor=abc', 'sem campos', None, 'xvalor=7|valor=8'])
+    result = parse_dados_novos(dados, {'valor': 'float', 'destino': 'str'})
+    assert list(result.columns) == ['valor', 'destino']
+    assert result['valor'].iloc[0] == 150.5
+    # Valor inválido, campo ausente e payload nulo viram NaN; só o nome exato do campo conta
+    assert result['valor'].iloc[1:4].isna().all()
+    assert result['valor'].iloc[4] == 8.0
+    assert list(result['destino'].iloc[:2]) == ['123', '9']
+
+
+def test_parse_dados_novos_with_non_text_column():
+    result = parse_dados_novos(pd.Series([np.nan, np.nan]))
+    assert result['valor'].dtype == float
+    assert result['valor'].isna().all()
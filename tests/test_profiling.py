@@ -0,0 +1,31 @@
+import tracemalloc
+
+import pytest
+
+from utils.profiling import Profiler
+
+
+@pytest.fixture(autouse=True)
+def no_tracing():
+    if tracemalloc.is_tracing():
+        pytest.skip("tracemalloc já ativo no processo de testes")
+    yield
+    tracemalloc.stop()
+
+
+def test_tracing_stops_only_after_last_profiler():
+    first, second = Profiler(track_memory=True), Profiler(track_memory=True)
+    first.stop()
+    first.stop()
+    assert tracemalloc.is_tracing()
+    with second.stage('etapa'):
+        data = bytearray(1 << 20)
+    assert second.stages[0].peak_memory_bytes >= len(data)
+    second.stop()
+    assert not tracemalloc.is_tracing()
+
+
+def test_keeps_tracing_started_elsewhere():
+    tracemalloc.start()
+    Profiler(track_memory=True).stop()
+    assert tracemalloc.is_tracing()
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from visualization.rendering import downsample_series, lttb, top_annotations
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(10_000)
+    y = np.sin(x / 500.0)
+    y[1234], y[7777] = 10.0, -10.0
+    idx = lttb(x, y, 200)
+    assert len(idx) == 200
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+    assert {1234, 7777} <= set(idx)
+
+
+def test_lttb_returns_everything_when_under_budget():
+    np.testing.assert_array_equal(lttb(np.arange(10), np.arange(10), 50), np.arange(10))
+    np.testing.assert_array_equal(lttb(np.arange(10), np.arange(10), 2), np.arange(10))
+
+
+def test_downsample_series_sorts_by_time_and_respects_budget():
+    rng = np.random.RandomState(0)
+    times = pd.Series(pd.date_range('2025-05-01', periods=6000, freq='min')).sample(frac=1, random_state=0)
+    values = pd.Series(rng.normal(size=6000), index=times.index)
+    # Pico no meio da série (as pontas sempre são mantidas)
+    values[times.index[times.rank() == 3000][0]] = 50.0
+
+    t, v = downsample_series(times, values, budget=500)
+    assert len(t) == len(v) == 500
+    assert t.is_monotonic_increasing
+    assert v.max() == 50.0
+    # Séries dentro do orçamento passam intactas
+    small_t, small_v = downsample_series(times.iloc[:100], values.iloc[:100], budget=500)
+    pd.testing.assert_series_equal(small_t, times.iloc[:100])
+    pd.testing.assert_series_equal(small_v, values.iloc[:100])
+
+
+def test_top_annotations_picks_lowest_scores():
+    df = pd.DataFrame({'score': [0.3, -0.5, 0.1, -0.2]})
+    assert list(top_annotations(df, 'score', limit=2).index) == [1, 3]
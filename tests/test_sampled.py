@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from algorithms.isolation_forest import fit_isolation_forest_sample, score_chunked
+from data.preprocessing import FeaturePipeline, extract_time_features, preprocess_transfer_values
+from data.synthetic import generate_logs
+from data.user_features import UserBehaviorFeatures
+from service import shared_pipeline
+from service.shared_pipeline import Dataset, score_dataset
+
+FEATURES = ['hora', 'valor_transferencia', 'transferencias_ultima_hora', 'segundos_desde_ultima_operacao']
+
+
+@pytest.fixture
+def raw():
+    return generate_logs(6000)[0].sort_values('data', ignore_index=True)
+
+
+def _dataset(raw, rows, engine):
+    logs = extract_time_features(preprocess_transfer_values(raw.iloc[:rows]))
+    return Dataset(('teste',), logs.join(engine.update(logs)), engine)
+
+
+def test_chunked_transform_matches_full_matrix(raw):
+    logs = _dataset(raw, 3000, UserBehaviorFeatures()).logs
+    pipeline = FeaturePipeline(FEATURES).fit(logs.iloc[:1000])
+    model = fit_isolation_forest_sample(pipeline.transform(logs.iloc[:1000]), n_estimators=20)
+    chunked = score_chunked(model, logs, chunk_size=700, transform=pipeline.transform)
+    np.testing.assert_allclose(chunked, model.decision_function(pipeline.transform(logs)))
+
+
+def test_sampled_model_and_threshold_kept_until_history_grows(raw, monkeypatch):
+    monkeypatch.setattr(shared_pipeline, 'SAMPLED_REFIT_GROWTH', 0.2)
+    engine = UserBehaviorFeatures()
+    params = dict(features=FEATURES, n_estimators=20, sample_size=1000)
+
+    first, _ = score_dataset(_dataset(raw, 4000, engine), **params)
+    grown, _ = score_dataset(_dataset(raw, 4500, engine), **params)
+    assert grown.model is first.model
+    assert grown.fitted_rows == 4000
+    np.testing.assert_array_equal(grown.scores[:4000], first.scores)
+    assert len(grown.scores) == 4500
+    # A matriz inteira só é montada se for pedida
+    assert grown._X is None
+
+    refit, _ = score_dataset(_dataset(raw, 6000, engine), **params)
+    assert refit.model is not first.model
+    assert refit.fitted_rows == 6000
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from algorithms.sliding_forest import SlidingWindowIsolationForest
+
+
+@pytest.fixture
+def batches():
+    rng = np.random.RandomState(0)
+    return [rng.normal(size=(300, 3)) for _ in range(5)]
+
+
+def test_windows_are_capped_and_small_batches_accumulate(batches):
+    model = SlidingWindowIsolationForest(n_windows=3, trees_per_window=5, min_window_size=256)
+    for batch in batches:
+        preds, scores = model.update(batch)
+        assert len(preds) == len(scores) == len(batch)
+    assert len(model.models_) == 3
+    assert model._n_windows_seen == 5
+
+    # Lotes menores que a janela mínima esperam o próximo para treinar
+    model.update(batches[0][:100])
+    assert model._n_windows_seen == 5
+    model.update(batches[1][:200])
+    assert model._n_windows_seen == 6
+
+
+def test_partial_fit_only_fits_the_trees(batches, monkeypatch):
+    from sklearn.ensemble import IsolationForest
+
+    def fail(*args, **kwargs):
+        raise AssertionError("a janela não deve ser pontuada no treino")
+
+    monkeypatch.setattr(IsolationForest, 'score_samples', fail)
+    model = SlidingWindowIsolationForest(trees_per_window=5).partial_fit(batches[0])
+    assert len(model.models_[0].estimators_) == 5
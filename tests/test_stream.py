@@ -0,0 +1,100 @@
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from data.preprocessing import FeaturePipeline, extract_time_features, preprocess_transfer_values
+from data.synthetic import generate_logs, to_api_records
+from data.user_features import UserBehaviorFeatures
+from service.stream import StreamRunner, StreamScorer, micro_batches, serve_socket
+
+RAW_COLUMNS = ['id', 'tabela', 'tipo_operacao', 'descricao', 'dados_antigos', 'dados_novos', 'data', 'user_id']
+FEATURES = ['hora', 'transferencias_ultima_hora', 'segundos_desde_ultima_operacao']
+
+
+class AllAnomalies:
+    """Modelo que marca todo evento como anomalia (as features ficam no buffer de anomalias)."""
+
+    fail_batches = False
+
+    def decision_function(self, X):
+        if self.fail_batches and len(X) > 1:
+            raise RuntimeError("falha no lote")
+        return -np.ones(len(X))
+
+
+@pytest.fixture
+def history():
+    logs = extract_time_features(preprocess_transfer_values(generate_logs(200)[0]))
+    engine = UserBehaviorFeatures()
+    logs = logs.join(engine.update(logs))
+    return logs, engine
+
+
+def _events(logs):
+    # Dois eventos do mesmo usuário, depois do histórico
+    record = to_api_records(logs.iloc[[0]][RAW_COLUMNS])[0]
+    last = logs['data'].max()
+    return [dict(record, id=10_001, data=(last + np.timedelta64(10, 's')).isoformat()),
+            dict(record, id=10_002, data=(last + np.timedelta64(70, 's')).isoformat())]
+
+
+def _run(scorer, records):
+    runner = StreamRunner(scorer, max_wait=0.2).start()
+    for record in records:
+        runner.events.put((time.monotonic(), record))
+    deadline = time.monotonic() + 10
+    while scorer.events + scorer.rejected < len(records) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    runner.stop()
+    return scorer.recent_anomalies().sort_values('id')
+
+
+def test_failed_batch_does_not_count_events_twice_in_user_state(history):
+    logs, engine = history
+    pipeline = FeaturePipeline(FEATURES).fit(logs)
+    records = _events(logs)
+
+    clean = _run(StreamScorer(pipeline, AllAnomalies(), engine.fork()), records)
+    model = AllAnomalies()
+    model.fail_batches = True
+    scorer = StreamScorer(pipeline, model, engine.fork())
+    fallback = _run(scorer, records)
+
+    assert scorer.last_error.startswith('RuntimeError')
+    assert scorer.batches == 2
+    for col in ('transferencias_ultima_hora', 'segundos_desde_ultima_operacao'):
+        assert list(fallback[col]) == list(clean[col])
+    assert list(fallback['segundos_desde_ultima_operacao'])[1] == 60.0
+
+
+def test_invalid_events_are_rejected_individually(history):
+    logs, engine = history
+    scorer = StreamScorer(FeaturePipeline(FEATURES).fit(logs), AllAnomalies(), engine.fork())
+    good, other = _events(logs)
+    result = scorer.score_batch([good, dict(other, data='não é data'), dict(other, data=None)])
+    assert len(result) == 1
+    assert scorer.rejected == 2
+    assert scorer.stats()['eventos'] == 1
+
+
+def test_micro_batches_respect_size():
+    events = queue.Queue()
+    for i in range(7):
+        events.put((time.monotonic(), {'id': i}))
+    stop = threading.Event()
+    batches = micro_batches(events, stop, batch_size=3, max_wait=0.05)
+    sizes = [len(next(batches)) for _ in range(3)]
+    stop.set()
+    assert sizes == [3, 3, 1]
+
+
+def test_socket_path_that_is_not_a_socket_is_kept(tmp_path):
+    path = tmp_path / 'eventos.json'
+    path.write_text('{}')
+    with pytest.raises(ValueError):
+        serve_socket(str(path), queue.Queue())
+    assert os.path.exists(path)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from data.synthetic import generate_logs
+from data.user_features import USER_FEATURE_COLUMNS, UserBehaviorFeatures
+
+
+def _logs(rows=2000):
+    # Em ordem cronológica, como chegam da API
+    logs = generate_logs(rows, n_users=50, days=2)[0]
+    return logs.sort_values('data', ignore_index=True)
+
+
+def test_incremental_update_matches_one_shot():
+    logs = _logs()
+    expected = UserBehaviorFeatures().update(logs)
+
+    engine = UserBehaviorFeatures()
+    for stop in (500, 1200, len(logs)):
+        features = engine.update(logs.iloc[:stop])
+    assert_frame_equal(features, expected)
+
+
+def test_update_batch_continues_from_history():
+    logs = _logs()
+    expected = UserBehaviorFeatures().update(logs)
+
+    engine = UserBehaviorFeatures()
+    engine.update(logs.iloc[:1500])
+    batches = [engine.update_batch(logs.iloc[start:start + 100]) for start in range(1500, len(logs), 100)]
+    assert_frame_equal(pd.concat(batches), expected.iloc[1500:])
+
+
+def test_null_dates_get_neutral_values():
+    logs = _logs(200)
+    logs.loc[[3, 50], 'data'] = pd.NaT
+    features = UserBehaviorFeatures().update(logs)
+
+    assert list(features.columns) == USER_FEATURE_COLUMNS
+    assert (features.loc[[3, 50], 'transferencias_ultima_hora'] == 0).all()
+    assert features.loc[[3, 50], 'segundos_desde_ultima_operacao'].isna().all()
+    # As demais linhas não mudam por causa das datas nulas
+    expected = UserBehaviorFeatures().update(logs.drop(index=[3, 50]))
+    assert_frame_equal(features.drop(index=[3, 50]), expected)
+    assert features.dtypes.eq(np.float32).all()
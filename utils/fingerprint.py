@@ -0,0 +1,35 @@
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+
+def _update(h, obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        columns = obj.columns if isinstance(obj, pd.DataFrame) else [obj.name]
+        h.update(json.dumps([str(c) for c in columns]).encode('utf-8'))
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(str(obj.dtype).encode('utf-8'))
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        h.update(b'[')
+        for item in obj:
+            _update(h, item)
+        h.update(b']')
+    elif isinstance(obj, dict):
+        for key in sorted(obj):
+            h.update(str(key).encode('utf-8'))
+            _update(h, obj[key])
+    else:
+        h.update(repr(obj).encode('utf-8'))
+    h.update(b'|')
+
+
+def fingerprint(*objs) -> str:
+    """Hash do conteúdo de DataFrames, Series, arrays e valores simples."""
+    h = hashlib.sha1()
+    for obj in objs:
+        _update(h, obj)
+    return h.hexdigest()
@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class LocalLogsAPI:
+    """Servidor HTTP local que imita a rota `/logs` da API, para desenvolvimento e testes.
+
+    `delay` atrasa cada resposta (em segundos) e `failures` faz as próximas
+    requisições responderem 503, para simular uma API lenta ou instável;
+    com `fail_after`, as requisições passam a falhar depois dessa quantidade
+    de respostas bem-sucedidas (ex.: uma queda no meio da paginação).
+    `ignore_cursor` faz o servidor devolver tudo, como uma API sem suporte
+    a `after_id`/`since`.
+    """
+
+    def __init__(self, records=None, host='127.0.0.1', port=0, delay=0.0, failures=0, fail_after=None,
+                 ignore_cursor=False):
+        self.records = list(records or [])
+        self.requests = []
+        self.delay = delay
+        self.failures = failures
+        self.fail_after = fail_after
+        self.ignore_cursor = ignore_cursor
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/logs"
+
+    def add(self, *records):
+        """Acrescenta novos registros, simulando a chegada de logs."""
+        self.records.extend(records)
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+                api.requests.append(params)
+                if api.delay:
+                    time.sleep(api.delay)
+                if api.failures > 0:
+                    api.failures -= 1
+                    self.send_error(503)
+                    return
+                if api.fail_after is not None:
+                    if api.fail_after <= 0:
+                        self.send_error(503)
+                        return
+                    api.fail_after -= 1
+
+                records = api.records
+                if api.ignore_cursor:
+                    pass
+                elif 'after_id' in params:
+                    records = [r for r in records if r['id'] > int(params['after_id'])]
+                elif 'since' in params:
+                    records = [r for r in records if r['data'] > params['since']]
+                if 'limit' in params:
+                    records = records[:int(params['limit'])]
+
+                body = json.dumps(records).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,183 @@
+import cProfile
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Profilers com `track_memory` ativos no processo: o tracemalloc é global, então
+# só é parado quando o último deles termina, e nunca se foi iniciado por outro código
+_TRACING_LOCK = threading.Lock()
+_TRACING_USERS = 0
+_STARTED_TRACING = False
+
+
+def _start_tracing():
+    global _TRACING_USERS, _STARTED_TRACING
+    with _TRACING_LOCK:
+        if _TRACING_USERS == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _STARTED_TRACING = True
+        _TRACING_USERS += 1
+
+
+def _stop_tracing():
+    global _TRACING_USERS, _STARTED_TRACING
+    with _TRACING_LOCK:
+        _TRACING_USERS -= 1
+        if _TRACING_USERS == 0 and _STARTED_TRACING:
+            tracemalloc.stop()
+            _STARTED_TRACING = False
+
+
+class Stage:
+    """Medições de uma etapa do pipeline."""
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.rows = None
+        self.peak_memory_bytes = None
+        self.process_max_rss_bytes = None
+
+    def as_dict(self) -> dict:
+        return {
+            'stage': self.name,
+            'seconds': round(self.seconds, 6),
+            'rows': self.rows,
+            'peak_memory_bytes': self.peak_memory_bytes,
+            'process_max_rss_bytes': self.process_max_rss_bytes,
+        }
+
+
+class Profiler:
+    """Registra tempo, linhas processadas e memória de cada etapa de uma execução.
+
+    Com `track_memory=True`, `peak_memory_bytes` é o pico de alocações
+    Python/NumPy da própria etapa (via `tracemalloc`, que tem custo). Sem ele
+    não há medição por etapa: só `process_max_rss_bytes`, o maior RSS do
+    processo desde que iniciou (não desce entre etapas nem entre execuções).
+    """
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.stages = []
+        self.started_at = time.time()
+        self._tracing = False
+        if track_memory:
+            _start_tracing()
+            self._tracing = True
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        stage = Stage(name)
+        stage.rows = rows
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds = time.perf_counter() - start
+            if self.track_memory:
+                stage.peak_memory_bytes = max(0, tracemalloc.get_traced_memory()[1] - base)
+            stage.process_max_rss_bytes = _max_rss_bytes()
+            self.stages.append(stage)
+
+    def stop(self):
+        """Libera o tracemalloc; ele só para quando nenhum outro profiler ainda o usa."""
+        if self._tracing:
+            self._tracing = False
+            _stop_tracing()
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(s.seconds for s in self.stages)
+
+    def to_records(self) -> list:
+        return [s.as_dict() for s in self.stages]
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'started_at': self.started_at,
+            'total_seconds': round(self.total_seconds, 6),
+            'memory_source': 'tracemalloc' if self.track_memory else None,
+            'stages': self.to_records(),
+        }, ensure_ascii=False)
+
+    def to_prometheus(self, prefix='anomaly_pipeline') -> str:
+        """Exporta as medições no formato texto do Prometheus."""
+        metrics = [
+            ('stage_seconds', 'Tempo de parede da etapa em segundos.', 'seconds'),
+            ('stage_rows', 'Linhas processadas pela etapa.', 'rows'),
+            ('stage_peak_memory_bytes', 'Pico de alocações da etapa em bytes (tracemalloc).', 'peak_memory_bytes'),
+        ]
+        lines = []
+        for metric, help_text, attr in metrics:
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} gauge")
+            for s in self.stages:
+                value = getattr(s, attr)
+                if value is not None:
+                    lines.append(f'{prefix}_{metric}{{stage="{_escape(s.name)}"}} {value}')
+        # Valor do processo, não da etapa: exportado uma vez, sem o rótulo `stage`
+        max_rss = self.stages[-1].process_max_rss_bytes if self.stages else None
+        if max_rss is not None:
+            lines.append(f"# HELP {prefix}_process_max_rss_bytes Maior RSS do processo desde o início, em bytes.")
+            lines.append(f"# TYPE {prefix}_process_max_rss_bytes gauge")
+            lines.append(f"{prefix}_process_max_rss_bytes {max_rss}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(label: str) -> str:
+    return label.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _max_rss_bytes():
+    """Maior RSS do processo até agora (`ru_maxrss`), em bytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB; macOS, em bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class CodeProfile:
+    """Captura de perfil de uma execução inteira, com pyinstrument se instalado ou cProfile."""
+
+    def __init__(self):
+        try:
+            from pyinstrument import Profiler as Instrument
+            self._profiler = Instrument()
+            self.kind = 'pyinstrument'
+        except ImportError:
+            self._profiler = cProfile.Profile()
+            self.kind = 'cprofile'
+
+    def start(self):
+        if self.kind == 'pyinstrument':
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self):
+        if self.kind == 'pyinstrument':
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def report(self, limit=40) -> str:
+        if self.kind == 'pyinstrument':
+            return self._profiler.output_text(unicode=True)
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
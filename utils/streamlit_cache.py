@@ -0,0 +1,38 @@
+import functools
+import sys
+
+
+class _LazyCacheData:
+    """Aplica `st.cache_data` apenas quando a função roda dentro do Streamlit.
+
+    Fora do Streamlit (CLI, serviço de pontuação, workers) a função é chamada
+    diretamente, sem importar o Streamlit.
+    """
+
+    def __init__(self, func, cache_kwargs):
+        functools.update_wrapper(self, func)
+        self._func = func
+        self._cache_kwargs = cache_kwargs
+        self._cached = None
+
+    def _target(self):
+        if self._cached is None:
+            st = sys.modules.get('streamlit')
+            if st is None or not st.runtime.exists():
+                return self._func
+            self._cached = st.cache_data(**self._cache_kwargs)(self._func)
+        return self._cached
+
+    def __call__(self, *args, **kwargs):
+        return self._target()(*args, **kwargs)
+
+    def clear(self):
+        if self._cached is not None:
+            self._cached.clear()
+
+
+def cache_data(func=None, **cache_kwargs):
+    """Equivalente opcional a `st.cache_data`, usável com ou sem argumentos."""
+    if func is None:
+        return lambda f: _LazyCacheData(f, cache_kwargs)
+    return _LazyCacheData(func, cache_kwargs)
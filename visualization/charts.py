@@ -1,6 +1,7 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-from sklearn.decomposition import PCA
+
+from visualization.rendering import POINT_BUDGET, downsample_series
 
 
 def plot_score_distribution(scores):
@@ -12,6 +13,8 @@ def plot_score_distribution(scores):
 
 def plot_pca_projection(X, preds, random_state=42):
     """Gera um gráfico de projeção PCA 2D com anomalias destacadas."""
+    from sklearn.decomposition import PCA
+
     pca = PCA(n_components=2, random_state=random_state)
     proj = pca.fit_transform(X)
     proj_df = pd.DataFrame(proj, columns=['PC1', 'PC2'])
@@ -64,4 +67,36 @@ def plot_hourly_anomalies(logs_df):
     plt.axvspan(18.5, 23.5, color='lightgrey', alpha=0.3)  # Noite
 
     plt.tight_layout()
-    return fig
\ No newline at end of file
+    return fig
+
+
+def plot_anomaly_time_series(logs_df, point_budget=POINT_BUDGET):
+    """Série temporal do score das anomalias, reduzida por LTTB acima de `point_budget` pontos."""
+    # Filtrar apenas anomalias (anomaly = -1)
+    anomalies_only = logs_df.loc[logs_df['anomaly'] == -1, ['data', 'anomaly_score']]
+    datas, scores = downsample_series(anomalies_only['data'], anomalies_only['anomaly_score'], point_budget)
+
+    # Criar figura com Matplotlib para maior controle
+    fig, ax = plt.subplots(figsize=(12, 6))
+
+    # Plotar cada anomalia como um ponto
+    ax.scatter(datas, scores, color='red', s=50, alpha=0.7)
+
+    # Adicionar linha conectando os pontos para visualizar tendência
+    ax.plot(datas, scores, color='gray', alpha=0.5, linestyle='--')
+
+    # Formatação
+    title = 'Série Temporal de Anomaly Score (Anomalias Individuais)'
+    if len(scores) < len(anomalies_only):
+        title += f' — {len(scores)} de {len(anomalies_only)} pontos'
+    ax.set_title(title)
+    ax.set_ylabel('Anomaly Score')
+    ax.set_xlabel('Data')
+
+    # Rotacionar datas para melhor visualização
+    plt.setp(ax.get_xticklabels(), rotation=45)
+
+    # Adicionar grade
+    ax.grid(True, linestyle='--', alpha=0.7)
+    fig.tight_layout()
+    return fig
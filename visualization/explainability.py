@@ -1,22 +1,132 @@
-import matplotlib.pyplot as plt
-import shap
+import threading
+import weakref
+from collections import OrderedDict
 
-def explain_isolation_forest(model, X, idx=0):
-    """Gera explicações SHAP para um modelo Isolation Forest."""
+import joblib
+import numpy as np
+
+from utils.fingerprint import fingerprint as data_fingerprint
+
+# Linhas de fundo usadas pelos explainers (amostra fixa de X)
+BACKGROUND_SIZE = 100
+# Quantos pares (modelo, dados) manter no cache de explicações
+MAX_CACHED_EXPLANATIONS = 4
+
+_EXPLANATIONS = OrderedDict()
+_EXPLANATIONS_LOCK = threading.Lock()
+_MODEL_FINGERPRINTS = weakref.WeakKeyDictionary()
+
+
+def _model_fingerprint(model) -> str:
+    """Hash do modelo, calculado uma vez por objeto."""
     try:
-        explainer = shap.TreeExplainer(model, data=X, model_output='raw')
-        shap_values = explainer.shap_values(X)
+        return _MODEL_FINGERPRINTS[model]
+    except (KeyError, TypeError):
+        fingerprint = joblib.hash(model)
+        try:
+            _MODEL_FINGERPRINTS[model] = fingerprint
+        except TypeError:
+            pass
+        return fingerprint
+
+
+def _kernel_explainer(model, background):
+    import shap
+
+    return shap.KernelExplainer(model.decision_function, background)
+
+
+def _get_entry(model, X, token=None) -> dict:
+    """Retorna (criando se preciso) o explainer e os valores SHAP já calculados para o par.
+
+    `token` identifica a versão de (modelo, X) sem precisar calcular os hashes.
+    """
+    key = token if token is not None else (_model_fingerprint(model), data_fingerprint(X))
+    with _EXPLANATIONS_LOCK:
+        entry = _EXPLANATIONS.get(key)
+        if entry is None:
+            # O shap (e o numba) só é importado na primeira explicação pedida
+            import shap
+
+            background = shap.sample(X, BACKGROUND_SIZE, random_state=0)
+            try:
+                explainer = shap.TreeExplainer(model, data=background, model_output='raw')
+                kind = 'tree'
+            except Exception:
+                explainer = _kernel_explainer(model, background)
+                kind = 'kernel'
+            entry = {
+                'model': model, 'background': background, 'explainer': explainer,
+                'kind': kind, 'values': {}, 'lock': threading.Lock(),
+            }
+            _EXPLANATIONS[key] = entry
+            while len(_EXPLANATIONS) > MAX_CACHED_EXPLANATIONS:
+                _EXPLANATIONS.popitem(last=False)
+        else:
+            _EXPLANATIONS.move_to_end(key)
+        return entry
+
+
+def shap_values_for(model, X, rows, token=None):
+    """Valores SHAP apenas das linhas pedidas, reaproveitando as já calculadas."""
+    entry = _get_entry(model, X, token)
+    rows = [int(r) for r in rows]
+    with entry['lock']:
+        missing = [r for r in rows if r not in entry['values']]
+        if missing:
+            X_rows = X.iloc[missing]
+            try:
+                values = entry['explainer'].shap_values(X_rows)
+            except Exception:
+                if entry['kind'] != 'tree':
+                    raise
+                # Fallback: KernelExplainer
+                entry['explainer'] = _kernel_explainer(entry['model'], entry['background'])
+                entry['kind'] = 'kernel'
+                entry['values'].clear()
+                missing = rows
+                values = entry['explainer'].shap_values(X.iloc[missing])
+            for r, v in zip(missing, np.asarray(values)):
+                entry['values'][r] = v
+        return np.array([entry['values'][r] for r in rows]), entry
+
+
+def precompute_top_anomalies(model, X, scores, top_n=50, batch_size=10, token=None) -> threading.Thread:
+    """Calcula em segundo plano, em lotes, os valores SHAP das `top_n` linhas mais anômalas."""
+    entry = _get_entry(model, X, token)
+    if entry['kind'] != 'tree':
+        return None  # Explicações pelo KernelExplainer são caras demais para adiantar
+    thread = entry.get('precompute')
+    if thread is not None and thread.is_alive():
+        return thread
+    rows = [r for r in np.argsort(np.asarray(scores))[:top_n] if r not in entry['values']]
+    if not rows:
+        return None
+
+    def run():
+        for start in range(0, len(rows), batch_size):
+            shap_values_for(model, X, rows[start:start + batch_size], token)
+
+    thread = threading.Thread(target=run, daemon=True)
+    entry['precompute'] = thread
+    thread.start()
+    return thread
+
+
+def explain_isolation_forest(model, X, idx=0, token=None):
+    """Gera explicações SHAP para um modelo Isolation Forest."""
+    import matplotlib.pyplot as plt
+    import shap
+
+    values, entry = shap_values_for(model, X, [idx], token)
+    explainer = entry['explainer']
+    if entry['kind'] == 'tree':
         fig_shap = plt.figure()
         shap.plots._waterfall.waterfall_legacy(
-            explainer.expected_value, shap_values[idx], feature_names=X.columns
+            explainer.expected_value, values[0], feature_names=X.columns
         )
         return fig_shap
-    except Exception:
-        # Fallback: KernelExplainer
-        background = shap.sample(X, 100)
-        explainer = shap.KernelExplainer(model.decision_function, background)
-        shap_values = explainer.shap_values(X.iloc[idx:idx+1])
-        fig_force = shap.force_plot(
-            explainer.expected_value, shap_values[0], X.iloc[idx], matplotlib=True
-        )
-        return fig_force
\ No newline at end of file
+    fig_force = shap.force_plot(
+        explainer.expected_value, values[0], X.iloc[idx], matplotlib=True, show=False
+    )
+    return fig_force
@@ -0,0 +1,71 @@
+import io
+import threading
+from collections import OrderedDict
+
+from utils.fingerprint import fingerprint
+
+# Limite de memória ocupada pelas imagens em cache
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def figure_to_bytes(fig, fmt='png', dpi=100) -> bytes:
+    """Rasteriza a figura e a fecha, liberando a memória do Matplotlib."""
+    import matplotlib.pyplot as plt
+
+    buf = io.BytesIO()
+    try:
+        fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches='tight')
+    finally:
+        plt.close(fig)
+    return buf.getvalue()
+
+
+class FigureCache:
+    """Cache LRU de figuras renderizadas, limitado pelo total de bytes."""
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+            return image
+
+    def put(self, key, image: bytes):
+        with self._lock:
+            if key in self._images:
+                self._size -= len(self._images.pop(key))
+            if len(image) > self.max_bytes:
+                return
+            self._images[key] = image
+            self._size += len(image)
+            while self._size > self.max_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self._size = 0
+
+
+_FIGURES = FigureCache()
+
+
+def cached_figure(plot_func, *args, fmt='png', key=None, **kwargs) -> bytes:
+    """Retorna a imagem de `plot_func(*args, **kwargs)`, renderizando só se as entradas mudaram.
+
+    Com `key` (ex.: o token de versão dos dados) as entradas não são hasheadas.
+    """
+    key = (plot_func.__module__, plot_func.__qualname__, fmt,
+           fingerprint(args, kwargs) if key is None else key)
+    image = _FIGURES.get(key)
+    if image is None:
+        image = figure_to_bytes(plot_func(*args, **kwargs), fmt=fmt)
+        _FIGURES.put(key, image)
+    return image
@@ -1,20 +1,27 @@
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 
+from data.preprocessing import transfer_values
+from visualization.rendering import MAX_ANNOTATIONS, POINT_BUDGET, TOP_USERS, top_annotations
 
-def plot_login_patterns(logs_df):
-    """Gera gráfico para análise de padrões de login por usuário."""
-    # Filtrar apenas logs de login
-    login_logs = logs_df[logs_df['tabela'] == 'usuario']
-    login_logs['resultado'] = login_logs['descricao'].apply(
-        lambda x: 'Sucesso' if 'SUCESSO' in x else 'Erro')
+
+def plot_login_patterns(logs_df, top_users=TOP_USERS):
+    """Gera gráfico para análise de padrões de login por usuário.
+
+    Com muitos usuários, mostra apenas os `top_users` com mais erros de login.
+    """
+    # Filtrar apenas logs de login (máscara booleana, sem copiar a tabela)
+    is_login = (logs_df['tabela'] == 'usuario').to_numpy()
+    sucesso = logs_df['descricao'][is_login].str.contains('SUCESSO', na=False)
+    resultado = pd.Series(np.where(sucesso, 'Sucesso', 'Erro'), index=sucesso.index, name='resultado')
 
     # Verificar se a coluna user_id existe (pode ser userId nos dados originais)
-    if 'user_id' not in login_logs.columns and 'userId' in login_logs.columns:
-        login_logs['user_id'] = login_logs['userId']
+    user_col = 'user_id' if 'user_id' in logs_df.columns else 'userId'
 
     # Agrupar por usuário e resultado
-    user_login_counts = login_logs.groupby(['user_id', 'resultado']).size().unstack(fill_value=0)
+    user_login_counts = resultado.groupby(
+        [logs_df[user_col][is_login].rename('user_id'), resultado]).size().unstack(fill_value=0)
 
     # Verificar quais colunas existem no resultado
     plot_columns = []
@@ -30,6 +37,11 @@ def plot_login_patterns(logs_df):
     else:
         user_login_counts['taxa_erro'] = 0
 
+    # Limitar o número de barras aos usuários mais relevantes
+    if len(user_login_counts) > top_users:
+        rank_col = 'Erro' if 'Erro' in user_login_counts.columns else plot_columns[0]
+        user_login_counts = user_login_counts.nlargest(top_users, rank_col).sort_index()
+
     # Criar gráfico
     fig, ax = plt.subplots(figsize=(10, 6))
     colors = {'Sucesso': 'green', 'Erro': 'red'}
@@ -57,49 +69,60 @@ def plot_login_patterns(logs_df):
     return fig
 
 
-def plot_transfer_anomalies(logs_df, anomaly_scores):
-    """Visualiza transferências com anomalias destacadas por valor e hora."""
-    # Filtrar transferências
-    transfer_logs = logs_df[logs_df['tabela'] == 'transferencia'].copy()
-
-    # Extrair valores das transferências
-    def extract_value(data_str):
-        if pd.isna(data_str):
-            return None
-        try:
-            valor_str = data_str.split('|')[0] if '|' in data_str else ''
-            return float(valor_str.split('=')[1]) if '=' in valor_str else None
-        except:
-            return None
-
-    transfer_logs['valor'] = transfer_logs['dados_novos'].apply(extract_value)
+def plot_transfer_anomalies(logs_df, anomaly_scores, point_budget=POINT_BUDGET,
+                            max_annotations=MAX_ANNOTATIONS):
+    """Visualiza transferências com anomalias destacadas por valor e hora.
+
+    Acima de `point_budget` transferências o gráfico de dispersão vira um
+    hexbin com o menor score de cada célula.
+    """
+    # Filtrar transferências, montando só as colunas usadas no gráfico
+    is_transfer = (logs_df['tabela'] == 'transferencia').to_numpy()
+    source_cols = [c for c in ('tabela', 'dados_novos', 'valor_transferencia') if c in logs_df.columns]
+    scores = np.asarray(anomaly_scores)
+    pos = np.flatnonzero(is_transfer)
+    transfer_logs = pd.DataFrame({
+        'id': logs_df['id'].to_numpy()[is_transfer],
+        # Valores das transferências (já extraídos na ingestão, quando disponíveis)
+        'valor': transfer_values(logs_df.loc[is_transfer, source_cols]).to_numpy(),
+        # Score de anomalia de cada transferência
+        'anomaly_score': np.where(pos < len(scores), scores[np.minimum(pos, len(scores) - 1)], 0)
+        if len(scores) else 0,
+        # Converter data para hora do dia
+        'hora': pd.to_datetime(logs_df['data'][is_transfer]).dt.hour.to_numpy(),
+    })
     transfer_logs = transfer_logs.dropna(subset=['valor'])
 
-    # Adicionar score de anomalia
-    transfer_logs = transfer_logs.copy()
-    transfer_logs['anomaly_score'] = transfer_logs.index.map(
-        lambda idx: anomaly_scores[idx] if idx < len(anomaly_scores) else 0)
-
-    # Converter data para hora do dia
-    transfer_logs['hora'] = pd.to_datetime(transfer_logs['data']).dt.hour
-
-    # Plotar gráfico de dispersão
     fig, ax = plt.subplots(figsize=(12, 8))
-    scatter = ax.scatter(
-        transfer_logs['hora'],
-        transfer_logs['valor'],
-        c=transfer_logs['anomaly_score'],
-        cmap='coolwarm',
-        alpha=0.7,
-        s=100
-    )
+    if len(transfer_logs) > point_budget:
+        # Agregação em células hexagonais: cor = score mais anômalo da célula
+        scatter = ax.hexbin(
+            transfer_logs['hora'],
+            transfer_logs['valor'],
+            C=transfer_logs['anomaly_score'],
+            reduce_C_function=np.min,
+            gridsize=(24, 40),
+            cmap='coolwarm',
+        )
+    else:
+        # Plotar gráfico de dispersão
+        scatter = ax.scatter(
+            transfer_logs['hora'],
+            transfer_logs['valor'],
+            c=transfer_logs['anomaly_score'],
+            cmap='coolwarm',
+            alpha=0.7,
+            s=100
+        )
 
-    # Adicionar rótulos para os pontos mais anômalos
+    # Adicionar rótulos para os pontos mais anômalos (limitados a `max_annotations`)
     threshold = transfer_logs['anomaly_score'].quantile(0.15)  # 15% mais anômalos
-    for _, row in transfer_logs[transfer_logs['anomaly_score'] < threshold].iterrows():
+    labeled = top_annotations(
+        transfer_logs[transfer_logs['anomaly_score'] < threshold], 'anomaly_score', max_annotations)
+    for row in labeled.itertuples():
         ax.annotate(
-            f"ID: {row['id']}",
-            (row['hora'], row['valor']),
+            f"ID: {row.id}",
+            (row.hora, row.valor),
             xytext=(5, 5),
             textcoords='offset points',
             fontsize=8
@@ -123,19 +146,16 @@ def plot_transfer_anomalies(logs_df, anomaly_scores):
 
 def plot_anomaly_summary(logs_df, preds, scores):
     """Mostra um resumo das anomalias detectadas por tipo de operação."""
-    # Adicionar predições e scores ao dataframe
-    df_with_anomalies = logs_df.copy()
-    if len(preds) == len(df_with_anomalies):
-        df_with_anomalies['anomalia'] = preds
-        df_with_anomalies['score'] = scores
-    else:
+    if len(preds) != len(logs_df):
         return plt.figure()  # Retorna figura vazia se tamanhos não corresponderem
 
-    # Calcular porcentagem de anomalias por tipo de operação
-    anomaly_by_operation = df_with_anomalies.groupby('tipo_operacao').agg(
-        total=('id', 'count'),
-        anomalias=('anomalia', lambda x: (x == -1).sum()),
-    )
+    # Calcular porcentagem de anomalias por tipo de operação, sem copiar os logs
+    anomalia = pd.Series(np.asarray(preds) == -1, index=logs_df.index)
+    por_operacao = anomalia.groupby(logs_df['tipo_operacao'], observed=True)
+    anomaly_by_operation = pd.DataFrame({
+        'total': por_operacao.size(),
+        'anomalias': por_operacao.sum(),
+    })
 
     anomaly_by_operation['porcentagem'] = (
             anomaly_by_operation['anomalias'] / anomaly_by_operation['total'] * 100
@@ -180,15 +200,12 @@ def plot_anomaly_summary(logs_df, preds, scores):
 
 def plot_login_time_patterns(logs_df):
     """Gera gráfico de padrões de horário de login para detectar acesso em horários incomuns."""
-    # Filtrar logs de login
-    login_logs = logs_df[logs_df['tabela'] == 'usuario'].copy()
-
-    # Converter data para datetime e extrair hora
-    login_logs['data'] = pd.to_datetime(login_logs['data'])
-    login_logs['hora'] = login_logs['data'].dt.hour
+    # Filtrar logs de login e extrair a hora (só da coluna de data)
+    is_login = (logs_df['tabela'] == 'usuario').to_numpy()
+    horas = pd.to_datetime(logs_df['data'][is_login]).dt.hour
 
     # Contar logins por hora
-    login_hour_counts = login_logs.groupby('hora').size()
+    login_hour_counts = horas.value_counts()
 
     # Completar horas faltantes (para ter 0-23)
     full_hours = pd.Series(0, index=range(24))
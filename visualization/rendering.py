@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+# Acima deste número de pontos os gráficos passam a agregar ou reduzir os dados
+POINT_BUDGET = 5000
+# Máximo de rótulos de texto desenhados por gráfico
+MAX_ANNOTATIONS = 20
+# Máximo de usuários exibidos em gráficos de barras por usuário
+TOP_USERS = 30
+
+
+def lttb(x, y, n_out):
+    """Reduz uma série a `n_out` pontos com Largest-Triangle-Three-Buckets.
+
+    Retorna os índices dos pontos escolhidos, preservando picos e vales.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        # Ponto médio do próximo bucket (ou o último ponto, no último bucket)
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_series(times: pd.Series, values: pd.Series, budget=POINT_BUDGET):
+    """Aplica LTTB a uma série temporal se ela exceder o orçamento de pontos."""
+    if len(values) <= budget:
+        return times, values
+    order = np.argsort(times.to_numpy(), kind='stable')
+    times, values = times.iloc[order], values.iloc[order]
+    idx = lttb(times.to_numpy().astype('datetime64[ns]').astype(np.int64), values.to_numpy(), budget)
+    return times.iloc[idx], values.iloc[idx]
+
+
+def top_annotations(df: pd.DataFrame, score_col: str, limit=MAX_ANNOTATIONS) -> pd.DataFrame:
+    """Seleciona as linhas mais anômalas (menor score) que recebem rótulo."""
+    return df.nsmallest(limit, score_col)